@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from graphics_4vecs.generate_4vecs import (
+    TREE_NAME,
+    generate_phase_space,
+    write_root_file,
+)
+from graphics_4vecs.io_4vecs import FRAME_COLUMNS
+
+__all__ = ["TREE_NAME", "make_frame", "make_root_file"]
+
+
+def make_root_file(path: str | Path, num_events: int, seed: int = 0) -> str:
+    """
+    Write a ROOT file with the layout of the real data and phase-space decays.
+    """
+    return write_root_file(path, num_events, seed=seed)
+
+
+def make_frame(num_events: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a rest-frame table of phase-space decays.
+    """
+    four_momenta = generate_phase_space(num_events, seed=seed)
+    return pd.DataFrame(four_momenta.reshape(num_events, -1), columns=FRAME_COLUMNS)
@@ -0,0 +1,180 @@
+"""
+Benchmarks of the stages of the pipeline, in the format of asv.
+
+Every stage is timed (``time_*``), its peak memory measured (``peakmem_*``)
+and its throughput reported in events per second (``track_*``) for several
+event counts. All inputs are synthetic, so the suite runs offline.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from graphics_4vecs.geometry_4vecs import MOMENTUM_COLUMNS, compute_decay_geometry
+from graphics_4vecs.io_4vecs import EventSource, open_sink
+from graphics_4vecs.transformations_4vecs import (
+    SPEED_OF_LIGHT,
+    build_lab_frame,
+    lorentz_boost,
+    read_root_file,
+)
+
+from ._data import TREE_NAME, make_frame, make_root_file
+
+EVENT_COUNTS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BETA = np.array([0.0, 0.0, 0.5])
+
+
+def _events_per_second(func: Callable[[], Any], num_events: int) -> float:
+    start = time.perf_counter()
+    func()
+    return num_events / (time.perf_counter() - start)
+
+
+class ReadRootFile:
+    params = EVENT_COUNTS
+    param_names = ("num_events",)
+    timeout = 600
+
+    def setup_cache(self) -> dict[int, str]:
+        # Runs once in a directory kept for all benchmarks of the class
+        return {n: make_root_file(f"events_{n}.root", n) for n in EVENT_COUNTS}
+
+    def time_read_root_file(self, paths: dict[int, str], num_events: int) -> None:
+        read_root_file(paths[num_events], TREE_NAME)
+
+    def peakmem_read_root_file(self, paths: dict[int, str], num_events: int) -> None:
+        read_root_file(paths[num_events], TREE_NAME)
+
+    def track_read_root_file(self, paths: dict[int, str], num_events: int) -> float:
+        return _events_per_second(
+            lambda: read_root_file(paths[num_events], TREE_NAME), num_events
+        )
+
+    track_read_root_file.unit = "events/s"  # type: ignore[attr-defined]
+
+
+class LorentzTransform:
+    params = EVENT_COUNTS
+    param_names = ("num_events",)
+    timeout = 600
+
+    def setup(self, num_events: int) -> None:
+        self.frame = make_frame(num_events)
+        self.four_momenta = self.frame.to_numpy().reshape(num_events, -1, 4)
+
+    def time_lorentz_boost(self, num_events: int) -> None:  # noqa: ARG002
+        lorentz_boost(self.four_momenta, BETA)
+
+    def time_build_lab_frame(self, num_events: int) -> None:  # noqa: ARG002
+        build_lab_frame(self.frame, 0.5 * SPEED_OF_LIGHT)
+
+    def peakmem_build_lab_frame(self, num_events: int) -> None:  # noqa: ARG002
+        build_lab_frame(self.frame, 0.5 * SPEED_OF_LIGHT)
+
+    def track_build_lab_frame(self, num_events: int) -> float:
+        return _events_per_second(
+            lambda: build_lab_frame(self.frame, 0.5 * SPEED_OF_LIGHT), num_events
+        )
+
+    track_build_lab_frame.unit = "events/s"  # type: ignore[attr-defined]
+
+
+class WriteTable:
+    params = (EVENT_COUNTS, ["csv", "parquet", "feather", "npz", "npy", "evstore"])
+    param_names = ("num_events", "format")
+    timeout = 1800  # writing 10^7 events as CSV takes several minutes
+
+    def setup(self, num_events: int, fmt: str) -> None:
+        if fmt in ("parquet", "feather"):
+            try:
+                import pyarrow as pa  # noqa: F401
+            except ImportError:
+                raise NotImplementedError from None  # asv skips the benchmark
+        self.frame = make_frame(num_events)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / f"frame.{fmt}"
+
+    def teardown(self, num_events: int, fmt: str) -> None:  # noqa: ARG002
+        self.directory.cleanup()
+
+    def _write(self, fmt: str) -> None:
+        with open_sink(self.path, fmt) as sink:
+            sink.write(self.frame)
+
+    def time_write(self, num_events: int, fmt: str) -> None:  # noqa: ARG002
+        self._write(fmt)
+
+    def peakmem_write(self, num_events: int, fmt: str) -> None:  # noqa: ARG002
+        self._write(fmt)
+
+    def track_write(self, num_events: int, fmt: str) -> float:
+        return _events_per_second(lambda: self._write(fmt), num_events)
+
+    track_write.unit = "events/s"  # type: ignore[attr-defined]
+
+
+class DecayGeometry:
+    params = EVENT_COUNTS
+    param_names = ("num_events",)
+    timeout = 600
+
+    def setup(self, num_events: int) -> None:
+        self.frame = make_frame(num_events)
+
+    def time_compute_decay_geometry(self, num_events: int) -> None:  # noqa: ARG002
+        compute_decay_geometry(self.frame)
+
+    def peakmem_compute_decay_geometry(self, num_events: int) -> None:  # noqa: ARG002
+        compute_decay_geometry(self.frame)
+
+    def track_compute_decay_geometry(self, num_events: int) -> float:
+        return _events_per_second(
+            lambda: compute_decay_geometry(self.frame), num_events
+        )
+
+    track_compute_decay_geometry.unit = "events/s"  # type: ignore[attr-defined]
+
+
+class DecayConstruct:
+    params = (EVENT_COUNTS, ["low_quality", "high_quality"])
+    param_names = ("num_events", "quality")
+    timeout = 600
+
+    def setup_cache(self) -> dict[int, str]:
+        paths = {}
+        for n in EVENT_COUNTS:
+            paths[n] = f"lab_frame_{n}.npy"
+            with open_sink(paths[n], "npy") as sink:
+                sink.write(make_frame(n))
+        return paths
+
+    def setup(self, paths: dict[int, str], num_events: int, quality: str) -> None:
+        try:
+            import manim
+        except ImportError:
+            raise NotImplementedError from None  # asv skips the benchmark
+
+        self.manim = manim
+        self.source = EventSource(paths[num_events], MOMENTUM_COLUMNS)
+        self.settings = {"quality": quality, "dry_run": True, "disable_caching": True}
+
+    def time_construct(
+        self, paths: dict[int, str], num_events: int, quality: str  # noqa: ARG002
+    ) -> None:
+        from graphics_4vecs.plot_4vecs import Decay
+
+        # The last decay of the table, so the lookup cannot stop early
+        with self.manim.tempconfig(self.settings):
+            scene = Decay(
+                animation_mode="picture",
+                decay_num=num_events - 1,
+                event_source=self.source,
+            )
+            scene.construct()
@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from graphics_4vecs.cli_4vecs import main
+
+raise SystemExit(main())
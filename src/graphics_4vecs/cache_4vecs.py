@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field, replace
+from functools import cache
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any
+
+from graphics_4vecs.io_4vecs import parse_size
+
+log = logging.getLogger("graphics_4vecs")
+
+DEFAULT_MAX_SIZE = "10 GB"
+CACHE_ENV_VAR = "GRAPHICS_4VECS_CACHE"
+ENTRY_FILE = "entry.json"
+DIGESTS_DIR = "digests"
+HASH_BLOCK_SIZE = 1 << 20
+
+# Modules whose code determines the pipeline outputs; editing any of them
+# invalidates every cached result
+CODE_MODULES = ("graphics_4vecs.transformations_4vecs", "graphics_4vecs.io_4vecs")
+
+
+def default_cache_dir() -> Path:
+    """
+    Find the cache directory: $GRAPHICS_4VECS_CACHE, or ~/.cache/graphics_4vecs.
+    """
+    return Path(
+        os.environ.get(CACHE_ENV_VAR, Path.home() / ".cache" / "graphics_4vecs")
+    )
+
+
+@cache
+def code_version() -> str:
+    """
+    Hash the source of the modules that produce the pipeline outputs.
+
+    Returns:
+        str: Hex digest that changes whenever the code of ``CODE_MODULES``
+        changes, also in an editable install where the version does not.
+    """
+    digest = hashlib.sha256()
+    for module in CODE_MODULES:
+        spec = find_spec(module)
+        if spec is None or spec.origin is None:
+            msg = f"Cannot find the source of {module}"
+            raise ImportError(msg)
+        digest.update(Path(spec.origin).read_bytes())
+    return digest.hexdigest()
+
+
+def _writer_id() -> str:
+    return f"{os.getpid()}-{threading.get_ident()}"
+
+
+def _write_json(path: Path, data: Any) -> None:
+    # Written next to the target and renamed, so readers never see half a
+    # file; the name is per process and thread, as dataset workers share the
+    # cache
+    tmp_path = path.with_name(f".{path.name}.{_writer_id()}.tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    tmp_path.replace(path)
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """
+    Outputs of one pipeline run stored in the cache.
+
+    Attributes:
+        key (str): Hash of the input file content and the run parameters.
+        path (Path): Directory holding the output files.
+        size (int): Total size of the output files in bytes.
+        last_used (float): Time of the last store or lookup, in seconds since
+            the epoch.
+        metadata (dict): Parameters of the run and values it returned.
+    """
+
+    key: str
+    path: Path
+    size: int
+    last_used: float
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def files(self) -> list[Path]:
+        """
+        Output files of the run.
+        """
+        return sorted(p for p in self.path.iterdir() if p.name != ENTRY_FILE)
+
+
+class ResultCache:
+    """
+    Content-addressed cache of pipeline outputs with least-recently-used
+    eviction.
+
+    Every entry is a directory named after its key, which hashes the content
+    of the input file, the run parameters and :func:`code_version`. Digests
+    of input files are remembered together with their size and modification
+    time, so an unchanged input is not read again to look it up. Each input
+    has its own digest file and entries are renamed into place, so processes
+    sharing the cache never overwrite each other's updates.
+
+    Args:
+        directory (str, optional): Cache directory; see
+            :func:`default_cache_dir`.
+        max_size (int or str): Size limit in bytes, or a size such as "10 GB".
+            Least recently used entries are removed to stay below it.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        max_size: int | str = DEFAULT_MAX_SIZE,
+    ) -> None:
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_size = parse_size(max_size)
+
+    def _digest_path(self, path: Path) -> Path:
+        name = hashlib.sha256(str(path).encode()).hexdigest()
+        return self.directory / DIGESTS_DIR / f"{name}.json"
+
+    def file_digest(self, path: str | Path) -> str:
+        """
+        Hash the content of a file, reusing the digest if it is unchanged.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            str: SHA-256 hex digest of the content.
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        digest_path = self._digest_path(path)
+        try:
+            known = json.loads(digest_path.read_text())
+        except (OSError, ValueError):
+            known = None
+        if (
+            known is not None
+            and known["path"] == str(path)
+            and known["size"] == stat.st_size
+            and known["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return str(known["digest"])
+
+        digest = hashlib.sha256()
+        with path.open("rb") as input_file:
+            while block := input_file.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+        record = {
+            "path": str(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": digest.hexdigest(),
+        }
+        digest_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_json(digest_path, record)
+        return digest.hexdigest()
+
+    def key(self, input_path: str | Path, **params: Any) -> str:
+        """
+        Build the key of a run from its input file and parameters.
+
+        Args:
+            input_path (str): Input file, hashed by content.
+            **params: Parameters that change the outputs, such as the tree
+                name, branches, boost velocity and output format.
+
+        Returns:
+            str: SHA-256 hex digest.
+        """
+        payload = {
+            "input": self.file_digest(input_path),
+            "code": code_version(),
+            **params,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _read_entry(self, path: Path) -> CacheEntry | None:
+        try:
+            record = json.loads((path / ENTRY_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(
+            path.name, path, record["size"], record["last_used"], record["metadata"]
+        )
+
+    def get(self, key: str) -> CacheEntry | None:
+        """
+        Look up an entry and mark it as used.
+
+        Args:
+            key (str): Key from :meth:`key`.
+
+        Returns:
+            CacheEntry or None: The entry, or None if it is not cached or is
+            being evicted by another process.
+        """
+        entry = self._read_entry(self.directory / key)
+        if entry is None:
+            return None
+        entry = replace(entry, last_used=time.time())
+        try:
+            self._write_entry(entry)
+        except OSError:
+            log.debug("Cache entry %s was evicted while it was looked up", key)
+            return None
+        return entry
+
+    def _write_entry(self, entry: CacheEntry) -> None:
+        record = {
+            "size": entry.size,
+            "last_used": entry.last_used,
+            "metadata": entry.metadata,
+        }
+        _write_json(entry.path / ENTRY_FILE, record)
+
+    def put(
+        self,
+        key: str,
+        files: Iterable[str | Path],
+        metadata: dict[str, Any] | None = None,
+    ) -> CacheEntry | None:
+        """
+        Copy the outputs of a run into the cache.
+
+        Args:
+            key (str): Key from :meth:`key`.
+            files (iterable of str): Output files to store.
+            metadata (dict, optional): JSON-serializable values to keep with
+                the entry, e.g. what the run returned.
+
+        Returns:
+            CacheEntry or None: The new entry, or None if the outputs alone
+            are larger than the size limit. If another process stored the
+            same key first, its entry is kept and returned.
+        """
+        paths = [Path(f) for f in files]
+        size = sum(path.stat().st_size for path in paths)
+        if size > self.max_size:
+            log.info("Not caching %d bytes of outputs above the cache size", size)
+            return None
+
+        # Filled under a temporary name and renamed, so a crash never leaves
+        # a partial entry behind
+        tmp_path = self.directory / f".{key}.{_writer_id()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        for path in paths:
+            shutil.copyfile(path, tmp_path / path.name)
+        self._write_entry(CacheEntry(key, tmp_path, size, time.time(), metadata or {}))
+        entry_path = self.directory / key
+        if entry_path.exists() and self._read_entry(entry_path) is None:
+            # Left behind by an interrupted eviction
+            shutil.rmtree(entry_path, ignore_errors=True)
+        try:
+            tmp_path.rename(entry_path)
+        except OSError:
+            # The key hashes the inputs, so an entry stored under it by
+            # another worker holds the same outputs
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if self._read_entry(entry_path) is None:
+                raise
+            log.debug("Cache entry %s is already stored", key)
+
+        self.evict()
+        return self._read_entry(entry_path)
+
+    def entries(self) -> list[CacheEntry]:
+        """
+        List the entries, most recently used first.
+        """
+        if not self.directory.exists():
+            return []
+        entries = [
+            entry
+            for path in self.directory.iterdir()
+            if path.is_dir() and not path.name.startswith(".")
+            for entry in [self._read_entry(path)]
+            if entry is not None
+        ]
+        return sorted(entries, key=lambda entry: entry.last_used, reverse=True)
+
+    @property
+    def size(self) -> int:
+        """
+        Total size of the cached outputs in bytes.
+        """
+        return sum(entry.size for entry in self.entries())
+
+    def evict(self) -> list[str]:
+        """
+        Remove least recently used entries until the cache fits its size.
+
+        Returns:
+            list of str: Keys of the removed entries.
+        """
+        entries = self.entries()
+        size = sum(entry.size for entry in entries)
+        removed = []
+        while entries and size > self.max_size:
+            entry = entries.pop()
+            shutil.rmtree(entry.path, ignore_errors=True)
+            size -= entry.size
+            removed.append(entry.key)
+            log.debug("Evicted cache entry %s", entry.key)
+        return removed
+
+    def clear(self) -> int:
+        """
+        Remove all entries and remembered file digests.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        entries = self.entries()
+        for entry in entries:
+            shutil.rmtree(entry.path, ignore_errors=True)
+        shutil.rmtree(self.directory / DIGESTS_DIR, ignore_errors=True)
+        return len(entries)
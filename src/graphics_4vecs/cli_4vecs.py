@@ -0,0 +1,928 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import logging
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+log = logging.getLogger("graphics_4vecs")
+
+DEFAULT_ROOT_FILE = "zenodo_version_D02Kpipipi_td_1000000events.root"
+DEFAULT_TREE_NAME = "DalitzEventList"
+
+# The library modules are imported inside the commands, so that starting the
+# CLI (e.g. for --help) does not pay for numpy, pandas or uproot.
+
+
+def _step_size(value: str) -> int | str:
+    """
+    Parse a chunk size: a number of entries or a memory size like "100 MB".
+    """
+    return int(value) if value.isdigit() else value
+
+
+def _add_input_arguments(
+    parser: argparse.ArgumentParser, optional: bool = True
+) -> None:
+    parser.add_argument(
+        "root_file_path",
+        nargs="?" if optional else None,
+        default=DEFAULT_ROOT_FILE,
+        help="ROOT file or rest-frame event store"
+        + (" (default: %(default)s)" if optional else ""),
+    )
+    parser.add_argument(
+        "tree_name",
+        nargs="?" if optional else None,
+        default=DEFAULT_TREE_NAME,
+        help="name of the tree in the ROOT file"
+        + (" (default: %(default)s)" if optional else ""),
+    )
+    parser.add_argument(
+        "--step-size",
+        type=_step_size,
+        default="100 MB",
+        help='entries per chunk, or memory per chunk like "100 MB" (default: %(default)s)',
+    )
+
+
+def _add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="cache directory (default: $GRAPHICS_4VECS_CACHE or ~/.cache/graphics_4vecs)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        default="10 GB",
+        help='size limit of the cache, like "10 GB" (default: %(default)s)',
+    )
+
+
+def _add_query_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "input_path", help="ROOT file, event store, or rest- or lab-frame table"
+    )
+    parser.add_argument(
+        "--tree-name",
+        default=DEFAULT_TREE_NAME,
+        help="name of the tree in a ROOT file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--index-dir",
+        default=None,
+        help="index directory (default: <input_path>.index)",
+    )
+    parser.add_argument(
+        "--step-size",
+        type=_step_size,
+        default="100 MB",
+        help='events per chunk, or memory per chunk like "100 MB" (default: %(default)s)',
+    )
+
+
+def _transform(args: argparse.Namespace) -> int:
+    from graphics_4vecs.cache_4vecs import ResultCache
+    from graphics_4vecs.transformations_4vecs import SPEED_OF_LIGHT, run_pipeline
+
+    cache = ResultCache(args.cache_dir, args.cache_size) if args.cache else None
+
+    num_chunks = run_pipeline(
+        args.root_file_path,
+        args.tree_name,
+        args.step_size,
+        args.format,
+        args.compression,
+        v=args.beta * SPEED_OF_LIGHT,
+        workers=args.workers,
+        precision=args.precision,
+        cache=cache,
+        pipeline_depth=args.pipeline_depth,
+        output_dir=args.output_dir,
+    )
+    if num_chunks == 0:
+        log.error("Empty branches.")
+        return 1
+    return 0
+
+
+def _dataset(args: argparse.Namespace) -> int:
+    from graphics_4vecs.cache_4vecs import ResultCache
+    from graphics_4vecs.dataset_4vecs import run_dataset
+    from graphics_4vecs.transformations_4vecs import SPEED_OF_LIGHT
+
+    cache = ResultCache(args.cache_dir, args.cache_size) if args.cache else None
+
+    report = run_dataset(
+        args.inputs,
+        args.tree_name,
+        args.output_dir,
+        args.step_size,
+        args.format,
+        args.compression,
+        v=args.beta * SPEED_OF_LIGHT,
+        workers=args.workers,
+        precision=args.precision,
+        cache=cache,
+    )
+    for manifest in report.manifests:
+        log.info("Wrote %s", manifest)
+    return 0
+
+
+def _scan(args: argparse.Namespace) -> int:
+    from graphics_4vecs.transformations_4vecs import (
+        SPEED_OF_LIGHT,
+        run_scan,
+        scan_output_path,
+        velocities_from_rapidities,
+    )
+
+    if args.rapidity is not None:
+        velocities = list(velocities_from_rapidities(args.rapidity))
+    else:
+        velocities = [beta * SPEED_OF_LIGHT for beta in args.beta]
+
+    if not args.hist:
+        paths = run_scan(
+            args.root_file_path,
+            args.tree_name,
+            velocities,
+            args.step_size,
+            args.format,
+            args.compression,
+            args.precision,
+            args.output_dir,
+        )
+        log.info("Wrote %s", ", ".join(paths))
+        return 0
+
+    from graphics_4vecs.histogram_4vecs import (
+        parse_histogram,
+        run_histogram_scan,
+        save_histograms,
+    )
+
+    histograms = [parse_histogram(spec) for spec in args.hist]
+    scan = run_histogram_scan(
+        args.root_file_path, args.tree_name, histograms, velocities, args.step_size
+    )
+    for v, velocity_histograms in zip(velocities, scan, strict=True):
+        path = str(Path(args.output_dir) / scan_output_path(v, "npz", "histograms"))
+        save_histograms(path, velocity_histograms)
+        log.info("Wrote %s", path)
+    return 0
+
+
+def _precision(args: argparse.Namespace) -> int:
+    from graphics_4vecs.transformations_4vecs import SPEED_OF_LIGHT, compare_precision
+
+    report = compare_precision(
+        args.root_file_path,
+        args.tree_name,
+        args.step_size,
+        v=args.beta * SPEED_OF_LIGHT,
+        max_events=args.max_events,
+    )
+    log.info(report.summary())
+    if args.output:
+        Path(args.output).write_text(json.dumps(dataclasses.asdict(report), indent=2))
+    return 0
+
+
+def _cache(args: argparse.Namespace) -> int:
+    from graphics_4vecs.cache_4vecs import ResultCache
+
+    cache = ResultCache(args.cache_dir, args.cache_size)
+    if args.action == "clear":
+        log.info("Removed %d entries from %s", cache.clear(), cache.directory)
+        return 0
+
+    entries = cache.entries()
+    for entry in entries:
+        log.info(
+            "%s  %8.1f MB  last used %s  %s",
+            entry.key[:12],
+            entry.size / 1e6,
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.last_used)),
+            entry.metadata.get("source", ""),
+        )
+    log.info(
+        "%d entries, %.1f of %.1f MB in %s",
+        len(entries),
+        sum(entry.size for entry in entries) / 1e6,
+        cache.max_size / 1e6,
+        cache.directory,
+    )
+    return 0
+
+
+def _convert(args: argparse.Namespace) -> int:
+    from graphics_4vecs.transformations_4vecs import convert_to_store
+
+    num_events = convert_to_store(
+        args.root_file_path, args.tree_name, args.store_path, args.step_size
+    )
+    log.info("Stored %d events in %s", num_events, args.store_path)
+    return 0
+
+
+def _histogram(args: argparse.Namespace) -> int:
+    from graphics_4vecs.histogram_4vecs import (
+        parse_histogram,
+        run_histograms,
+        save_histograms,
+    )
+    from graphics_4vecs.transformations_4vecs import SPEED_OF_LIGHT
+
+    histograms = [parse_histogram(spec) for spec in args.hist]
+    num_events = run_histograms(
+        args.root_file_path,
+        args.tree_name,
+        histograms,
+        args.step_size,
+        args.frame,
+        v=args.beta * SPEED_OF_LIGHT,
+        workers=args.workers,
+    )
+    save_histograms(args.output, histograms)
+    log.info("Filled %d histograms with %d events", len(histograms), num_events)
+    return 0
+
+
+def _kinematics(args: argparse.Namespace) -> int:
+    from graphics_4vecs.transformations_4vecs import write_kinematics
+
+    num_events = write_kinematics(
+        args.input_path,
+        args.output_path,
+        args.tree_name,
+        args.step_size,
+        args.format,
+        args.compression,
+    )
+    log.info("Wrote the kinematics of %d events to %s", num_events, args.output_path)
+    return 0
+
+
+def _generate(args: argparse.Namespace) -> int:
+    from graphics_4vecs.generate_4vecs import write_root_file
+
+    write_root_file(args.root_file_path, args.num_events, args.tree_name, args.seed)
+    return 0
+
+
+def _render(args: argparse.Namespace) -> int:
+    from graphics_4vecs.render_4vecs import parse_decay_numbers, render_decays
+
+    # "@decays.txt" reads the decay numbers from a file, e.g. from select
+    decays = args.decays
+    if decays.startswith("@"):
+        decays = Path(decays[1:]).read_text()
+    report = render_decays(
+        args.filename,
+        parse_decay_numbers(decays),
+        args.mode,
+        args.quality,
+        args.workers,
+        args.media_dir,
+        args.geometry,
+    )
+    for decay_num, error in sorted(report.failures.items()):
+        log.error("Decay %d: %s", decay_num, error)
+    return 1 if report.failures else 0
+
+
+def _index(args: argparse.Namespace) -> int:
+    from graphics_4vecs.query_4vecs import build_index
+
+    index_dir = build_index(
+        args.input_path, args.quantities, args.index_dir, args.tree_name, args.step_size
+    )
+    log.info("Indexed %s in %s", ", ".join(args.quantities), index_dir)
+    return 0
+
+
+def _select(args: argparse.Namespace) -> int:
+    from graphics_4vecs.query_4vecs import EventIndex, parse_cut, top_k
+    from graphics_4vecs.render_4vecs import format_decay_numbers
+
+    cuts = [parse_cut(spec) for spec in args.cut or []]
+    if not cuts and args.top is None:
+        msg = "Give at least one --cut or --top"
+        raise ValueError(msg)
+    largest = not args.smallest
+    if args.scan:
+        if args.top is None:
+            msg = "--scan only finds the --top events"
+            raise ValueError(msg)
+        events, values = top_k(
+            args.input_path,
+            args.top,
+            args.k,
+            largest,
+            cuts,
+            args.tree_name,
+            args.step_size,
+        )
+    else:
+        quantities = [cut.quantity for cut in cuts]
+        if args.top is not None:
+            quantities.append(args.top)
+        index = EventIndex(
+            args.input_path,
+            quantities,
+            args.index_dir,
+            args.tree_name,
+            args.step_size,
+        )
+        start = time.perf_counter()
+        if args.top is None:
+            events = index.select(cuts)
+        else:
+            events, values = index.top_k(args.top, args.k, largest, cuts)
+        log.info("Queried the index in %.1f ms", 1e3 * (time.perf_counter() - start))
+
+    if args.top is not None:
+        for event, value in zip(events, values, strict=True):
+            log.info("Decay %d: %s = %g", event, args.top, value)
+    spec = format_decay_numbers(events)
+    log.info("Selected %d decays: %s", len(events), spec)
+    if args.output:
+        Path(args.output).write_text(spec + "\n")
+    return 0
+
+
+def _geometry(args: argparse.Namespace) -> int:
+    from graphics_4vecs.geometry_4vecs import write_geometry_table
+
+    num_invalid = write_geometry_table(
+        args.filename, args.geometry_path, args.step_size
+    )
+    log.info(
+        "Wrote %s, %d events with a degenerate geometry",
+        args.geometry_path,
+        num_invalid,
+    )
+    return 0
+
+
+def _density(args: argparse.Namespace) -> int:
+    from graphics_4vecs.density_4vecs import (
+        SphereGrid,
+        run_direction_density,
+        save_direction_density,
+    )
+    from graphics_4vecs.render_4vecs import render_density
+    from graphics_4vecs.transformations_4vecs import SPEED_OF_LIGHT
+
+    density = run_direction_density(
+        args.input_path,
+        SphereGrid(args.bands, args.sectors),
+        args.particles,
+        args.tree_name,
+        args.step_size,
+        args.frame,
+        v=args.beta * SPEED_OF_LIGHT,
+    )
+    save_direction_density(args.output, density)
+    log.info(
+        "Counted the directions of %d events on %d cells in %s",
+        density.num_events,
+        args.bands * args.sectors,
+        args.output,
+    )
+    if args.render:
+        render_density(
+            args.output,
+            args.mode,
+            args.quality,
+            args.media_dir,
+            log_scale=args.log_scale,
+        )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser of the graphics-4vecs command.
+
+    Returns:
+        argparse.ArgumentParser: Parser with one subcommand per task.
+    """
+    parser = argparse.ArgumentParser(
+        prog="graphics-4vecs",
+        description="Convert D0 -> K pi pi pi decays from ROOT files and boost them.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="log the time, events/s and bytes of every pipeline stage",
+    )
+    parser.add_argument(
+        "--profile-report",
+        metavar="PATH",
+        help="also write the stage profile as JSON (implies --profile)",
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="PATH",
+        help="run under cProfile and write its statistics to PATH",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="trace memory allocations and log the largest ones",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    transform = subparsers.add_parser(
+        "transform",
+        help="write rest-frame and lab-frame tables to the working directory "
+        "or to --output-dir",
+    )
+    _add_input_arguments(transform)
+    transform.add_argument(
+        "--format",
+        default="csv",
+        choices=["csv", "parquet", "feather", "npz", "npy", "evstore"],
+        help="output table format (default: %(default)s)",
+    )
+    transform.add_argument(
+        "--compression", default=None, help="compression codec for the output format"
+    )
+    transform.add_argument(
+        "--beta",
+        type=float,
+        default=0.5,
+        help="parent velocity as a fraction of the speed of light (default: %(default)s)",
+    )
+    transform.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes (default: %(default)s)",
+    )
+    transform.add_argument(
+        "--precision",
+        default="float64",
+        choices=["float64", "float32"],
+        help="float type the four-momenta are processed and written in "
+        "(default: %(default)s)",
+    )
+    transform.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=0,
+        metavar="N",
+        help="read ahead and write in background threads with N chunks queued "
+        "between them; 0 runs the stages in turn (default: %(default)s)",
+    )
+    transform.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse the outputs of an earlier run on the same input and parameters",
+    )
+    transform.add_argument(
+        "--output-dir",
+        default=".",
+        help="existing directory to write the outputs to (default: %(default)s)",
+    )
+    _add_cache_arguments(transform)
+    transform.set_defaults(func=_transform)
+
+    dataset = subparsers.add_parser(
+        "dataset",
+        help="convert many ROOT files in parallel into partitioned tables with "
+        "a manifest",
+    )
+    dataset.add_argument(
+        "inputs",
+        nargs="+",
+        help='ROOT files or event stores, glob patterns like "data/*.root", or '
+        '"@file" listing them',
+    )
+    dataset.add_argument(
+        "--output-dir",
+        default="dataset",
+        help="directory of the parts and manifests (default: %(default)s)",
+    )
+    dataset.add_argument(
+        "--tree-name",
+        default=DEFAULT_TREE_NAME,
+        help="name of the tree in the ROOT files (default: %(default)s)",
+    )
+    dataset.add_argument(
+        "--step-size",
+        type=_step_size,
+        default="100 MB",
+        help='entries per chunk, or memory per chunk like "100 MB" (default: %(default)s)',
+    )
+    dataset.add_argument(
+        "--format",
+        default="csv",
+        choices=["csv", "parquet", "feather", "npz", "npy", "evstore"],
+        help="table format of the parts (default: %(default)s)",
+    )
+    dataset.add_argument(
+        "--compression", default=None, help="compression codec for the table format"
+    )
+    dataset.add_argument(
+        "--beta",
+        type=float,
+        default=0.5,
+        help="parent velocity as a fraction of the speed of light (default: %(default)s)",
+    )
+    dataset.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of files processed at once (default: number of CPUs)",
+    )
+    dataset.add_argument(
+        "--precision",
+        default="float64",
+        choices=["float64", "float32"],
+        help="float type the four-momenta are processed and written in "
+        "(default: %(default)s)",
+    )
+    dataset.add_argument(
+        "--cache",
+        action="store_true",
+        help="also reuse outputs of files processed for other datasets",
+    )
+    _add_cache_arguments(dataset)
+    dataset.set_defaults(func=_dataset)
+
+    cache = subparsers.add_parser(
+        "cache", help="list or clear the cached outputs of the transform command"
+    )
+    cache.add_argument(
+        "action",
+        nargs="?",
+        default="list",
+        choices=["list", "clear"],
+        help="list the entries, or remove them all (default: %(default)s)",
+    )
+    _add_cache_arguments(cache)
+    cache.set_defaults(func=_cache)
+
+    scan = subparsers.add_parser(
+        "scan",
+        help="boost the decays for a grid of parent velocities, reading them once",
+    )
+    _add_input_arguments(scan)
+    velocity = scan.add_mutually_exclusive_group(required=True)
+    velocity.add_argument(
+        "--beta",
+        type=float,
+        nargs="+",
+        help="parent velocities as fractions of the speed of light",
+    )
+    velocity.add_argument("--rapidity", type=float, nargs="+", help="parent rapidities")
+    scan.add_argument(
+        "--hist",
+        action="append",
+        help="fill this histogram (see the histogram command) for every velocity "
+        "instead of writing tables; may be repeated",
+    )
+    scan.add_argument(
+        "--format",
+        default="csv",
+        choices=["csv", "parquet", "feather", "npz", "npy", "evstore"],
+        help="output table format (default: %(default)s)",
+    )
+    scan.add_argument(
+        "--compression", default=None, help="compression codec for the output format"
+    )
+    scan.add_argument(
+        "--precision",
+        default="float64",
+        choices=["float64", "float32"],
+        help="float type of the output tables (default: %(default)s)",
+    )
+    scan.add_argument(
+        "--output-dir",
+        default=".",
+        help="existing directory to write the outputs to (default: %(default)s)",
+    )
+    scan.set_defaults(func=_scan)
+
+    precision = subparsers.add_parser(
+        "precision",
+        help="report how far the float32 pipeline deviates from the float64 one",
+    )
+    _add_input_arguments(precision)
+    precision.add_argument(
+        "--beta",
+        type=float,
+        default=0.5,
+        help="parent velocity as a fraction of the speed of light (default: %(default)s)",
+    )
+    precision.add_argument(
+        "--max-events",
+        type=int,
+        default=None,
+        help="only compare the first events (default: all)",
+    )
+    precision.add_argument(
+        "--output", default=None, help="also write the report to this JSON file"
+    )
+    precision.set_defaults(func=_precision)
+
+    convert = subparsers.add_parser(
+        "convert", help="convert a ROOT file into a memory-mapped event store"
+    )
+    _add_input_arguments(convert, optional=False)
+    convert.add_argument("store_path", help="path of the .evstore file to write")
+    convert.set_defaults(func=_convert)
+
+    histogram = subparsers.add_parser(
+        "histogram",
+        help="fill histograms chunk by chunk without writing the frame tables",
+    )
+    _add_input_arguments(histogram)
+    histogram.add_argument(
+        "--hist",
+        action="append",
+        required=True,
+        help='histogram as quantity:bins:low:high, comma-separated for 2D, e.g. "K_p:100:0:2" '
+        'or "s_12:50:0:3,s_34:50:0:3"; may be repeated',
+    )
+    histogram.add_argument(
+        "--output",
+        default="histograms.npz",
+        help="path of the .npz file to write (default: %(default)s)",
+    )
+    histogram.add_argument(
+        "--frame",
+        default="lab",
+        choices=["rest", "lab"],
+        help="frame of the four-momenta (default: %(default)s)",
+    )
+    histogram.add_argument(
+        "--beta",
+        type=float,
+        default=0.5,
+        help="parent velocity as a fraction of the speed of light (default: %(default)s)",
+    )
+    histogram.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes (default: %(default)s)",
+    )
+    histogram.set_defaults(func=_histogram)
+
+    kinematics = subparsers.add_parser(
+        "kinematics",
+        help="compute invariant masses and Dalitz variables of every decay",
+    )
+    kinematics.add_argument(
+        "input_path", help="ROOT file, event store, or rest- or lab-frame table"
+    )
+    kinematics.add_argument("output_path", help="path of the table to write")
+    kinematics.add_argument(
+        "--tree-name",
+        default=DEFAULT_TREE_NAME,
+        help="name of the tree in a ROOT file (default: %(default)s)",
+    )
+    kinematics.add_argument(
+        "--step-size",
+        type=_step_size,
+        default="100 MB",
+        help='events per chunk, or memory per chunk like "100 MB" (default: %(default)s)',
+    )
+    kinematics.add_argument(
+        "--format",
+        default=None,
+        choices=["csv", "parquet", "feather", "npz", "npy"],
+        help="output table format (default: inferred from the output path)",
+    )
+    kinematics.add_argument(
+        "--compression", default=None, help="compression codec for the output format"
+    )
+    kinematics.set_defaults(func=_kinematics)
+
+    generate = subparsers.add_parser(
+        "generate",
+        help="write a ROOT file of synthetic D0 -> K pi pi pi phase-space decays",
+    )
+    generate.add_argument("root_file_path", help="path of the ROOT file to write")
+    generate.add_argument("num_events", type=int, help="number of decays")
+    generate.add_argument(
+        "--tree-name",
+        default=DEFAULT_TREE_NAME,
+        help="name of the tree (default: %(default)s)",
+    )
+    generate.add_argument(
+        "--seed", type=int, default=None, help="seed for reproducible decays"
+    )
+    generate.set_defaults(func=_generate)
+
+    render = subparsers.add_parser(
+        "render", help="render many decays of a table across worker processes"
+    )
+    render.add_argument("filename", help="lab- or rest-frame table to render from")
+    render.add_argument(
+        "decays",
+        help='decay numbers and inclusive ranges, e.g. "0-499" or "2,7,10-12", '
+        'or "@file" to read them from a file written by select',
+    )
+    render.add_argument(
+        "--mode",
+        default="picture",
+        choices=["picture", "rotation", "dynamic"],
+        help="animation mode (default: %(default)s)",
+    )
+    render.add_argument(
+        "--quality",
+        default="l",
+        help="manim quality: l, m, h, p, k or a quality name (default: %(default)s)",
+    )
+    render.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    render.add_argument(
+        "--media-dir",
+        default="media",
+        help="directory manim writes the files to (default: %(default)s)",
+    )
+    render.add_argument(
+        "--geometry",
+        default=None,
+        help="geometry table precomputed for the table by the geometry command",
+    )
+    render.set_defaults(func=_render)
+
+    index = subparsers.add_parser(
+        "index", help="precompute sorted indexes of quantities for fast selections"
+    )
+    _add_query_arguments(index)
+    index.add_argument(
+        "quantities",
+        nargs="+",
+        help="quantities to index: table columns, kinematic variables and "
+        "<particle>_p, _pt, _theta or _phi",
+    )
+    index.set_defaults(func=_index)
+
+    select = subparsers.add_parser(
+        "select",
+        help="find decays by cuts on their kinematics, or the top k by a quantity",
+    )
+    _add_query_arguments(select)
+    select.add_argument(
+        "--cut",
+        action="append",
+        help='range as quantity:low:high, an empty bound is open, e.g. "s_12:0.5:1.2" '
+        'or "K_p:1.5:"; may be repeated',
+    )
+    select.add_argument("--top", default=None, help="quantity to rank decays by")
+    select.add_argument(
+        "-k",
+        type=int,
+        default=10,
+        help="number of decays for --top (default: %(default)s)",
+    )
+    select.add_argument(
+        "--smallest",
+        action="store_true",
+        help="rank by the smallest instead of the largest values",
+    )
+    select.add_argument(
+        "--scan",
+        action="store_true",
+        help="find the --top decays in one pass without building an index",
+    )
+    select.add_argument(
+        "--output", default=None, help="file to write the decay numbers to"
+    )
+    select.set_defaults(func=_select)
+
+    geometry = subparsers.add_parser(
+        "geometry", help="precompute the scene geometry of every decay of a table"
+    )
+    geometry.add_argument("filename", help="lab- or rest-frame table")
+    geometry.add_argument("geometry_path", help="path of the .npy file to write")
+    geometry.add_argument(
+        "--step-size",
+        type=_step_size,
+        default="100 MB",
+        help='events per chunk, or memory per chunk like "100 MB" (default: %(default)s)',
+    )
+    geometry.set_defaults(func=_geometry)
+
+    density = subparsers.add_parser(
+        "density",
+        help="count the momentum directions of all decays on an equal-area sphere grid",
+    )
+    density.add_argument("input_path", help="ROOT file, or rest- or lab-frame table")
+    density.add_argument(
+        "--output",
+        default="direction_density.npz",
+        help="path of the .npz file to write (default: %(default)s)",
+    )
+    density.add_argument(
+        "--tree-name",
+        default=DEFAULT_TREE_NAME,
+        help="name of the tree in a ROOT file (default: %(default)s)",
+    )
+    density.add_argument(
+        "--step-size",
+        type=_step_size,
+        default="100 MB",
+        help='events per chunk, or memory per chunk like "100 MB" (default: %(default)s)',
+    )
+    density.add_argument(
+        "--frame",
+        default="lab",
+        choices=["rest", "lab"],
+        help="frame of the four-momenta of a ROOT file (default: %(default)s)",
+    )
+    density.add_argument(
+        "--beta",
+        type=float,
+        default=0.5,
+        help="parent velocity as a fraction of the speed of light (default: %(default)s)",
+    )
+    density.add_argument(
+        "--particles",
+        nargs="+",
+        default=["K", "pi_minus_2", "pi_minus_3", "pi_plus_4"],
+        help="particles whose directions are counted (default: all)",
+    )
+    density.add_argument(
+        "--bands",
+        type=int,
+        default=40,
+        help="number of bands of equal height along z (default: %(default)s)",
+    )
+    density.add_argument(
+        "--sectors",
+        type=int,
+        default=80,
+        help="number of sectors of equal azimuth per band (default: %(default)s)",
+    )
+    density.add_argument(
+        "--render",
+        action="store_true",
+        help="render the density spheres with manim",
+    )
+    density.add_argument(
+        "--mode",
+        default="picture",
+        choices=["picture", "rotation"],
+        help="animation mode of --render (default: %(default)s)",
+    )
+    density.add_argument(
+        "--quality",
+        default="l",
+        help="manim quality: l, m, h, p, k or a quality name (default: %(default)s)",
+    )
+    density.add_argument(
+        "--media-dir",
+        default="media",
+        help="directory manim writes the files to (default: %(default)s)",
+    )
+    density.add_argument(
+        "--log-scale",
+        action="store_true",
+        help="color the spheres by the logarithm of the counts",
+    )
+    density.set_defaults(func=_density)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """
+    Run the graphics-4vecs command.
+
+    Args:
+        argv (sequence of str, optional): Command-line arguments; defaults to
+            ``sys.argv[1:]``.
+
+    Returns:
+        int: Exit status.
+    """
+    from contextlib import ExitStack
+
+    from graphics_4vecs.profile_4vecs import cprofile, profiling, trace_allocations
+
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level="INFO")
+    with ExitStack() as stack:
+        if args.profile or args.profile_report:
+            stack.enter_context(profiling(args.profile_report))
+        if args.tracemalloc:
+            stack.enter_context(trace_allocations())
+        if args.cprofile:
+            stack.enter_context(cprofile(args.cprofile))
+        return int(args.func(args))
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from graphics_4vecs.cache_4vecs import code_version
+from graphics_4vecs.io_4vecs import MANIFEST_SCHEMA_VERSION, MANIFEST_SUFFIX
+from graphics_4vecs.transformations_4vecs import (
+    DEFAULT_STEP_SIZE,
+    SPEED_OF_LIGHT,
+    count_entries,
+    run_pipeline,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from graphics_4vecs.cache_4vecs import ResultCache
+
+log = logging.getLogger("graphics_4vecs")
+
+PART_RECORD = "part.json"
+FRAMES = ("rest", "lab")
+
+
+def expand_inputs(patterns: Iterable[str]) -> list[str]:
+    """
+    Expand input files given as paths, glob patterns or "@list" files.
+
+    Args:
+        patterns (iterable of str): Paths, glob patterns such as
+            "data/*.root" (with "**" matching subdirectories), or "@<file>"
+            for a file listing paths or patterns one per line.
+
+    Returns:
+        list of str: The files in the given order, each pattern sorted,
+        without duplicates.
+    """
+    paths: list[str] = []
+    for pattern in patterns:
+        if pattern.startswith("@"):
+            paths.extend(expand_inputs(Path(pattern[1:]).read_text().split()))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))  # noqa: PTH207
+            if not matches:
+                msg = f"No files match {pattern!r}"
+                raise FileNotFoundError(msg)
+            paths.extend(matches)
+        elif not Path(pattern).is_file():
+            msg = f"No such file: {pattern!r}"
+            raise FileNotFoundError(msg)
+        else:
+            paths.append(pattern)
+    return list(dict.fromkeys(paths))
+
+
+@dataclass
+class DatasetReport:
+    """
+    Outcome of processing a dataset.
+
+    Attributes:
+        num_events (int): Number of events across all parts.
+        processed (list of str): Input files that were processed.
+        reused (list of str): Input files whose parts were up to date.
+        manifests (list of str): Manifests of the rest and lab frame tables.
+    """
+
+    num_events: int = 0
+    processed: list[str] = field(default_factory=list)
+    reused: list[str] = field(default_factory=list)
+    manifests: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        """
+        Describe the outcome in one line.
+        """
+        num_files = len(self.processed) + len(self.reused)
+        return (
+            f"{self.num_events} events in {num_files} files, "
+            f"{len(self.processed)} processed and {len(self.reused)} up to date"
+        )
+
+
+def part_name(source: str | Path) -> str:
+    """
+    Name the part directory of an input file, e.g. "part-run1-1a2b3c4d".
+
+    The name depends on the file alone, not on its position in the inputs,
+    so adding or removing inputs leaves the parts of the others in place.
+
+    Args:
+        source (str): Path of the input file.
+
+    Returns:
+        str: The file name without suffix, reduced to safe characters, and a
+        short hash of the resolved path, which tells apart files of the same
+        name in different directories.
+    """
+    path = Path(source).resolve()
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", path.stem).strip("._") or "input"
+    digest = hashlib.sha256(str(path).encode()).hexdigest()[:8]
+    return f"part-{stem}-{digest}"
+
+
+def _source_record(source: str, params: dict[str, Any]) -> dict[str, Any]:
+    stat = Path(source).stat()
+    return {
+        "source": str(Path(source).resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "params": params,
+    }
+
+
+def _read_part_record(part_dir: Path) -> dict[str, Any] | None:
+    try:
+        record: dict[str, Any] = json.loads((part_dir / PART_RECORD).read_text())
+    except (OSError, ValueError):
+        return None
+    return record
+
+
+def _process_part(
+    source: str,
+    part_dir: str,
+    params: dict[str, Any],
+    cache: ResultCache | None,
+) -> int:
+    """
+    Write the rest and lab frame tables of one input file; run in a worker
+    process.
+
+    Returns:
+        int: Number of events of the file.
+    """
+    Path(part_dir).mkdir(parents=True, exist_ok=True)
+    # The record goes last, so an interrupted part is processed again; the
+    # tables go first, as an empty input writes none
+    (Path(part_dir) / PART_RECORD).unlink(missing_ok=True)
+    for frame in FRAMES:
+        table_path = Path(part_dir) / f"{frame}_frame_data.{params['output_format']}"
+        table_path.unlink(missing_ok=True)
+    run_pipeline(
+        source,
+        params["tree_name"],
+        params["step_size"],
+        params["output_format"],
+        params["compression"],
+        params["v"],
+        precision=params["precision"],
+        cache=cache,
+        output_dir=part_dir,
+    )
+    num_events = count_entries(source, params["tree_name"])
+    record = {**_source_record(source, params), "num_events": num_events}
+    (Path(part_dir) / PART_RECORD).write_text(json.dumps(record, indent=2))
+    return num_events
+
+
+def _write_manifest(path: Path, manifest: dict[str, Any]) -> None:
+    # Written next to the target and renamed, so readers never see half a file
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    tmp_path.replace(path)
+
+
+def run_dataset(
+    inputs: Iterable[str],
+    tree_name: str,
+    output_dir: str | Path,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    output_format: str = "csv",
+    compression: str | None = None,
+    v: float = 0.5 * SPEED_OF_LIGHT,
+    workers: int | None = None,
+    precision: str = "float64",
+    cache: ResultCache | None = None,
+) -> DatasetReport:
+    """
+    Convert many ROOT files into partitioned rest-frame and lab-frame tables.
+
+    Every input file becomes one part, "<part>/rest_frame_data.<format>"
+    and "<part>/lab_frame_data.<format>" with the part directory named by
+    :func:`part_name`, and the files are processed concurrently, one per
+    worker process. "rest_frame_data.manifest.json" and
+    "lab_frame_data.manifest.json" list the parts in input order with their
+    event counts, leaving out inputs without events; all table readers, and
+    so the ``Decay`` scene, treat a manifest as one table with events
+    numbered across the parts.
+
+    Running again only processes files that changed or are new, or all of
+    them if the parameters or the code changed. Inserting or removing an
+    input does not process the others again.
+
+    Args:
+        inputs (iterable of str): ROOT files or rest-frame event stores, glob
+            patterns or "@list" files; see :func:`expand_inputs`.
+        tree_name (str): Name of the tree in the ROOT files.
+        output_dir (str): Directory to write the parts and manifests to.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        output_format (str): Table format of the parts; see ``run_pipeline``.
+        compression (str, optional): Compression codec for the table format.
+        v (float): Velocity of the parent particle in meters per second.
+        workers (int, optional): Number of worker processes; defaults to the
+            number of CPUs. 1 runs in this process.
+        precision (str): "float64" or "float32"; see ``PRECISIONS``.
+        cache (ResultCache, optional): Cache to copy the outputs of files
+            processed before, e.g. for another dataset, from.
+
+    Returns:
+        DatasetReport: Events, processed and reused files, and manifests.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    sources = expand_inputs(inputs)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    params = {
+        "tree_name": tree_name,
+        # Converted to entries by run_pipeline, which knows the input format
+        "step_size": step_size,
+        "output_format": output_format,
+        "compression": compression,
+        "v": v,
+        "precision": precision,
+        "code": code_version(),
+    }
+    part_dirs = [output_dir / part_name(source) for source in sources]
+
+    report = DatasetReport()
+    num_events: dict[int, int] = {}
+    pending = []
+    for i, (source, part_dir) in enumerate(zip(sources, part_dirs, strict=True)):
+        record = _read_part_record(part_dir)
+        if record is not None and {
+            key: record[key] for key in ("source", "size", "mtime_ns", "params")
+        } == _source_record(source, params):
+            num_events[i] = record["num_events"]
+            report.reused.append(source)
+        else:
+            pending.append(i)
+
+    failures: dict[str, Exception] = {}
+    workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+    if workers == 1:
+        for i in pending:
+            try:
+                num_events[i] = _process_part(
+                    sources[i], str(part_dirs[i]), params, cache
+                )
+            except Exception as err:
+                log.error("Processing %s failed: %s", sources[i], err)
+                failures[sources[i]] = err
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures: dict[int, Future[int]] = {
+                i: executor.submit(
+                    _process_part, sources[i], str(part_dirs[i]), params, cache
+                )
+                for i in pending
+            }
+            for i, future in futures.items():
+                try:
+                    num_events[i] = future.result()
+                except Exception as err:
+                    log.error("Processing %s failed: %s", sources[i], err)
+                    failures[sources[i]] = err
+    if failures:
+        # Finished parts are kept, so running again only retries the failures
+        msg = f"{len(failures)} of {len(sources)} files failed: {sorted(failures)}"
+        raise RuntimeError(msg) from next(iter(failures.values()))
+    report.processed = [sources[i] for i in pending]
+
+    event_start = 0
+    parts: list[tuple[str, dict[str, Any]]] = []
+    for i, (source, part_dir) in enumerate(zip(sources, part_dirs, strict=True)):
+        if num_events[i] == 0:
+            # Empty inputs have no tables
+            continue
+        part = {
+            "source": source,
+            "num_events": num_events[i],
+            "event_start": event_start,
+        }
+        parts.append((part_dir.name, part))
+        event_start += num_events[i]
+    report.num_events = event_start
+
+    for frame in FRAMES:
+        table_name = f"{frame}_frame_data"
+        manifest = {
+            "schema_version": MANIFEST_SCHEMA_VERSION,
+            "frame": frame,
+            "format": output_format,
+            "tree_name": tree_name,
+            "velocity": v,
+            "precision": precision,
+            "num_events": report.num_events,
+            "parts": [
+                {"path": f"{name}/{table_name}.{output_format}", **part}
+                for name, part in parts
+            ],
+        }
+        manifest_path = output_dir / f"{table_name}{MANIFEST_SUFFIX}"
+        _write_manifest(manifest_path, manifest)
+        report.manifests.append(str(manifest_path))
+
+    log.info(report.summary())
+    return report
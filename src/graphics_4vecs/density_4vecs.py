@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import logging
+import math
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import numpy.typing as npt
+
+from graphics_4vecs.geometry_4vecs import MOMENTUM_COLUMNS, unit_directions
+from graphics_4vecs.io_4vecs import PARTICLES, entries_per_chunk, iterate_table
+from graphics_4vecs.profile_4vecs import stage
+from graphics_4vecs.transformations_4vecs import (
+    DEFAULT_STEP_SIZE,
+    SPEED_OF_LIGHT,
+    build_lab_frame,
+    iterate_rest_frame,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = logging.getLogger("graphics_4vecs")
+
+# Cells of the default grid subtend about 0.006 sr, or 4.5 by 4.5 degrees at
+# the equator, which stays smooth on a rendered sphere for 10^5 events
+DEFAULT_BANDS = 40
+DEFAULT_SECTORS = 80
+
+
+@dataclass(frozen=True)
+class SphereGrid:
+    """
+    Equal-area grid on the unit sphere.
+
+    The sphere is cut into bands of equal height along z, which by
+    Archimedes' theorem have equal area, and each band into sectors of equal
+    azimuth. Every cell covers ``4 pi / (bands * sectors)`` steradians, so the
+    counts of a uniform distribution are flat and need no solid-angle weights.
+
+    Attributes:
+        bands (int): Number of bands from z = -1 to z = 1.
+        sectors (int): Number of sectors from phi = -pi to phi = pi.
+    """
+
+    bands: int = DEFAULT_BANDS
+    sectors: int = DEFAULT_SECTORS
+
+    def __post_init__(self) -> None:
+        if self.bands < 1 or self.sectors < 1:
+            msg = (
+                f"Invalid sphere grid of {self.bands} bands and {self.sectors} sectors"
+            )
+            raise ValueError(msg)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """
+        Shape of the cells, (bands, sectors).
+        """
+        return self.bands, self.sectors
+
+    @property
+    def cell_area(self) -> float:
+        """
+        Solid angle of one cell in steradians.
+        """
+        return 4 * math.pi / (self.bands * self.sectors)
+
+    @property
+    def z_edges(self) -> npt.NDArray[np.float64]:
+        """
+        Edges of the bands along z.
+        """
+        return np.linspace(-1.0, 1.0, self.bands + 1)
+
+    @property
+    def phi_edges(self) -> npt.NDArray[np.float64]:
+        """
+        Edges of the sectors in azimuth.
+        """
+        return np.linspace(-math.pi, math.pi, self.sectors + 1)
+
+    def index(self, directions: npt.ArrayLike) -> npt.NDArray[np.intp]:
+        """
+        Find the cell of each direction.
+
+        Args:
+            directions (array_like): Unit vectors of shape ``(n, 3)``.
+
+        Returns:
+            np.array: Flat cell index ``band * sectors + sector`` of each
+            direction, or -1 for directions that are not finite.
+        """
+        u = np.asarray(directions, dtype=np.float64)
+        z = np.clip(u[:, 2], -1.0, 1.0)
+        phi = np.arctan2(u[:, 1], u[:, 0])
+        valid = np.isfinite(z) & np.isfinite(phi)
+        # z = 1 and phi = pi fall into the last band and sector
+        with np.errstate(invalid="ignore"):
+            band = np.minimum(np.floor((z + 1.0) * (self.bands / 2.0)), self.bands - 1)
+            sector = np.minimum(
+                np.floor((phi + math.pi) * (self.sectors / (2 * math.pi))),
+                self.sectors - 1,
+            )
+        flat = np.where(valid, band * self.sectors + sector, -1)
+        index: npt.NDArray[np.intp] = flat.astype(np.intp)
+        return index
+
+    def centers(self) -> npt.NDArray[np.float64]:
+        """
+        Unit vectors to the centers of the cells, of shape ``(bands, sectors, 3)``.
+        """
+        z = 0.5 * (self.z_edges[:-1] + self.z_edges[1:])
+        phi = 0.5 * (self.phi_edges[:-1] + self.phi_edges[1:])
+        z, phi = np.meshgrid(z, phi, indexing="ij")
+        rho = np.sqrt(1.0 - z * z)
+        return np.stack([rho * np.cos(phi), rho * np.sin(phi), z], axis=-1)
+
+
+@dataclass
+class DirectionDensity:
+    """
+    Counts of the momentum directions of particles on a sphere grid, filled
+    chunk by chunk.
+
+    The memory and the cost of drawing the result depend on the grid only,
+    not on the number of events, and densities filled from different chunks
+    or files add up exactly.
+
+    Attributes:
+        grid (SphereGrid): Cells the directions are counted in.
+        particles (tuple of str): Particles whose directions are counted.
+        counts (np.array): Number of directions per particle and cell, with
+            shape ``(particles, bands, sectors)``.
+        num_events (int): Number of events filled, including those with a
+            zero momentum, which are in no cell.
+    """
+
+    grid: SphereGrid = field(default_factory=SphereGrid)
+    particles: tuple[str, ...] = PARTICLES
+    counts: npt.NDArray[np.int64] = field(init=False)
+    num_events: int = field(init=False, default=0)
+
+    def __post_init__(self) -> None:
+        unknown = set(self.particles) - set(PARTICLES)
+        if not self.particles or unknown:
+            msg = f"Unknown particles {sorted(unknown)}; choose from {list(PARTICLES)}"
+            raise ValueError(msg)
+        self.counts = np.zeros((len(self.particles), *self.grid.shape), dtype=np.int64)
+
+    def fill(self, momenta: Mapping[str, Any] | Any) -> None:
+        """
+        Add a chunk of events.
+
+        Args:
+            momenta (dict or pd.DataFrame): Columns ``<particle>_px``,
+                ``<particle>_py`` and ``<particle>_pz`` of the particles.
+        """
+        num_cells = self.grid.bands * self.grid.sectors
+        directions = unit_directions(momenta, self.particles)
+        for i, particle in enumerate(self.particles):
+            index = self.grid.index(directions[particle])
+            self.counts[i] += np.bincount(
+                index[index >= 0], minlength=num_cells
+            ).reshape(self.grid.shape)
+        self.num_events += len(directions[self.particles[0]])
+
+    def add(self, other: DirectionDensity) -> None:
+        """
+        Add the counts of a density with the same grid and particles.
+        """
+        if (other.grid, other.particles) != (self.grid, self.particles):
+            msg = "Cannot add direction densities with different grids or particles"
+            raise ValueError(msg)
+        self.counts += other.counts
+        self.num_events += other.num_events
+
+    def density(self) -> npt.NDArray[np.float64]:
+        """
+        Fraction of the directions per steradian in each cell, of the shape
+        of ``counts``; a uniform distribution is ``1 / (4 pi)`` everywhere.
+        """
+        totals = self.counts.sum(axis=(1, 2), keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fractions = self.counts / totals
+        density: npt.NDArray[np.float64] = (
+            np.nan_to_num(fractions) / self.grid.cell_area
+        )
+        return density
+
+    def levels(self, log_scale: bool = False) -> npt.NDArray[np.float64]:
+        """
+        Map the density of each cell to a color level.
+
+        Args:
+            log_scale (bool): Use the logarithm of the counts, which shows
+                sparse cells next to a strong peak.
+
+        Returns:
+            np.array: Values from 0 (no directions) to 1 (the fullest cell of
+            each particle), of the shape of ``counts``.
+        """
+        values = np.log1p(self.counts) if log_scale else self.counts.astype(np.float64)
+        peaks = values.max(axis=(1, 2), keepdims=True)
+        levels: npt.NDArray[np.float64] = np.divide(
+            values, peaks, out=np.zeros_like(values), where=peaks > 0
+        )
+        return levels
+
+
+def fill_direction_density(
+    density: DirectionDensity, frames: Iterable[pd.DataFrame]
+) -> int:
+    """
+    Fill a direction density from chunks of events.
+
+    Args:
+        density (DirectionDensity): Density to fill in place.
+        frames (iterable of pd.DataFrame): Chunks of four-momenta.
+
+    Returns:
+        int: Number of events.
+    """
+    num_events = 0
+    for frame_df in frames:
+        with stage("fill", events=len(frame_df)):
+            density.fill(frame_df)
+        num_events += len(frame_df)
+    return num_events
+
+
+def _iterate_momenta(
+    input_path: str, tree_name: str, step_size: int | str, frame: str, v: float
+) -> Iterator[pd.DataFrame]:
+    if input_path.endswith(".root"):
+        for rest_frame_df in iterate_rest_frame(input_path, tree_name, step_size):
+            yield (
+                rest_frame_df if frame == "rest" else build_lab_frame(rest_frame_df, v)
+            )
+    else:
+        step = entries_per_chunk(step_size, 8 * len(MOMENTUM_COLUMNS))
+        yield from iterate_table(input_path, step, MOMENTUM_COLUMNS)
+
+
+def run_direction_density(
+    input_path: str,
+    grid: SphereGrid | None = None,
+    particles: Iterable[str] = PARTICLES,
+    tree_name: str = "DalitzEventList",
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    frame: str = "lab",
+    v: float = 0.5 * SPEED_OF_LIGHT,
+) -> DirectionDensity:
+    """
+    Count the momentum directions of all events of a file on a sphere grid.
+
+    Only one chunk of events is in memory at a time.
+
+    Args:
+        input_path (str): ROOT file, or rest- or lab-frame table (including
+            event stores and dataset manifests) written by the pipeline.
+            Tables are counted in the frame they were written in.
+        grid (SphereGrid, optional): Cells to count in; defaults to
+            ``SphereGrid()``.
+        particles (iterable of str): Particles whose directions are counted.
+        tree_name (str): Name of the tree in a ROOT file.
+        step_size (int or str): Number of events per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        frame (str): For ROOT files, "lab" to count boosted directions, or
+            "rest".
+        v (float): Velocity of the parent particle in meters per second.
+
+    Returns:
+        DirectionDensity: The filled density.
+    """
+    if frame not in ("rest", "lab"):
+        msg = f"Unknown frame {frame!r}; choose from 'rest' and 'lab'"
+        raise ValueError(msg)
+    density = DirectionDensity(grid or SphereGrid(), tuple(particles))
+    fill_direction_density(
+        density, _iterate_momenta(input_path, tree_name, step_size, frame, v)
+    )
+    return density
+
+
+def save_direction_density(path: str | Path, density: DirectionDensity) -> None:
+    """
+    Write a direction density to an .npz file.
+
+    The file holds "counts", "particles", "num_events" and the grid edges
+    "z_edges" and "phi_edges".
+
+    Args:
+        path (str): Path of the .npz file.
+        density (DirectionDensity): Density to write.
+    """
+    np.savez(
+        path,
+        counts=density.counts,
+        particles=np.array(density.particles),
+        num_events=density.num_events,
+        z_edges=density.grid.z_edges,
+        phi_edges=density.grid.phi_edges,
+    )
+
+
+def load_direction_density(path: str | Path) -> DirectionDensity:
+    """
+    Read a direction density written by :func:`save_direction_density`.
+
+    Args:
+        path (str): Path of the .npz file.
+
+    Returns:
+        DirectionDensity: The density.
+    """
+    with np.load(path) as npz_file:
+        grid = SphereGrid(len(npz_file["z_edges"]) - 1, len(npz_file["phi_edges"]) - 1)
+        density = DirectionDensity(grid, tuple(str(p) for p in npz_file["particles"]))
+        density.counts = npz_file["counts"]
+        density.num_events = int(npz_file["num_events"])
+    return density
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import logging
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from graphics_4vecs.transformations_4vecs import lorentz_boost
+
+# uproot is imported inside write_root_file, so generating events in memory
+# only needs numpy.
+
+log = logging.getLogger("graphics_4vecs")
+
+# Masses in GeV, from the PDG
+D0_MASS = 1.86484
+KAON_MASS = 0.493677
+PION_MASS = 0.13957039
+
+# K+, pi-, pi-, pi+ in the order of PARTICLES, with the branch name prefixes
+# used in the ROOT files of the real data
+DAUGHTER_MASSES = (KAON_MASS, PION_MASS, PION_MASS, PION_MASS)
+BRANCH_PREFIXES = ("_1_K#", "_2_pi~", "_3_pi~", "_4_pi#")
+
+TREE_NAME = "DalitzEventList"
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Sample size and safety margin for estimating the largest phase-space weight
+MAX_WEIGHT_SAMPLES = 1_000_000
+MAX_WEIGHT_MARGIN = 1.05
+
+
+def breakup_momentum(
+    mass: npt.ArrayLike, mass1: npt.ArrayLike, mass2: npt.ArrayLike
+) -> npt.NDArray[np.float64]:
+    """
+    Compute the momentum of the products of a two-body decay in its rest frame.
+
+    Args:
+        mass (array_like): Mass of the decaying system.
+        mass1 (array_like): Mass of the first product.
+        mass2 (array_like): Mass of the second product.
+
+    Returns:
+        np.array: Momentum of either product; zero at threshold.
+    """
+    m = np.asarray(mass, dtype=np.float64)
+    m1 = np.asarray(mass1, dtype=np.float64)
+    m2 = np.asarray(mass2, dtype=np.float64)
+    q2 = (m**2 - (m1 + m2) ** 2) * (m**2 - (m1 - m2) ** 2)
+    momentum: npt.NDArray[np.float64] = np.sqrt(np.maximum(q2, 0)) / (2 * m)
+    return momentum
+
+
+def _random_directions(rng: np.random.Generator, num: int) -> npt.NDArray[np.float64]:
+    cos_theta = rng.uniform(-1, 1, num)
+    sin_theta = np.sqrt(1 - cos_theta**2)
+    phi = rng.uniform(0, 2 * np.pi, num)
+    return np.stack(
+        [sin_theta * np.cos(phi), sin_theta * np.sin(phi), cos_theta], axis=-1
+    )
+
+
+def _four_momenta(
+    momentum: npt.NDArray[np.float64], mass: npt.ArrayLike
+) -> npt.NDArray[np.float64]:
+    energy = np.sqrt(np.asarray(mass) ** 2 + np.sum(momentum**2, axis=-1))
+    return np.concatenate([energy[..., np.newaxis], momentum], axis=-1)
+
+
+def _subsystem_masses(
+    rng: np.random.Generator, num: int, parent_mass: float, masses: tuple[float, ...]
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Draw the invariant masses of the decay chain with the Raubold-Lynch method.
+
+    Returns:
+        tuple: (num, len(masses)) masses of the subsystems of the first 1 ... n
+        particles, and their phase-space weights.
+    """
+    kinetic = parent_mass - sum(masses)
+    fractions = np.sort(rng.uniform(size=(num, len(masses) - 2)), axis=1)
+    chain = np.column_stack(
+        [
+            np.full(num, masses[0]),
+            np.cumsum(masses)[1:-1] + fractions * kinetic,
+            np.full(num, parent_mass),
+        ]
+    )
+    weights = np.prod(
+        breakup_momentum(chain[:, 1:], chain[:, :-1], np.asarray(masses[1:])), axis=1
+    )
+    return chain, weights
+
+
+@cache
+def _max_weight(parent_mass: float, masses: tuple[float, ...]) -> float:
+    """
+    Find the largest phase-space weight of a decay.
+
+    The analytic bound used by GENBOD is several times larger than the true
+    maximum for D0 -> K pi pi pi, which makes accept-reject slow. The maximum
+    is estimated from a fixed sample instead, with a margin, and capped by
+    the analytic bound.
+    """
+    min_mass = 0.0
+    max_mass = parent_mass - sum(masses) + masses[0]
+    bound = 1.0
+    for i in range(1, len(masses)):
+        min_mass += masses[i - 1]
+        max_mass += masses[i]
+        bound *= float(breakup_momentum(max_mass, min_mass, masses[i]))
+
+    _, weights = _subsystem_masses(
+        np.random.default_rng(0), MAX_WEIGHT_SAMPLES, parent_mass, masses
+    )
+    return min(bound, MAX_WEIGHT_MARGIN * float(weights.max()))
+
+
+def _decay_chain(
+    rng: np.random.Generator, chain: npt.NDArray[np.float64], masses: tuple[float, ...]
+) -> npt.NDArray[np.float64]:
+    """
+    Build the four-momenta of events with given subsystem masses.
+
+    Returns:
+        np.array: (num, len(masses), 4) four-momenta in the parent rest frame.
+    """
+    num = len(chain)
+    momenta = np.empty((num, len(masses), 4))
+    for i in range(1, len(masses)):
+        # Particles 0 ... i-1 recoil against particle i in the rest frame of
+        # the subsystem of particles 0 ... i
+        q = breakup_momentum(chain[:, i], chain[:, i - 1], masses[i])
+        direction = q[:, np.newaxis] * _random_directions(rng, num)
+        if i == 1:
+            momenta[:, 0] = _four_momenta(direction, masses[0])
+        else:
+            velocity = direction / np.sqrt(chain[:, i - 1] ** 2 + q**2)[:, np.newaxis]
+            momenta[:, :i] = lorentz_boost(momenta[:, :i], -velocity[:, np.newaxis])
+        momenta[:, i] = _four_momenta(-direction, masses[i])
+    return momenta
+
+
+def generate_phase_space(
+    num_events: int,
+    parent_mass: float = D0_MASS,
+    masses: tuple[float, ...] = DAUGHTER_MASSES,
+    seed: int | np.random.Generator | None = None,
+) -> npt.NDArray[np.float64]:
+    """
+    Generate decays uniformly distributed in phase space.
+
+    The decays are generated in the rest frame of the parent and unweighted by
+    accept-reject, so every event has weight 1.
+
+    Args:
+        num_events (int): Number of decays.
+        parent_mass (float): Mass of the decaying particle in GeV.
+        masses (tuple of float): Masses of the decay products in GeV.
+        seed (int or np.random.Generator, optional): Seed or random generator,
+            for reproducible events.
+
+    Returns:
+        np.array: (num_events, len(masses), 4) four-momenta (E, px, py, pz).
+    """
+    if len(masses) < 2:
+        msg = "Need at least two decay products"
+        raise ValueError(msg)
+    if sum(masses) >= parent_mass:
+        msg = f"A particle of mass {parent_mass} cannot decay into masses {masses}"
+        raise ValueError(msg)
+
+    rng = np.random.default_rng(seed)
+    max_weight = _max_weight(parent_mass, masses)
+
+    # The weights only depend on the subsystem masses, so the momenta are only
+    # built for the accepted events. Candidates are drawn in batches to bound
+    # the memory.
+    events = np.empty((num_events, len(masses), 4))
+    num_accepted = 0
+    efficiency = 0.5  # updated after every batch
+    while num_accepted < num_events:
+        num = int(1.1 * (num_events - num_accepted) / efficiency) + 100
+        num = min(num, DEFAULT_CHUNK_SIZE)
+        chain, weights = _subsystem_masses(rng, num, parent_mass, masses)
+        keep = rng.uniform(0, max_weight, num) < weights
+        efficiency = max(np.count_nonzero(keep) / num, 1e-3)
+        chain = chain[keep][: num_events - num_accepted]
+        events[num_accepted : num_accepted + len(chain)] = _decay_chain(
+            rng, chain, masses
+        )
+        num_accepted += len(chain)
+    return events
+
+
+def write_root_file(
+    path: str | Path,
+    num_events: int,
+    tree_name: str = TREE_NAME,
+    seed: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> str:
+    """
+    Write synthetic D0 -> K+ pi- pi- pi+ decays as a ROOT file like the real data.
+
+    The tree has the branches of the real data ("_1_K#_E", ..., "_4_pi#_Pz",
+    "weight" and "eventNumber"), which ``read_root_file`` reads as
+    "_1_Kplus_E", ..., "_4_piplus_Pz".
+
+    Args:
+        path (str): Path of the ROOT file to write.
+        num_events (int): Number of decays.
+        tree_name (str): Name of the tree.
+        seed (int, optional): Seed for reproducible events.
+        chunk_size (int): Number of events generated and written at a time.
+
+    Returns:
+        str: Path of the ROOT file.
+    """
+    import uproot
+
+    rng = np.random.default_rng(seed)
+    branch_types: dict[str, Any] = {
+        f"{prefix}_{component}": np.float64
+        for prefix in BRANCH_PREFIXES
+        for component in ("E", "Px", "Py", "Pz")
+    }
+    branch_types["weight"] = np.float64
+    branch_types["eventNumber"] = np.int32
+
+    # Random momenta hardly compress, and compressing them is slower than
+    # generating them
+    with uproot.recreate(path, compression=None) as root_file:
+        tree = root_file.mktree(tree_name, branch_types)
+        for start in range(0, num_events, chunk_size):
+            num = min(chunk_size, num_events - start)
+            momenta = generate_phase_space(num, seed=rng)
+            branches: dict[str, Any] = {
+                f"{prefix}_{component}": momenta[:, i, j]
+                for i, prefix in enumerate(BRANCH_PREFIXES)
+                for j, component in enumerate(("E", "Px", "Py", "Pz"))
+            }
+            branches["weight"] = np.ones(num)
+            branches["eventNumber"] = np.arange(start, start + num, dtype=np.int32)
+            tree.extend(branches)
+
+    log.info("Generated %d events in %s", num_events, path)
+    return str(path)
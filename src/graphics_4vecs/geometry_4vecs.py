@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from graphics_4vecs.io_4vecs import PARTICLES, EventSource, entries_per_chunk
+from graphics_4vecs.profile_4vecs import stage
+
+log = logging.getLogger("graphics_4vecs")
+
+# Sizes of the objects in the Decay scene
+SCALING_FACTOR = 1.4  # length of the K and pi arrows
+PARENT_RADIUS = 0.5
+DAUGHTER_LENGTH = 1.0  # length of the arrows to the intermediate daughters
+DAUGHTER_SPHERE_RADIUS = 0.25
+
+# Mesh resolutions (sphere (u, v), arrow) per manim quality. None keeps the
+# manim default sphere resolution, which is what -qh and above render.
+MESH_RESOLUTIONS: dict[str, tuple[tuple[int, int] | None, int]] = {
+    "low_quality": ((12, 6), 4),
+    "medium_quality": ((24, 12), 8),
+    "high_quality": (None, 8),
+    "production_quality": (None, 8),
+    "fourk_quality": (None, 8),
+}
+
+# Vector that the camera direction is made orthogonal to dec1 from
+CAMERA_REFERENCE = (2.0, -1.0, 0.5)
+
+# Below this, a direction (such as the camera direction relative to the
+# reference, or sin(phi)) is too short to recover angles from
+MIN_NORM = 1e-6
+
+MOMENTUM_COLUMNS = [
+    f"{particle}_{component}"
+    for particle in PARTICLES
+    for component in ("px", "py", "pz")
+]
+
+GEOMETRY_DTYPE = np.dtype(
+    [
+        ("daughter1_start", "<f4", (3,)),
+        ("daughter1_end", "<f4", (3,)),
+        ("daughter2_start", "<f4", (3,)),
+        ("daughter2_end", "<f4", (3,)),
+        ("daughter1_center", "<f4", (3,)),
+        ("daughter2_center", "<f4", (3,)),
+        ("K_end", "<f4", (3,)),
+        ("pi_minus_2_end", "<f4", (3,)),
+        ("pi_minus_3_end", "<f4", (3,)),
+        ("pi_plus_4_end", "<f4", (3,)),
+        ("phi", "<f4"),
+        ("theta", "<f4"),
+        ("valid", "?"),
+    ]
+)
+
+
+def _unit(vectors: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)  # type: ignore[no-any-return]
+
+
+def unit_directions(
+    momenta: Mapping[str, Any] | Any, particles: Iterable[str] = PARTICLES
+) -> dict[str, npt.NDArray[np.float64]]:
+    """
+    Normalize the momentum of each particle, as the K and pi arrows of the
+    Decay scene do, for many events.
+
+    Args:
+        momenta (dict or pd.DataFrame): Columns ``<particle>_px``,
+            ``<particle>_py`` and ``<particle>_pz`` for each particle.
+        particles (iterable of str): Particles to normalize.
+
+    Returns:
+        dict: Unit vectors of shape ``(events, 3)`` per particle; NaN for a
+        zero momentum.
+    """
+    return {
+        particle: _unit(
+            np.stack(
+                [
+                    np.asarray(momenta[f"{particle}_{c}"], dtype=np.float64)
+                    for c in ("px", "py", "pz")
+                ],
+                axis=-1,
+            )
+        )
+        for particle in particles
+    }
+
+
+def compute_decay_geometry(
+    momenta: Mapping[str, Any] | Any,
+    reference: npt.ArrayLike = CAMERA_REFERENCE,
+) -> npt.NDArray[Any]:
+    """
+    Compute the positions of all objects of the Decay scene for many events.
+
+    This is the vectorized form of the geometry in ``Decay.construct``: the
+    K and pi arrows are the normalized momenta scaled by ``SCALING_FACTOR``,
+    the daughter arrows point along the summed (K, pi-) and (pi-, pi+) arrows,
+    and the daughter spheres sit at the end of the daughter arrows. The
+    camera looks along the vector orthogonal to the first daughter obtained by
+    Gram-Schmidt from ``reference``.
+
+    Args:
+        momenta (dict or pd.DataFrame): Columns ``<particle>_px``,
+            ``<particle>_py`` and ``<particle>_pz`` for each particle.
+        reference (array_like): Vector the camera direction is built
+            from.
+
+    Returns:
+        np.array: One ``GEOMETRY_DTYPE`` record per event. ``valid`` is False
+        for events with a zero momentum or a camera direction along the z-axis,
+        whose positions or angles are not finite.
+    """
+    vectors = {
+        particle: SCALING_FACTOR * unit_vec
+        for particle, unit_vec in unit_directions(momenta).items()
+    }
+    num_events = len(vectors["K"])
+
+    dec1 = vectors["K"] + vectors["pi_minus_2"]
+    dec2 = vectors["pi_minus_3"] + vectors["pi_plus_4"]
+    dec1_unit_vec = _unit(dec1)
+    dec2_unit_vec = _unit(dec2)
+
+    geometry = np.empty(num_events, dtype=GEOMETRY_DTYPE)
+    geometry["daughter1_start"] = dec1_unit_vec * PARENT_RADIUS
+    geometry["daughter1_end"] = dec1_unit_vec * (PARENT_RADIUS + DAUGHTER_LENGTH)
+    geometry["daughter2_start"] = dec2_unit_vec * PARENT_RADIUS
+    geometry["daughter2_end"] = dec2_unit_vec * (PARENT_RADIUS + DAUGHTER_LENGTH)
+
+    daughter_distance = PARENT_RADIUS + DAUGHTER_LENGTH + DAUGHTER_SPHERE_RADIUS
+    daughter1_center = dec1_unit_vec * daughter_distance
+    daughter2_center = dec2_unit_vec * daughter_distance
+    geometry["daughter1_center"] = daughter1_center
+    geometry["daughter2_center"] = daughter2_center
+
+    # The K and pi- arrows start at daughter 1, the other pions at daughter 2
+    geometry["K_end"] = daughter1_center + vectors["K"]
+    geometry["pi_minus_2_end"] = daughter1_center + vectors["pi_minus_2"]
+    geometry["pi_minus_3_end"] = daughter2_center + vectors["pi_minus_3"]
+    geometry["pi_plus_4_end"] = daughter2_center + vectors["pi_plus_4"]
+
+    # Gram-Schmidt: remove the component of the reference along dec1
+    reference = np.asarray(reference, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        orth_vec = reference - (
+            np.sum(reference * dec1, axis=-1, keepdims=True)
+            * dec1
+            / np.sum(dec1 * dec1, axis=-1, keepdims=True)
+        )
+        orth_norm = np.linalg.norm(orth_vec, axis=-1) / np.linalg.norm(reference)
+        orth_vec = _unit(orth_vec)
+
+        phi = np.arccos(np.clip(orth_vec[:, 2], -1, 1))
+        sin_phi = np.sin(phi)
+        theta = np.arccos(np.clip(orth_vec[:, 0] / sin_phi, -1, 1))
+    geometry["phi"] = phi
+    geometry["theta"] = theta
+
+    positions = np.concatenate(
+        [daughter1_center, daughter2_center, *vectors.values()], axis=-1
+    )
+    geometry["valid"] = (
+        np.all(np.isfinite(positions), axis=-1)
+        & np.isfinite(theta)
+        & (orth_norm > MIN_NORM)
+        & (sin_phi > MIN_NORM)
+    )
+    return geometry
+
+
+def check_decay_geometry(geometry: Any, decay_num: int) -> Any:
+    """
+    Make sure the scene geometry of a decay can be rendered.
+
+    Args:
+        geometry (np.void): ``GEOMETRY_DTYPE`` record of the decay.
+        decay_num (int): Number of the decay, for the error message.
+
+    Returns:
+        np.void: The record, if it is valid.
+    """
+    if not geometry["valid"]:
+        msg = (
+            f"Decay {decay_num} has a degenerate geometry (a zero momentum or a "
+            "camera direction along the z-axis) and cannot be rendered"
+        )
+        raise ValueError(msg)
+    return geometry
+
+
+def write_geometry_table(
+    table_path: str | Path,
+    geometry_path: str | Path,
+    step_size: int | str = "100 MB",
+    reference: npt.ArrayLike = CAMERA_REFERENCE,
+) -> int:
+    """
+    Precompute the scene geometry of every event of a table into a .npy file.
+
+    The table is processed in chunks and the result can be opened with
+    ``np.load(geometry_path, mmap_mode="r")`` to look up single events.
+
+    Args:
+        table_path (str): Lab- or rest-frame table written by the pipeline.
+        geometry_path (str): Path of the .npy file to write.
+        step_size (int or str): Number of events per chunk, or a memory size
+            per chunk such as "100 MB".
+        reference (array_like): Vector the camera direction is built
+            from.
+
+    Returns:
+        int: Number of events without a valid geometry.
+    """
+    source = EventSource(table_path, MOMENTUM_COLUMNS)
+    step = entries_per_chunk(step_size, 8 * len(MOMENTUM_COLUMNS))
+
+    # open_memmap is only typed in newer numpy releases
+    geometry = np.lib.format.open_memmap(  # type: ignore[no-untyped-call,unused-ignore]
+        geometry_path, mode="w+", dtype=GEOMETRY_DTYPE, shape=(len(source),)
+    )
+    for start in range(0, len(source), step):
+        rows = range(start, min(start + step, len(source)))
+        momenta = source.read(rows)
+        with stage("geometry", events=len(rows)):
+            geometry[rows.start : rows.stop] = compute_decay_geometry(
+                momenta, reference
+            )
+    geometry.flush()
+
+    num_invalid = int(np.count_nonzero(~geometry["valid"]))
+    if num_invalid:
+        log.warning(
+            "%d of %d events have a degenerate geometry", num_invalid, len(geometry)
+        )
+    return num_invalid
+
+
+def mesh_resolution(quality: str | None) -> tuple[tuple[int, int] | None, int]:
+    """
+    Look up the level of detail of the meshes for a render quality.
+
+    Args:
+        quality (str, optional): Manim quality name such as "low_quality";
+            unknown or custom qualities use the finest meshes.
+
+    Returns:
+        tuple: Sphere resolution (or None for the manim default) and arrow
+        resolution.
+    """
+    return MESH_RESOLUTIONS.get(quality or "", MESH_RESOLUTIONS["high_quality"])
+
+
+def rotation_from_z(direction: npt.ArrayLike) -> tuple[float, npt.NDArray[np.float64]]:
+    """
+    Find the rotation that turns the z-axis into a direction.
+
+    Args:
+        direction (array_like): Target direction, need not be normalized.
+
+    Returns:
+        tuple: Rotation angle in radians and the unit rotation axis.
+    """
+    unit = np.asarray(direction, dtype=np.float64)
+    unit = unit / np.linalg.norm(unit)
+    axis = np.cross([0.0, 0.0, 1.0], unit)
+    sin_angle = np.linalg.norm(axis)
+    angle = float(np.arctan2(sin_angle, unit[2]))
+    if sin_angle < MIN_NORM:
+        # Along the z-axis: any axis orthogonal to it turns z into -z
+        return angle, np.array([1.0, 0.0, 0.0])
+    return angle, axis / sin_angle
@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import logging
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import numpy.typing as npt
+
+from graphics_4vecs.io_4vecs import PARTICLES, entries_per_chunk
+from graphics_4vecs.profile_4vecs import stage
+from graphics_4vecs.transformations_4vecs import (
+    DEFAULT_STEP_SIZE,
+    KINEMATICS_COLUMNS,
+    SPEED_OF_LIGHT,
+    build_kinematics,
+    build_lab_frame,
+    chunk_bytes_per_event,
+    count_entries,
+    iterate_rest_frame,
+    iterate_scan,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    import pandas as pd
+
+log = logging.getLogger("graphics_4vecs")
+
+# Quantities derived from the momentum of each particle, e.g. "K_p"
+MOMENTUM_QUANTITIES = ("p", "pt", "theta", "phi")
+
+
+@dataclass(frozen=True)
+class Axis:
+    """
+    Fixed binning of one quantity.
+
+    Attributes:
+        quantity (str): Column of the frame table (e.g. "K_px"), kinematic
+            variable (e.g. "s_12") or momentum quantity (e.g. "K_pt").
+        bins (int): Number of bins between low and high.
+        low (float): Lower edge of the first bin.
+        high (float): Upper edge of the last bin.
+    """
+
+    quantity: str
+    bins: int
+    low: float
+    high: float
+
+    def __post_init__(self) -> None:
+        if self.bins < 1 or not self.low < self.high:
+            msg = f"Invalid binning for {self.quantity}: {self.bins} bins from {self.low} to {self.high}"
+            raise ValueError(msg)
+
+    @property
+    def edges(self) -> npt.NDArray[np.float64]:
+        """
+        Bin edges, without the underflow and overflow bins.
+        """
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+    def index(self, values: npt.ArrayLike) -> npt.NDArray[np.intp]:
+        """
+        Find the bin of each value; 0 is underflow and bins + 1 overflow.
+        """
+        x = np.asarray(values, dtype=np.float64)
+        scaled = (x - self.low) * (self.bins / (self.high - self.low))
+        # NaN goes to the overflow bin
+        scaled = np.where(np.isnan(scaled), self.bins, scaled)
+        index: npt.NDArray[np.intp] = (
+            np.clip(np.floor(scaled), -1, self.bins).astype(np.intp) + 1
+        )
+        return index
+
+
+@dataclass
+class Histogram:
+    """
+    Histogram with fixed binning that is filled chunk by chunk.
+
+    The counts include an underflow and an overflow bin along every axis, so
+    no event is lost, and histograms filled from different chunks or worker
+    processes add up exactly.
+
+    Attributes:
+        axes (tuple of Axis): One axis per dimension.
+        counts (np.array): Number of events per bin, with shape
+            ``(bins + 2, ...)`` along every axis.
+    """
+
+    axes: tuple[Axis, ...]
+    counts: npt.NDArray[np.int64] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.counts = np.zeros([axis.bins + 2 for axis in self.axes], dtype=np.int64)
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the histogram, e.g. "s_12_vs_s_34".
+        """
+        return "_vs_".join(axis.quantity for axis in self.axes)
+
+    def fill(self, quantities: Mapping[str, npt.ArrayLike]) -> None:
+        """
+        Add a chunk of events.
+
+        Args:
+            quantities (dict or pd.DataFrame): Values of the quantities of
+                all axes, one entry per event.
+        """
+        indices = [axis.index(quantities[axis.quantity]) for axis in self.axes]
+        flat = np.ravel_multi_index(indices, self.counts.shape)
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(
+            self.counts.shape
+        )
+
+    def add(self, other: Histogram) -> None:
+        """
+        Add the counts of a histogram with the same axes, e.g. from a worker.
+        """
+        if other.axes != self.axes:
+            msg = f"Cannot add histograms {other.name} and {self.name} with different axes"
+            raise ValueError(msg)
+        self.counts += other.counts
+
+
+def parse_histogram(spec: str) -> Histogram:
+    """
+    Parse a histogram definition such as "K_p:100:0:2" or "s_12:50:0:3,s_34:50:0:3".
+
+    Args:
+        spec (str): Comma-separated axes, each written quantity:bins:low:high.
+
+    Returns:
+        Histogram: Empty histogram with these axes.
+    """
+    axes = []
+    for raw_axis in spec.split(","):
+        parts = raw_axis.strip().split(":")
+        if len(parts) != 4:
+            msg = f"Cannot interpret {raw_axis!r} as quantity:bins:low:high"
+            raise ValueError(msg)
+        quantity, bins, low, high = parts
+        axes.append(Axis(quantity, int(bins), float(low), float(high)))
+    return Histogram(tuple(axes))
+
+
+def compute_quantities(
+    frame_df: pd.DataFrame, names: Iterable[str]
+) -> dict[str, npt.NDArray[np.float64]]:
+    """
+    Compute the quantities histograms are filled with for a chunk of events.
+
+    Args:
+        frame_df (pd.DataFrame): Rest- or lab-frame four-momenta.
+        names (iterable of str): Columns of ``frame_df``, kinematic variables
+            (see ``KINEMATICS_COLUMNS``) or momentum quantities
+            "<particle>_p", "_pt", "_theta" and "_phi".
+
+    Returns:
+        dict: One array per quantity.
+    """
+    names = set(names)
+    quantities: dict[str, npt.NDArray[np.float64]] = {}
+    if names & set(KINEMATICS_COLUMNS):
+        kinematics = build_kinematics(frame_df)
+        quantities.update(
+            {name: kinematics[name].to_numpy() for name in names & set(kinematics)}
+        )
+
+    for name in names - set(quantities):
+        if name in frame_df:
+            quantities[name] = frame_df[name].to_numpy()
+            continue
+        particle, _, quantity = name.rpartition("_")
+        if particle not in PARTICLES or quantity not in MOMENTUM_QUANTITIES:
+            msg = f"Unknown quantity {name!r}"
+            raise KeyError(msg)
+        px, py, pz = (
+            frame_df[f"{particle}_{c}"].to_numpy() for c in ("px", "py", "pz")
+        )
+        pt = np.hypot(px, py)
+        if quantity == "p":
+            quantities[name] = np.hypot(pt, pz)
+        elif quantity == "pt":
+            quantities[name] = pt
+        elif quantity == "theta":
+            quantities[name] = np.arctan2(pt, pz)
+        else:
+            quantities[name] = np.arctan2(py, px)
+    return quantities
+
+
+def fill_histograms(
+    histograms: Sequence[Histogram], frames: Iterable[pd.DataFrame]
+) -> int:
+    """
+    Fill histograms from chunks of events.
+
+    Args:
+        histograms (sequence of Histogram): Histograms to fill in place.
+        frames (iterable of pd.DataFrame): Chunks of four-momenta.
+
+    Returns:
+        int: Number of events.
+    """
+    names = {axis.quantity for histogram in histograms for axis in histogram.axes}
+    num_events = 0
+    for frame_df in frames:
+        with stage("fill", events=len(frame_df)):
+            quantities = compute_quantities(frame_df, names)
+            for histogram in histograms:
+                histogram.fill(quantities)
+        num_events += len(frame_df)
+    return num_events
+
+
+def _iterate_frames(
+    root_file_path: str,
+    tree_name: str,
+    step_size: int | str,
+    frame: str,
+    v: float,
+    entry_start: int | None = None,
+    entry_stop: int | None = None,
+) -> Iterator[pd.DataFrame]:
+    for rest_frame_df in iterate_rest_frame(
+        root_file_path, tree_name, step_size, entry_start, entry_stop
+    ):
+        yield rest_frame_df if frame == "rest" else build_lab_frame(rest_frame_df, v)
+
+
+def _fill_entry_range(
+    root_file_path: str,
+    tree_name: str,
+    entry_start: int,
+    entry_stop: int,
+    step: int,
+    frame: str,
+    v: float,
+    axes: list[tuple[Axis, ...]],
+) -> tuple[list[Histogram], int]:
+    """
+    Fill empty histograms from one range of entries; run in a worker process.
+    """
+    histograms = [Histogram(histogram_axes) for histogram_axes in axes]
+    frames = _iterate_frames(
+        root_file_path, tree_name, step, frame, v, entry_start, entry_stop
+    )
+    return histograms, fill_histograms(histograms, frames)
+
+
+def run_histograms(
+    root_file_path: str,
+    tree_name: str,
+    histograms: Sequence[Histogram],
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    frame: str = "lab",
+    v: float = 0.5 * SPEED_OF_LIGHT,
+    workers: int = 1,
+) -> int:
+    """
+    Fill histograms from a ROOT file without writing the frame tables.
+
+    Only one chunk of events per worker is in memory at a time. With several
+    workers, each range of entries fills its own histograms, which are added
+    up as they arrive.
+
+    Args:
+        root_file_path (str): Path to the ROOT file or rest-frame event store.
+        tree_name (str): Name of the tree in the ROOT file.
+        histograms (sequence of Histogram): Histograms to fill in place.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        frame (str): "lab" to fill with boosted four-momenta, or "rest".
+        v (float): Velocity of the parent particle in meters per second.
+        workers (int): Number of worker processes; 1 runs in this process.
+
+    Returns:
+        int: Number of events.
+    """
+    if frame not in ("rest", "lab"):
+        msg = f"Unknown frame {frame!r}; choose from 'rest' and 'lab'"
+        raise ValueError(msg)
+    step = entries_per_chunk(step_size, chunk_bytes_per_event(root_file_path))
+    if workers <= 1:
+        frames = _iterate_frames(root_file_path, tree_name, step, frame, v)
+        return fill_histograms(histograms, frames)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Each range covers several chunks so the partial histograms sent back
+    # are few compared to the events filled
+    range_size = step * 8
+    num_entries = count_entries(root_file_path, tree_name)
+    axes = [histogram.axes for histogram in histograms]
+    num_events = 0
+
+    def merge(future: Future[tuple[list[Histogram], int]]) -> None:
+        nonlocal num_events
+        partial, num = future.result()
+        for histogram, part in zip(histograms, partial, strict=True):
+            histogram.add(part)
+        num_events += num
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque[Future[tuple[list[Histogram], int]]] = deque()
+        for entry_start in range(0, num_entries, range_size):
+            pending.append(
+                executor.submit(
+                    _fill_entry_range,
+                    root_file_path,
+                    tree_name,
+                    entry_start,
+                    min(entry_start + range_size, num_entries),
+                    step,
+                    frame,
+                    v,
+                    axes,
+                )
+            )
+            if len(pending) >= 2 * workers:
+                merge(pending.popleft())
+        while pending:
+            merge(pending.popleft())
+    return num_events
+
+
+def run_histogram_scan(
+    root_file_path: str,
+    tree_name: str,
+    histograms: Sequence[Histogram],
+    velocities: npt.ArrayLike,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+) -> list[list[Histogram]]:
+    """
+    Fill lab-frame histograms for a grid of velocities, reading the input once.
+
+    Args:
+        root_file_path (str): Path to the ROOT file or rest-frame event store.
+        tree_name (str): Name of the tree in the ROOT file.
+        histograms (sequence of Histogram): Histograms defining the axes;
+            they are left empty.
+        velocities (array_like): Velocities of the parent particle in meters
+            per second.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+
+    Returns:
+        list: For each velocity, histograms with the axes of ``histograms``.
+    """
+    velocities = np.atleast_1d(velocities)
+    scan = [[Histogram(h.axes) for h in histograms] for _ in velocities]
+    names = {axis.quantity for histogram in histograms for axis in histogram.axes}
+    for _, lab_frame_dfs in iterate_scan(
+        root_file_path, tree_name, velocities, step_size
+    ):
+        for velocity_histograms, lab_frame_df in zip(scan, lab_frame_dfs, strict=True):
+            with stage("fill", events=len(lab_frame_df)):
+                quantities = compute_quantities(lab_frame_df, names)
+                for histogram in velocity_histograms:
+                    histogram.fill(quantities)
+    return scan
+
+
+def save_histograms(path: str | Path, histograms: Sequence[Histogram]) -> None:
+    """
+    Write histograms to an .npz file.
+
+    Each histogram is stored as "<name>" with its counts, including underflow
+    and overflow bins, and "<name>_edges<i>" with the edges of axis i.
+
+    Args:
+        path (str): Path of the .npz file.
+        histograms (sequence of Histogram): Histograms to write.
+    """
+    arrays: dict[str, Any] = {}
+    for histogram in histograms:
+        arrays[histogram.name] = histogram.counts
+        for i, axis in enumerate(histogram.axes):
+            arrays[f"{histogram.name}_edges{i}"] = axis.edges
+    np.savez(path, **arrays)
+
+
+def load_histograms(path: str | Path) -> dict[str, Histogram]:
+    """
+    Read histograms written by :func:`save_histograms`.
+
+    Args:
+        path (str): Path of the .npz file.
+
+    Returns:
+        dict: Histograms by name.
+    """
+    histograms = {}
+    with np.load(path) as npz_file:
+        for name in npz_file.files:
+            if "_edges" in name:
+                continue
+            counts = npz_file[name]
+            quantities = name.split("_vs_")
+            axes = []
+            for i, quantity in enumerate(quantities):
+                edges = npz_file[f"{name}_edges{i}"]
+                axes.append(
+                    Axis(quantity, len(edges) - 1, float(edges[0]), float(edges[-1]))
+                )
+            histogram = Histogram(tuple(axes))
+            histogram.counts = counts
+            histograms[name] = histogram
+    return histograms
@@ -0,0 +1,1088 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import re
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from graphics_4vecs.profile_4vecs import iterate_stage, stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = logging.getLogger("graphics_4vecs")
+
+PARTICLES = ("K", "pi_minus_2", "pi_minus_3", "pi_plus_4")
+COMPONENTS = ("E", "px", "py", "pz")
+FRAME_COLUMNS = [
+    f"{particle}_{component}" for particle in PARTICLES for component in COMPONENTS
+]
+
+# One record per event holding the (E, px, py, pz) four-vector of each particle,
+# laid out in the same order as FRAME_COLUMNS
+EVENT_DTYPE = np.dtype([(particle, "<f8", (4,)) for particle in PARTICLES])
+# The same layout in single precision, for tables written in float32
+COMPACT_EVENT_DTYPE = np.dtype([(particle, "<f4", (4,)) for particle in PARTICLES])
+
+STORE_SUFFIX = ".evstore"
+STORE_MAGIC = b"G4VSTORE"
+STORE_HEADER_SIZE = 4096
+STORE_SCHEMA_VERSION = 1
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_SCHEMA_VERSION = 1
+
+
+def _import_pyarrow() -> Any:
+    """
+    Import pyarrow, which is only needed for the Parquet and Feather formats.
+
+    Returns:
+        module: The pyarrow module.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as err:
+        msg = (
+            "pyarrow is required for the Parquet and Feather formats; "
+            "install graphics_4vecs[parquet] or use another format"
+        )
+        raise ImportError(msg) from err
+    return pa
+
+
+def _float_dtype(df: pd.DataFrame) -> np.dtype[Any] | None:
+    """
+    Find the float type shared by all columns of a table, if there is one.
+    """
+    dtypes = set(df.dtypes)
+    if len(dtypes) != 1:
+        return None
+    dtype = np.dtype(dtypes.pop())
+    return dtype if dtype.kind == "f" else None
+
+
+def _record_batch(pa: Any, df: pd.DataFrame) -> Any:
+    """
+    Convert a table into an Arrow record batch.
+
+    Float tables built from an (events, columns) array are transposed in one
+    pass, which is much faster than letting Arrow gather every column from the
+    interleaved rows.
+
+    Args:
+        pa (module): The pyarrow module.
+        df (pd.DataFrame): Table to convert.
+
+    Returns:
+        pa.RecordBatch: The table, with the same schema as
+        ``pa.RecordBatch.from_pandas``.
+    """
+    dtype = _float_dtype(df)
+    if dtype is None:
+        return pa.RecordBatch.from_pandas(df, preserve_index=False)
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    columns = np.ascontiguousarray(df.to_numpy(dtype=dtype).T)
+    return pa.RecordBatch.from_arrays(list(columns), schema=schema)
+
+
+class TableSink:
+    """
+    Write a table to disk one chunk at a time.
+
+    Subclasses implement :meth:`write` and :meth:`close` for one file format.
+    Sinks are context managers, so the file is finalized when the block ends.
+
+    Args:
+        path (str): Path of the output file.
+        compression (str, optional): Compression codec, with the meaning of
+            the underlying writer of each format.
+        metadata (dict, optional): Provenance such as the source file and tree
+            name, recorded by formats that have a header for it.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        compression: str | None = None,
+        metadata: dict[str, str] | None = None,
+    ) -> None:
+        self._path = Path(path)
+        self._compression = compression
+        self._metadata = metadata or {}
+
+    @property
+    def path(self) -> Path:
+        """
+        Path of the output file.
+        """
+        return self._path
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append a chunk of rows to the output.
+
+        Args:
+            df (pd.DataFrame): Chunk to write. Every chunk must have the same
+                columns.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        Finalize the output file.
+        """
+
+    def __enter__(self) -> TableSink:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        with stage("write") as writing:
+            self.close()
+        if self._path.exists():
+            writing.add(bytes_written=self._path.stat().st_size)
+
+
+class CsvSink(TableSink):
+    """
+    Write a table as CSV. Compression is any codec pandas supports, e.g.
+    "gzip"; by default it is inferred from the suffix, e.g. ".csv.gz".
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        compression: str | None = None,
+        metadata: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(path, compression, metadata)
+        self._first_chunk = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(  # type: ignore[call-overload]
+            self._path,
+            mode="w" if self._first_chunk else "a",
+            header=self._first_chunk,
+            index=False,
+            compression=self._compression or "infer",
+        )
+        self._first_chunk = False
+
+
+class ParquetSink(TableSink):
+    """
+    Write a table as Parquet, one row group per chunk. Compression is a
+    Parquet codec such as "snappy" (default), "zstd" or "none".
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        compression: str | None = None,
+        metadata: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(path, compression, metadata)
+        self._writer: Any = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        pa = _import_pyarrow()
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_batches([_record_batch(pa, df)])
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(
+                self._path, table.schema, compression=self._compression or "snappy"
+            )
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class FeatherSink(TableSink):
+    """
+    Write a table as Feather (Arrow IPC file), one record batch per chunk.
+    Compression is "lz4", "zstd" or None for uncompressed buffers that can be
+    memory-mapped on read.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        compression: str | None = None,
+        metadata: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(path, compression, metadata)
+        self._writer: Any = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        pa = _import_pyarrow()
+
+        batch = _record_batch(pa, df)
+        if self._writer is None:
+            options = pa.ipc.IpcWriteOptions(compression=self._compression)
+            self._writer = pa.ipc.new_file(
+                str(self._path), batch.schema, options=options
+            )
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class NpzSink(TableSink):
+    """
+    Write a table as a NumPy .npz archive with one array per column.
+
+    The archive is written when the sink is closed, so all chunks are kept in
+    memory until then. Any compression value selects ``np.savez_compressed``.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        compression: str | None = None,
+        metadata: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(path, compression, metadata)
+        self._chunks: list[pd.DataFrame] = []
+
+    def write(self, df: pd.DataFrame) -> None:
+        self._chunks.append(df)
+
+    def close(self) -> None:
+        if not self._chunks:
+            return
+        import pandas as pd
+
+        df = pd.concat(self._chunks, ignore_index=True)
+        columns: dict[str, Any] = {
+            column: df[column].to_numpy() for column in df.columns
+        }
+        savez = np.savez_compressed if self._compression else np.savez
+        with self._path.open("wb") as npz_file:
+            savez(npz_file, **columns)
+        self._chunks = []
+
+
+class NpySink(TableSink):
+    """
+    Write a table as a NumPy .npy structured array with one record per row.
+
+    The array is written when the sink is closed, so all chunks are kept in
+    memory until then. The format has no compression.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        compression: str | None = None,
+        metadata: dict[str, str] | None = None,
+    ) -> None:
+        if compression is not None:
+            msg = "The .npy format does not support compression"
+            raise ValueError(msg)
+        super().__init__(path, compression, metadata)
+        self._chunks: list[np.ndarray[Any, Any]] = []
+
+    def write(self, df: pd.DataFrame) -> None:
+        dtype = _float_dtype(df)
+        if dtype is not None:
+            # A float table is one 2D block that can be viewed as records
+            # instead of being copied column by column
+            values = np.ascontiguousarray(df.to_numpy(dtype=dtype.newbyteorder("<")))
+            records = np.dtype([(str(column), values.dtype) for column in df.columns])
+            self._chunks.append(values.view(records).reshape(len(df)))
+        else:
+            self._chunks.append(df.to_records(index=False))
+
+    def close(self) -> None:
+        if not self._chunks:
+            return
+        np.save(self._path, np.concatenate(self._chunks))
+        self._chunks = []
+
+
+class StoreSink(TableSink):
+    """
+    Write four-momentum tables into a memory-mappable event store.
+
+    The store is a fixed-size JSON header followed by one ``EVENT_DTYPE``
+    record per event, or one ``COMPACT_EVENT_DTYPE`` record if the first
+    chunk is in float32. Records are appended as chunks arrive and the header
+    is rewritten with the event count on close. Only tables with the
+    ``FRAME_COLUMNS`` columns can be stored, and there is no compression.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        compression: str | None = None,
+        metadata: dict[str, str] | None = None,
+    ) -> None:
+        if compression is not None:
+            msg = "The event store does not support compression"
+            raise ValueError(msg)
+        super().__init__(path, compression, metadata)
+        self._num_events = 0
+        self._dtype = EVENT_DTYPE
+        self._file = self._path.open("wb")
+        self._write_header()
+
+    def _write_header(self) -> None:
+        header = {
+            **self._metadata,
+            "schema_version": STORE_SCHEMA_VERSION,
+            "num_events": self._num_events,
+            "dtype": self._dtype.descr,
+        }
+        encoded = STORE_MAGIC + json.dumps(header).encode()
+        if len(encoded) > STORE_HEADER_SIZE:
+            msg = "Event store metadata does not fit in the header"
+            raise ValueError(msg)
+        self._file.seek(0)
+        self._file.write(encoded.ljust(STORE_HEADER_SIZE, b" "))
+
+    def write(self, df: pd.DataFrame) -> None:
+        if list(df.columns) != FRAME_COLUMNS:
+            msg = f"The event store needs the columns {FRAME_COLUMNS}"
+            raise ValueError(msg)
+        if self._num_events == 0 and _float_dtype(df) == np.float32:
+            self._dtype = COMPACT_EVENT_DTYPE
+        values = df.to_numpy(dtype=self._dtype[PARTICLES[0]].base)
+        records = np.ascontiguousarray(values)
+        self._file.seek(0, 2)
+        self._file.write(records.data)
+        self._num_events += len(df)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._write_header()
+        self._file.close()
+
+
+class EventStore:
+    """
+    Read-only, zero-copy view of an event store written by :class:`StoreSink`.
+
+    Args:
+        path (str): Path of the event store.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path)
+        with self._path.open("rb") as store_file:
+            raw_header = store_file.read(STORE_HEADER_SIZE)
+        if not raw_header.startswith(STORE_MAGIC):
+            msg = f"{path} is not an event store"
+            raise ValueError(msg)
+        self.header: dict[str, Any] = json.loads(raw_header[len(STORE_MAGIC) :])
+        if self.header["schema_version"] != STORE_SCHEMA_VERSION:
+            msg = (
+                f"{path} has schema version {self.header['schema_version']}, "
+                f"expected {STORE_SCHEMA_VERSION}"
+            )
+            raise ValueError(msg)
+
+        # The record layout comes from the header: float64 or float32
+        dtype = np.dtype(
+            [(name, fmt, tuple(shape)) for name, fmt, shape in self.header["dtype"]]
+        )
+        num_events = self.header["num_events"]
+        if num_events:
+            self.events: np.ndarray[Any, Any] = np.memmap(
+                self._path,
+                dtype=dtype,
+                mode="r",
+                offset=STORE_HEADER_SIZE,
+                shape=(num_events,),
+            )
+        else:
+            self.events = np.empty(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self.events[index]
+
+    def to_frame(
+        self, rows: Any = None, columns: Sequence[str] | None = None
+    ) -> pd.DataFrame:
+        """
+        Build a four-momentum table from (a selection of) the events.
+
+        Args:
+            rows (optional): Event numbers, slice or boolean mask; all events
+                by default.
+            columns (sequence of str, optional): Only include these columns.
+
+        Returns:
+            pd.DataFrame: Table with the ``FRAME_COLUMNS`` layout. For a slice
+            of rows the columns are views into the memory-mapped file.
+        """
+        import pandas as pd
+
+        events = self.events if rows is None else self.events[rows]
+        flat = events.view(events.dtype[0].base).reshape(
+            len(events), len(FRAME_COLUMNS)
+        )
+        df = pd.DataFrame(flat, columns=FRAME_COLUMNS, copy=False)
+        return df if columns is None else df[list(columns)]
+
+    def iterate(
+        self,
+        step_size: int | str,
+        entry_start: int | None = None,
+        entry_stop: int | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yield the events as four-momentum tables in chunks.
+
+        Args:
+            step_size (int or str): Number of events per chunk, or a memory
+                size per chunk such as "100 MB".
+            entry_start (int, optional): First event to read.
+            entry_stop (int, optional): Event to stop before.
+
+        Yields:
+            pd.DataFrame: Table of one chunk of events.
+        """
+        # Memory sizes count the events as stored, float64 or float32
+        step = entries_per_chunk(step_size, self.events.dtype.itemsize)
+        entry_start, entry_stop, _ = slice(entry_start, entry_stop).indices(len(self))
+        chunks = (
+            self.to_frame(slice(start, min(start + step, entry_stop)))
+            for start in range(entry_start, entry_stop, step)
+        )
+        yield from iterate_stage(
+            "read", chunks, nbytes=lambda df: len(df) * self.events.dtype.itemsize
+        )
+
+
+def open_store(path: str | Path) -> EventStore:
+    """
+    Open an event store for zero-copy random access.
+
+    Args:
+        path (str): Path of the event store.
+
+    Returns:
+        EventStore: The memory-mapped events and their header.
+    """
+    return EventStore(path)
+
+
+def parse_size(size: int | str) -> int:
+    """
+    Convert a memory size into bytes.
+
+    Args:
+        size (int or str): Number of bytes, or a size such as "100 MB" or
+            "1 GiB".
+
+    Returns:
+        int: Number of bytes.
+    """
+    if isinstance(size, int):
+        return size
+
+    match = re.fullmatch(r"\s*([0-9.]+)\s*(B|kB|KB|MB|GB|TB|KiB|MiB|GiB|TiB)?\s*", size)
+    if match is None:
+        msg = f"Cannot interpret {size!r} as a memory size"
+        raise ValueError(msg)
+    units = {
+        "B": 1,
+        "kB": 1000,
+        "KB": 1000,
+        "MB": 1000**2,
+        "GB": 1000**3,
+        "TB": 1000**4,
+        "KiB": 1024,
+        "MiB": 1024**2,
+        "GiB": 1024**3,
+        "TiB": 1024**4,
+    }
+    return int(float(match.group(1)) * units[match.group(2) or "B"])
+
+
+def entries_per_chunk(step_size: int | str, itemsize: int) -> int:
+    """
+    Convert a chunk size into a number of entries.
+
+    Args:
+        step_size (int or str): Number of entries, or a memory size such as
+            "100 MB" or "1 GiB"; see :func:`parse_size`.
+        itemsize (int): Size of one entry in bytes.
+
+    Returns:
+        int: Number of entries per chunk, at least one.
+    """
+    if isinstance(step_size, int):
+        return max(step_size, 1)
+    try:
+        num_bytes = parse_size(step_size)
+    except ValueError:
+        msg = f"Cannot interpret {step_size!r} as a chunk size"
+        raise ValueError(msg) from None
+    return max(num_bytes // itemsize, 1)
+
+
+SINKS: dict[str, type[TableSink]] = {
+    "csv": CsvSink,
+    "parquet": ParquetSink,
+    "feather": FeatherSink,
+    "npz": NpzSink,
+    "npy": NpySink,
+    "evstore": StoreSink,
+}
+
+SUFFIXES: dict[str, str] = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".npz": "npz",
+    ".npy": "npy",
+    STORE_SUFFIX: "evstore",
+}
+
+
+def infer_format(path: str | Path) -> str:
+    """
+    Infer the table format from a file name.
+
+    Args:
+        path (str): Path of the table file. Compression suffixes after ".csv",
+            e.g. ".csv.gz", are recognized.
+
+    Returns:
+        str: One of the keys of ``SINKS``, or "manifest" for a dataset
+        manifest (see :func:`read_manifest`).
+    """
+    if str(path).endswith(MANIFEST_SUFFIX):
+        return "manifest"
+    for suffix in reversed(Path(path).suffixes):
+        if suffix.lower() in SUFFIXES:
+            return SUFFIXES[suffix.lower()]
+    msg = f"Cannot infer the table format of {path}; pass one of {sorted(SINKS)}"
+    raise ValueError(msg)
+
+
+def read_manifest(path: str | Path) -> dict[str, Any]:
+    """
+    Read the manifest of a partitioned table, e.g. "lab_frame_data.manifest.json".
+
+    A manifest lists the parts of one logical table in order, each a table
+    file of the manifest's "format" with its "num_events" and "event_start",
+    the global number of its first event. Readers of tables accept manifests
+    in place of a table file and number the events across all parts.
+
+    Args:
+        path (str): Path of the manifest.
+
+    Returns:
+        dict: The manifest, with the part paths resolved relative to it.
+    """
+    manifest: dict[str, Any] = json.loads(Path(path).read_text())
+    if manifest.get("schema_version") != MANIFEST_SCHEMA_VERSION:
+        msg = (
+            f"{path} has schema version {manifest.get('schema_version')}, "
+            f"expected {MANIFEST_SCHEMA_VERSION}"
+        )
+        raise ValueError(msg)
+    for part in manifest["parts"]:
+        part["path"] = str(Path(path).parent / part["path"])
+    return manifest
+
+
+def open_sink(
+    path: str | Path,
+    fmt: str | None = None,
+    compression: str | None = None,
+    metadata: dict[str, str] | None = None,
+) -> TableSink:
+    """
+    Open a chunked writer for a table file.
+
+    Args:
+        path (str): Path of the output file.
+        fmt (str, optional): Table format; inferred from the suffix by default.
+        compression (str, optional): Compression codec for the format.
+        metadata (dict, optional): Provenance recorded by the event store.
+
+    Returns:
+        TableSink: Writer to pass chunks to, used as a context manager.
+    """
+    fmt = fmt or infer_format(path)
+    if fmt not in SINKS:
+        msg = f"Unknown table format {fmt!r}; choose from {sorted(SINKS)}"
+        raise ValueError(msg)
+    return SINKS[fmt](path, compression, metadata)
+
+
+def read_table(
+    path: str | Path,
+    columns: Sequence[str] | None = None,
+    fmt: str | None = None,
+    compression: str | None = None,
+) -> pd.DataFrame:
+    """
+    Read a table written by one of the sinks.
+
+    Args:
+        path (str): Path of the table file.
+        columns (sequence of str, optional): Only read these columns.
+        fmt (str, optional): Table format; inferred from the suffix by default.
+        compression (str, optional): Compression codec of a CSV file; inferred
+            from the suffix by default. Other formats record their codec.
+
+    Returns:
+        pd.DataFrame: The table, with columns in file order or in the order
+        given by ``columns``.
+    """
+    import pandas as pd
+
+    fmt = fmt or infer_format(path)
+    selected = None if columns is None else list(columns)
+
+    df: pd.DataFrame
+    if fmt == "csv":
+        df = pd.read_csv(  # type: ignore[call-overload]
+            path, usecols=selected, compression=compression or "infer"
+        )
+    elif fmt == "parquet":
+        _import_pyarrow()
+        df = pd.read_parquet(path, columns=selected)
+    elif fmt == "feather":
+        _import_pyarrow()
+        df = pd.read_feather(path, columns=selected)
+    elif fmt == "npz":
+        with np.load(path) as npz_file:
+            # Members of an .npz archive are only decompressed when accessed
+            df = pd.DataFrame(
+                {column: npz_file[column] for column in selected or npz_file.files}
+            )
+    elif fmt == "evstore":
+        df = open_store(path).to_frame(columns=selected)
+    elif fmt == "npy":
+        records = np.load(path, mmap_mode="r")
+        names = selected or list(records.dtype.names)
+        df = pd.DataFrame({column: np.asarray(records[column]) for column in names})
+    elif fmt == "manifest":
+        manifest = read_manifest(path)
+        parts = [
+            read_table(part["path"], selected, manifest["format"], compression)
+            for part in manifest["parts"]
+        ]
+        df = (
+            pd.concat(parts, ignore_index=True)
+            if parts
+            else pd.DataFrame(columns=selected or FRAME_COLUMNS)
+        )
+    else:
+        msg = f"Unknown table format {fmt!r}; choose from {sorted(SINKS)}"
+        raise ValueError(msg)
+
+    return df if selected is None else df[selected]
+
+
+def _is_compressed(pa: Any, reader: Any) -> bool:
+    """
+    Check whether the record batches of a memory-mapped Arrow IPC file are
+    compressed: only then does reading one allocate memory.
+    """
+    if reader.num_record_batches == 0:
+        return False
+    allocated = pa.total_allocated_bytes()
+    batch = reader.get_batch(0)
+    compressed = bool(pa.total_allocated_bytes() > allocated)
+    del batch
+    return compressed
+
+
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=False).sum())
+
+
+def iterate_table(
+    path: str | Path,
+    step_size: int | str = "100 MB",
+    columns: Sequence[str] | None = None,
+    fmt: str | None = None,
+    compression: str | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a table written by one of the sinks in chunks of rows.
+
+    Only one chunk is in memory at a time, except for .npz files, which have
+    no partial reads and are loaded whole.
+
+    Args:
+        path (str): Path of the table file.
+        step_size (int or str): Number of rows per chunk, or a memory size per
+            chunk such as "100 MB".
+        columns (sequence of str, optional): Only read these columns.
+        fmt (str, optional): Table format; inferred from the suffix by default.
+        compression (str, optional): Compression codec of a CSV file; inferred
+            from the suffix by default.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the table, indexed by row number.
+    """
+    import pandas as pd
+
+    fmt = fmt or infer_format(path)
+    selected = None if columns is None else list(columns)
+    step = entries_per_chunk(step_size, 8 * len(selected or FRAME_COLUMNS))
+    chunks = _table_chunks(path, step, selected, fmt, compression)
+
+    start = 0
+    for chunk in iterate_stage("read", chunks, nbytes=_frame_nbytes):
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk if selected is None else chunk[selected]
+
+
+def _table_chunks(
+    path: str | Path,
+    step: int,
+    selected: list[str] | None,
+    fmt: str,
+    compression: str | None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read consecutive chunks of a table in the cheapest way its format allows.
+    """
+    import pandas as pd
+
+    chunks: Iterator[pd.DataFrame]
+    if fmt == "csv":
+        chunks = pd.read_csv(  # type: ignore[call-overload]
+            path, usecols=selected, compression=compression or "infer", chunksize=step
+        )
+    elif fmt == "parquet":
+        _import_pyarrow()
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=step, columns=selected)
+        chunks = (batch.to_pandas() for batch in batches)
+    elif fmt == "feather":
+        chunks = _feather_chunks(path, step, selected)
+    elif fmt == "evstore":
+        store = open_store(path)
+        chunks = (
+            store.to_frame(slice(start, start + step), selected)
+            for start in range(0, len(store), step)
+        )
+    elif fmt == "npy":
+        records = np.load(path, mmap_mode="r")
+        names = selected or list(records.dtype.names)
+        chunks = (
+            pd.DataFrame(
+                {
+                    column: np.asarray(records[column][start : start + step])
+                    for column in names
+                }
+            )
+            for start in range(0, len(records), step)
+        )
+    elif fmt == "manifest":
+        manifest = read_manifest(path)
+        # Chunks end at the end of each part
+        chunks = (
+            chunk
+            for part in manifest["parts"]
+            for chunk in _table_chunks(
+                part["path"], step, selected, manifest["format"], compression
+            )
+        )
+    else:
+        df = read_table(path, selected, fmt)
+        chunks = (df.iloc[start : start + step] for start in range(0, len(df), step))
+    return chunks
+
+
+def _feather_chunks(
+    path: str | Path, step: int, selected: list[str] | None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a Feather file one record batch at a time, regrouped into chunks of
+    ``step`` rows, so a compressed file is never decompressed whole.
+    """
+    pa = _import_pyarrow()
+    reader = pa.ipc.open_file(pa.memory_map(str(path)))
+    pending: list[Any] = []
+    num_pending = 0
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        if selected is not None:
+            batch = batch.select(selected)
+        pending.append(batch)
+        num_pending += batch.num_rows
+        while num_pending >= step:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, step).to_pandas()
+            rest = table.slice(step)
+            pending, num_pending = rest.to_batches(), rest.num_rows
+    if num_pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+CSV_INDEX_SUFFIX = ".idx.npy"
+
+
+def build_csv_index(csv_path: str | Path, block_size: int = 1 << 24) -> Path:
+    """
+    Write a sidecar with the byte offset of every row of an uncompressed CSV.
+
+    The sidecar ("<csv>.idx.npy") holds one offset per data row plus the file
+    size, so row ``i`` is the byte range ``offsets[i]:offsets[i + 1]``. The
+    file is scanned once in blocks, so memory does not grow with its size.
+
+    Args:
+        csv_path (str): Path of the CSV file.
+        block_size (int): Number of bytes scanned at a time.
+
+    Returns:
+        Path: Path of the sidecar.
+    """
+    csv_path = Path(csv_path)
+    line_ends = []
+    position = 0
+    with csv_path.open("rb") as csv_file:
+        while block := csv_file.read(block_size):
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            line_ends.append(newlines.astype(np.int64) + position + 1)
+            position += len(block)
+
+    # The first line is the header, so data rows start where it ends
+    offsets = np.concatenate([*line_ends, np.zeros(0, dtype=np.int64)])
+    if len(offsets) == 0 or offsets[-1] != position:
+        # The last row has no trailing newline
+        offsets = np.append(offsets, position)
+
+    index_path = csv_path.with_name(csv_path.name + CSV_INDEX_SUFFIX)
+    np.save(index_path, offsets)
+    return index_path
+
+
+def _load_csv_index(csv_path: Path) -> np.ndarray[Any, Any]:
+    """
+    Load the row-offset sidecar of a CSV file, rebuilding it when stale.
+    """
+    index_path = csv_path.with_name(csv_path.name + CSV_INDEX_SUFFIX)
+    stat = csv_path.stat()
+    if index_path.exists() and index_path.stat().st_mtime >= stat.st_mtime:
+        offsets: np.ndarray[Any, Any] = np.load(index_path, mmap_mode="r")
+        if len(offsets) and offsets[-1] == stat.st_size:
+            return offsets
+    log.info("Building row index for %s", csv_path)
+    return np.load(build_csv_index(csv_path), mmap_mode="r")  # type: ignore[no-any-return]
+
+
+class EventSource:
+    """
+    Random access to single events of a table without loading the table.
+
+    Each format is read in the cheapest way it allows: event stores and .npy
+    files are memory mapped, CSV files are read through a row-offset sidecar
+    (see :func:`build_csv_index`), uncompressed Feather files are memory
+    mapped and only the record batches holding the requested rows are
+    touched, and Parquet files only decode the row groups holding the
+    requested rows. Compressed CSV, Feather and .npz files have no random
+    access and are read once and cached.
+
+    Args:
+        path (str): Path of the table file.
+        columns (sequence of str, optional): Only read these columns.
+        fmt (str, optional): Table format; inferred from the suffix by default.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        columns: Sequence[str] | None = None,
+        fmt: str | None = None,
+    ) -> None:
+        self._path = Path(path)
+        self._columns = None if columns is None else list(columns)
+        self._fmt = fmt or infer_format(path)
+        self._table: pd.DataFrame | None = None
+        self._num_rows: int
+
+        if self._fmt == "csv" and self._path.suffix.lower() == ".csv":
+            self._offsets = _load_csv_index(self._path)
+            with self._path.open("rb") as csv_file:
+                self._header = csv_file.read(int(self._offsets[0]))
+            self._num_rows = len(self._offsets) - 1
+        elif self._fmt == "evstore":
+            self._store = open_store(self._path)
+            self._num_rows = len(self._store)
+        elif self._fmt == "npy":
+            self._records = np.load(self._path, mmap_mode="r")
+            self._num_rows = len(self._records)
+        elif self._fmt == "feather":
+            pa = _import_pyarrow()
+            reader = pa.ipc.open_file(pa.memory_map(str(self._path)))
+            if _is_compressed(pa, reader):
+                log.warning(
+                    "%s is compressed and is read whole; write Feather files "
+                    "without compression for random access",
+                    self._path,
+                )
+                self._table = read_table(self._path, self._columns, self._fmt)
+                self._num_rows = len(self._table)
+            else:
+                # The batches are views into the memory map, so this reads
+                # no event data
+                self._feather_reader = reader
+                batch_sizes = [
+                    reader.get_batch(i).num_rows
+                    for i in range(reader.num_record_batches)
+                ]
+                self._batch_starts = np.cumsum([0, *batch_sizes])
+                self._num_rows = int(self._batch_starts[-1])
+        elif self._fmt == "parquet":
+            _import_pyarrow()
+            import pyarrow.parquet as pq
+
+            self._parquet_file = pq.ParquetFile(self._path)
+            metadata = self._parquet_file.metadata
+            row_group_sizes = [
+                metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)
+            ]
+            self._row_group_starts = np.cumsum([0, *row_group_sizes])
+            self._num_rows = int(self._row_group_starts[-1])
+        elif self._fmt == "manifest":
+            manifest = read_manifest(self._path)
+            self._part_format = manifest["format"]
+            self._part_paths = [part["path"] for part in manifest["parts"]]
+            self._part_starts = np.cumsum(
+                [0, *(part["num_events"] for part in manifest["parts"])]
+            )
+            # Parts are opened when first read from
+            self._part_sources: dict[int, EventSource] = {}
+            self._num_rows = int(self._part_starts[-1])
+        else:
+            self._table = read_table(self._path, self._columns, self._fmt)
+            self._num_rows = len(self._table)
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def read(self, rows: int | Sequence[int]) -> pd.DataFrame:
+        """
+        Read one or a few events.
+
+        Args:
+            rows (int or sequence of int): Event numbers to read.
+
+        Returns:
+            pd.DataFrame: The events, indexed by their event numbers.
+        """
+        import pandas as pd
+
+        rows = [rows] if isinstance(rows, (int, np.integer)) else list(rows)
+        for row in rows:
+            if not 0 <= row < self._num_rows:
+                msg = f"Event {row} is out of range for {self._num_rows} events"
+                raise IndexError(msg)
+
+        df: pd.DataFrame
+        if self._table is not None:
+            df = self._table.iloc[rows]
+        elif self._fmt == "csv":
+            lines = [self._header]
+            with self._path.open("rb") as csv_file:
+                for row in rows:
+                    csv_file.seek(self._offsets[row])
+                    line = csv_file.read(self._offsets[row + 1] - self._offsets[row])
+                    lines.append(line.rstrip(b"\n") + b"\n")
+            df = pd.read_csv(io.BytesIO(b"".join(lines)), usecols=self._columns)
+        elif self._fmt == "evstore":
+            df = self._store.to_frame(rows, self._columns).copy()
+        elif self._fmt == "npy":
+            records = self._records[rows]
+            names = self._columns or list(records.dtype.names)
+            df = pd.DataFrame({column: records[column] for column in names})
+        elif self._fmt == "feather":
+            df = self._read_batches(np.asarray(rows, dtype=np.int64))
+        elif self._fmt == "manifest":
+            df = self._read_parts(np.asarray(rows, dtype=np.int64))
+        else:
+            groups = np.searchsorted(self._row_group_starts, rows, side="right") - 1
+            parts = {}
+            for group in np.unique(groups):
+                parts[group] = self._parquet_file.read_row_group(
+                    int(group), columns=self._columns
+                ).to_pandas()
+            df = pd.concat(
+                [
+                    parts[group].iloc[[row - self._row_group_starts[group]]]
+                    for row, group in zip(rows, groups, strict=True)
+                ]
+            )
+
+        if self._columns is not None:
+            df = df[self._columns]
+        df.index = pd.Index(rows)
+        return df
+
+    def _read_batches(self, rows: np.ndarray[Any, Any]) -> pd.DataFrame:
+        import pandas as pd
+
+        batches = np.searchsorted(self._batch_starts, rows, side="right") - 1
+        pieces: list[pd.DataFrame] = []
+        positions = []
+        for batch in np.unique(batches):
+            record_batch = self._feather_reader.get_batch(int(batch))
+            if self._columns is not None:
+                record_batch = record_batch.select(self._columns)
+            in_batch = np.flatnonzero(batches == batch)
+            local_rows = rows[in_batch] - self._batch_starts[batch]
+            pieces.append(record_batch.take(local_rows).to_pandas())
+            positions.append(in_batch)
+        if not pieces:
+            return pd.DataFrame(columns=self._columns or FRAME_COLUMNS)
+        # Back from the order of the batches to the order of the rows
+        df = pd.concat(pieces, ignore_index=True)
+        return df.iloc[np.argsort(np.concatenate(positions), kind="stable")]
+
+    def _read_parts(self, rows: np.ndarray[Any, Any]) -> pd.DataFrame:
+        import pandas as pd
+
+        parts = np.searchsorted(self._part_starts, rows, side="right") - 1
+        pieces = []
+        positions = []
+        for part in np.unique(parts):
+            if part not in self._part_sources:
+                self._part_sources[part] = EventSource(
+                    self._part_paths[part], self._columns, self._part_format
+                )
+            in_part = np.flatnonzero(parts == part)
+            local_rows = rows[in_part] - self._part_starts[part]
+            pieces.append(self._part_sources[part].read(local_rows.tolist()))
+            positions.append(in_part)
+        if not pieces:
+            return pd.DataFrame(columns=self._columns or FRAME_COLUMNS)
+        # Back from the order of the parts to the order of the rows
+        df = pd.concat(pieces, ignore_index=True)
+        return df.iloc[np.argsort(np.concatenate(positions), kind="stable")]
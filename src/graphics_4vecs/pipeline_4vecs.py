@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Iterable, Iterator
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from graphics_4vecs.io_4vecs import TableSink
+from graphics_4vecs.profile_4vecs import stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+T = TypeVar("T")
+
+DEFAULT_DEPTH = 2
+
+# How often a blocked producer checks whether its consumer has gone away
+_POLL_SECONDS = 0.1
+
+# Marks the end of the items on a queue
+_DONE = object()
+
+
+class _Failure:
+    """
+    Exception raised by a background thread, passed on to be raised again.
+    """
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def prefetch(items: Iterable[T], depth: int = DEFAULT_DEPTH) -> Iterator[T]:
+    """
+    Produce the items of an iterable in a background thread, ahead of the
+    consumer.
+
+    While the consumer works on one item, e.g. boosting a chunk, the thread
+    already reads and decompresses the next ones. At most ``depth`` items
+    wait in between, so a slow consumer holds the producer back instead of
+    letting memory grow. Exceptions of the producer are raised in the
+    consumer, and a consumer that stops early stops the producer.
+
+    Args:
+        items (iterable): Items to produce, e.g. chunks of a reader.
+        depth (int): Number of items produced ahead.
+
+    Yields:
+        The items, in order.
+    """
+    if depth < 1:
+        msg = f"Queue depth must be at least 1, not {depth}"
+        raise ValueError(msg)
+    buffer: queue.Queue[Any] = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=_POLL_SECONDS)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def produce() -> None:
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+            else:
+                put(_DONE)
+        except BaseException as err:  # raised again in the consumer
+            put(_Failure(err))
+        finally:
+            # Closes files the producer holds open when the consumer stopped
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            with stage("wait"):
+                item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
+
+
+class ThreadedSink(TableSink):
+    """
+    Write the chunks of a sink in a background thread.
+
+    :meth:`write` hands the chunk over and returns, so the next chunk can be
+    read and boosted while this one is encoded and written. At most
+    ``depth`` chunks wait to be written; further writes block until the
+    thread catches up. Chunks must not be modified after they are written.
+
+    Args:
+        sink (TableSink): Sink that writes the chunks, closed with this one.
+        depth (int): Number of chunks that may wait to be written.
+    """
+
+    def __init__(self, sink: TableSink, depth: int = DEFAULT_DEPTH) -> None:
+        if depth < 1:
+            msg = f"Queue depth must be at least 1, not {depth}"
+            raise ValueError(msg)
+        super().__init__(sink.path)
+        self._sink = sink
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=depth)
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(
+            target=self._run, name=f"write {self._path.name}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while (df := self._queue.get()) is not _DONE:
+            # After a failure the chunks are dropped, so writers never block
+            if self._error is not None:
+                continue
+            try:
+                with stage("flush", events=len(df)):
+                    self._sink.write(df)
+            except BaseException as err:  # raised again in the writer
+                self._error = err
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def write(self, df: pd.DataFrame) -> None:
+        self._raise_error()
+        self._queue.put(df)
+
+    def close(self) -> None:
+        """
+        Wait until all chunks are written, raising the error of a failed write.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_DONE)
+            self._thread.join()
+        self._raise_error()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        try:
+            self.close()
+        finally:
+            self._sink.__exit__(exc_type, exc, traceback)
@@ -1,18 +1,132 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any
+
 import manim
 import numpy as np
-import pandas as pd
+
+from graphics_4vecs.density_4vecs import SphereGrid, load_direction_density
+from graphics_4vecs.geometry_4vecs import (
+    CAMERA_REFERENCE,
+    DAUGHTER_SPHERE_RADIUS,
+    MOMENTUM_COLUMNS,
+    PARENT_RADIUS,
+    check_decay_geometry,
+    compute_decay_geometry,
+    mesh_resolution,
+    rotation_from_z,
+)
+from graphics_4vecs.io_4vecs import EventSource
+from graphics_4vecs.profile_4vecs import stage
+
+DECAY_COLUMNS = MOMENTUM_COLUMNS
+
+
+# Tessellating spheres and arrows is the expensive part of building a scene, so
+# each mesh is built once per process at the origin and copied into place. A
+# scene has a few sphere sizes but an arrow length per daughter direction, so
+# both caches are bounded.
+@lru_cache(maxsize=16)
+def _sphere_template(radius: float, resolution: tuple[int, int] | None) -> Any:
+    kwargs = {} if resolution is None else {"resolution": resolution}
+    return manim.Sphere(radius=radius, **kwargs)
+
+
+@lru_cache(maxsize=256)
+def _arrow_template(length: float, resolution: int) -> Any:
+    return manim.Arrow3D(
+        start=manim.ORIGIN, end=length * manim.OUT, resolution=resolution
+    )
+
+
+def make_sphere(center: Any, radius: float, resolution: tuple[int, int] | None) -> Any:
+    """
+    Copy the cached sphere mesh to a center.
+    """
+    return _sphere_template(radius, resolution).copy().shift(center)
+
+
+def make_arrow(start: Any, end: Any, resolution: int) -> Any:
+    """
+    Copy the cached arrow mesh of the same length and turn it from start to end.
+
+    The start and end of the shaft are moved along with the mesh, so
+    ``get_start``, ``get_end`` and ``put_start_and_end_on`` work as on a new
+    ``Arrow3D``.
+    """
+    start = np.asarray(start, dtype=np.float64)
+    direction = np.asarray(end, dtype=np.float64) - start
+    length = round(float(np.linalg.norm(direction)), 4)
+    angle, axis = rotation_from_z(direction)
+    template = _arrow_template(length, resolution)
+    arrow = template.copy()
+    arrow.rotate(angle, axis=axis, about_point=manim.ORIGIN).shift(start)
+    rotation = manim.rotation_matrix(angle, axis)
+    arrow.start = start + rotation @ np.asarray(template.start)
+    arrow.end = start + rotation @ np.asarray(template.end)
+    return arrow
 
 
 class Decay(manim.ThreeDScene):  # type: ignore[misc]
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        filename: str | None = None,
+        animation_mode: str | None = None,
+        decay_num: int | None = None,
+        event_source: EventSource | None = None,
+        geometry_file: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Scene showing one decay. Arguments left as None use the settings below,
+        which is what ``manim ... Decay`` renders.
+
+        Parameters
+        ----------
+        filename: Lab- or rest-frame table written by the transformation pipeline
+        animation_mode: One of picture, rotation, dynamic
+        decay_num: Number of the decay in the table
+        event_source: Already opened table to read the decay from, so that
+            batch renders open it only once
+        geometry_file: .npy file written by ``write_geometry_table`` for the
+            same table, to look the scene geometry up instead of computing it
+        """
+        super().__init__(**kwargs)
         ###### SPECIFY DATA FILE, ANIMATION MODE, AND DECAY NUMBER HERE ######
+        # Supported formats: .csv, .parquet, .feather, .npz, .npy, .evstore and
+        # .manifest.json of a dataset
         self._filename = "/path/to/.csv file"
         self._animation_mode = "rotation"  # Choose from: picture, rotation, dynamic
         self._decay_num = 2
         ######################################################################
-        self._dataframe = pd.read_csv(self._filename)
+        if filename is not None:
+            self._filename = filename
+        if animation_mode is not None:
+            self._animation_mode = animation_mode
+        if decay_num is not None:
+            self._decay_num = decay_num
+
+        if self._animation_mode == "dynamic":
+            # The camera direction is random, so it cannot be precomputed
+            reference = np.random.randn(3)
+        elif geometry_file is not None:
+            self._geometry = check_decay_geometry(
+                np.load(geometry_file, mmap_mode="r")[self._decay_num],
+                self._decay_num,
+            )
+            return
+        else:
+            reference = np.array(CAMERA_REFERENCE)
+
+        if event_source is None:
+            event_source = EventSource(self._filename, DECAY_COLUMNS)
+        # Only the selected decay is read, indexed by its decay number
+        self._geometry = check_decay_geometry(
+            compute_decay_geometry(event_source.read(self._decay_num), reference)[0],
+            self._decay_num,
+        )
 
     def construct(self) -> None:
         """
@@ -30,160 +144,65 @@ class Decay(manim.ThreeDScene):  # type: ignore[misc]
         .png or .mp4 file when called by Manim
         """
 
-        # Create sphere representing parent particle
-        parent_radius = 0.5
-        parent = manim.Sphere(radius=parent_radius)
-        parent.set_color(manim.BLUE)
+        # Building the meshes; playing the animation is left to manim
+        with stage("construct", events=1):
+            geometry = self._geometry
 
-        # Construct vectors, no positioning yet
-        scaling_factor = 1.4
+            sphere_resolution, arrow_resolution = mesh_resolution(manim.config.quality)
 
-        K_vec = scaling_factor * np.array(
-            [
-                self._dataframe["K_px"][self._decay_num],
-                self._dataframe["K_py"][self._decay_num],
-                self._dataframe["K_pz"][self._decay_num],
-            ]
-        )
-        pi_m2_vec = scaling_factor * np.array(
-            [
-                self._dataframe["pi_minus_2_px"][self._decay_num],
-                self._dataframe["pi_minus_2_py"][self._decay_num],
-                self._dataframe["pi_minus_2_pz"][self._decay_num],
-            ]
-        )
-        pi_m3_vec = scaling_factor * np.array(
-            [
-                self._dataframe["pi_minus_3_px"][self._decay_num],
-                self._dataframe["pi_minus_3_py"][self._decay_num],
-                self._dataframe["pi_minus_3_pz"][self._decay_num],
-            ]
-        )
-        pi_p4_vec = scaling_factor * np.array(
-            [
-                self._dataframe["pi_plus_4_px"][self._decay_num],
-                self._dataframe["pi_plus_4_py"][self._decay_num],
-                self._dataframe["pi_plus_4_pz"][self._decay_num],
-            ]
-        )
-
-        K_vec /= np.linalg.norm(K_vec)
-        pi_m2_vec /= np.linalg.norm(pi_m2_vec)
-        pi_m3_vec /= np.linalg.norm(pi_m3_vec)
-        pi_p4_vec /= np.linalg.norm(pi_p4_vec)
-
-        K_vec *= scaling_factor
-        pi_m2_vec *= scaling_factor
-        pi_m3_vec *= scaling_factor
-        pi_p4_vec *= scaling_factor
-
-        # Compute summed vectors of both decays, and their unit vectors
-        dec1 = K_vec + pi_m2_vec
-        dec2 = pi_m3_vec + pi_p4_vec
-        dec1_unit_vec = dec1 / np.linalg.norm(dec1)
-        dec2_unit_vec = dec2 / np.linalg.norm(dec2)
-
-        # Create vector for daughter 1 decay
-        daughter1_length = 1
-        daughter1_start = dec1_unit_vec * parent_radius
-        daughter1_end = daughter1_start + (dec1_unit_vec * daughter1_length)
-        daughter1_vec = manim.Arrow3D(
-            start=daughter1_start, end=daughter1_end, resolution=8
-        )
-
-        # Create vector for daughter 2 decay
-        daughter2_length = 1
-        daughter2_start = dec2_unit_vec * parent_radius
-        daughter2_end = daughter2_start + (dec2_unit_vec * daughter2_length)
-        daughter2_vec = manim.Arrow3D(
-            start=daughter2_start, end=daughter2_end, resolution=8
-        )
-
-        # Create daughter 1 sphere
-        daughter1_sphere_r = 0.25  # radius of daughter 1 sphere
-        daughter1_sphere_center = daughter1_end + (daughter1_sphere_r * dec1_unit_vec)
-        daughter1_sphere = manim.Sphere(
-            center=daughter1_sphere_center, radius=daughter1_sphere_r
-        )
-        daughter1_sphere.set_color(manim.RED)
+            # Create sphere representing parent particle
+            parent = make_sphere(manim.ORIGIN, PARENT_RADIUS, sphere_resolution)
+            parent.set_color(manim.BLUE)
 
-        # Create daughter 2 sphere
-        daughter2_sphere_r = 0.25  # radius of daughter 1 sphere
-        daughter2_sphere_center = daughter2_end + (daughter2_sphere_r * dec2_unit_vec)
-        daughter2_sphere = manim.Sphere(
-            center=daughter2_sphere_center, radius=daughter2_sphere_r
-        )
-        daughter2_sphere.set_color(manim.PURPLE)
-
-        # Compute start point of K and pi2 vectors
-        k_pi2_start = daughter1_sphere_center
-
-        # Construct K arrow:
-        K_arrow = manim.Arrow3D(
-            start=k_pi2_start,
-            end=[
-                k_pi2_start[0] + K_vec[0],
-                k_pi2_start[1] + K_vec[1],
-                k_pi2_start[2] + K_vec[2],
-            ],
-            resolution=8,
-        )
-
-        # Construct pi2 arrow:
-        pi2_arrow = manim.Arrow3D(
-            start=k_pi2_start,
-            end=[
-                k_pi2_start[0] + pi_m2_vec[0],
-                k_pi2_start[1] + pi_m2_vec[1],
-                k_pi2_start[2] + pi_m2_vec[2],
-            ],
-            resolution=8,
-        )
+            # Create vectors for the daughter decays
+            daughter1_vec = make_arrow(
+                geometry["daughter1_start"], geometry["daughter1_end"], arrow_resolution
+            )
+            daughter2_vec = make_arrow(
+                geometry["daughter2_start"], geometry["daughter2_end"], arrow_resolution
+            )
 
-        # Compute start point of pi3 and pi4 arrows
-        pi3_pi4_start = daughter2_sphere_center
-
-        # Construct pi3 arrow:
-        pi3_arrow = manim.Arrow3D(
-            start=pi3_pi4_start,
-            end=[
-                pi3_pi4_start[0] + pi_m3_vec[0],
-                pi3_pi4_start[1] + pi_m3_vec[1],
-                pi3_pi4_start[2] + pi_m3_vec[2],
-            ],
-            resolution=8,
-        )
+            # Create daughter spheres
+            daughter1_sphere = make_sphere(
+                geometry["daughter1_center"], DAUGHTER_SPHERE_RADIUS, sphere_resolution
+            )
+            daughter1_sphere.set_color(manim.RED)
+            daughter2_sphere = make_sphere(
+                geometry["daughter2_center"], DAUGHTER_SPHERE_RADIUS, sphere_resolution
+            )
+            daughter2_sphere.set_color(manim.PURPLE)
 
-        # Construct pi4 arrow:
-        pi4_arrow = manim.Arrow3D(
-            start=pi3_pi4_start,
-            end=[
-                pi3_pi4_start[0] + pi_p4_vec[0],
-                pi3_pi4_start[1] + pi_p4_vec[1],
-                pi3_pi4_start[2] + pi_p4_vec[2],
-            ],
-            resolution=8,
-        )
+            # K and pi2 arrows start at daughter 1, pi3 and pi4 arrows at daughter 2
+            K_arrow = make_arrow(
+                geometry["daughter1_center"], geometry["K_end"], arrow_resolution
+            )
+            pi2_arrow = make_arrow(
+                geometry["daughter1_center"],
+                geometry["pi_minus_2_end"],
+                arrow_resolution,
+            )
+            pi3_arrow = make_arrow(
+                geometry["daughter2_center"],
+                geometry["pi_minus_3_end"],
+                arrow_resolution,
+            )
+            pi4_arrow = make_arrow(
+                geometry["daughter2_center"],
+                geometry["pi_plus_4_end"],
+                arrow_resolution,
+            )
 
-        # Set arrow colors
-        K_arrow.set_color(manim.RED)
-        pi2_arrow.set_color(manim.ORANGE)
-        pi3_arrow.set_color(manim.BLUE)
-        pi4_arrow.set_color(manim.PURPLE)
+            # Set arrow colors
+            K_arrow.set_color(manim.RED)
+            pi2_arrow.set_color(manim.ORANGE)
+            pi3_arrow.set_color(manim.BLUE)
+            pi4_arrow.set_color(manim.PURPLE)
 
         if self._animation_mode == "picture":
-            # Set camera orientation to face in direction of vector perpendicular to decay
-            # Use Gram-Schmidt process to generate a vector orthogonal to dec1
-            orth_vec = np.random.randn(3)
-            orth_vec = np.array([2.0, -1.0, 0.5])
-            orth_vec -= orth_vec.dot(dec1) * dec1 / np.linalg.norm(dec1) ** 2
-            orth_vec /= np.linalg.norm(orth_vec)
-
-            # Compute phi and theta coordinates of orth_vec
-            phi = np.arccos(orth_vec[2])
-            theta = np.arccos(orth_vec[0] / np.sin(phi))
-
-            self.set_camera_orientation(phi=phi, theta=theta)
+            # Face the camera along a vector perpendicular to daughter 1
+            self.set_camera_orientation(
+                phi=float(geometry["phi"]), theta=float(geometry["theta"])
+            )
 
             # Add objects to scene
             self.add(parent, daughter1_vec, daughter2_vec)
@@ -206,17 +225,10 @@ class Decay(manim.ThreeDScene):  # type: ignore[misc]
             self.stop_ambient_camera_rotation()
 
         elif self._animation_mode == "dynamic":
-            # Set camera orientation to face in direction of vector perpendicular to decay
-            # Use Gram-Schmidt process to generate a vector orthogonal to dec1
-            orth_vec = np.random.randn(3)
-            orth_vec -= orth_vec.dot(dec1) * dec1 / np.linalg.norm(dec1) ** 2
-            orth_vec /= np.linalg.norm(orth_vec)
-
-            # Compute phi and theta coordinates of orth_vec
-            phi = np.arccos(orth_vec[2])
-            theta = np.arccos(orth_vec[0] / np.sin(phi))
-
-            self.set_camera_orientation(phi=phi, theta=theta)
+            # Face the camera along a random vector perpendicular to daughter 1
+            self.set_camera_orientation(
+                phi=float(geometry["phi"]), theta=float(geometry["theta"])
+            )
 
             self.play(manim.Write(parent))
             self.wait(2)
@@ -238,3 +250,111 @@ class Decay(manim.ThreeDScene):  # type: ignore[misc]
             self.begin_ambient_camera_rotation(rate=1)
             self.wait(12)
             self.stop_ambient_camera_rotation()
+
+
+# Colors of the density levels from empty to the fullest cell
+DENSITY_COLORS = [manim.DARK_BLUE, manim.TEAL, manim.YELLOW, manim.RED]
+DENSITY_RADIUS = 1.0
+# Distance between the centers of neighboring density spheres
+DENSITY_SPACING = 2.5
+
+
+def make_density_sphere(
+    grid: SphereGrid, levels: Any, center: Any, radius: float = DENSITY_RADIUS
+) -> Any:
+    """
+    Build a sphere with one face per grid cell, colored by its density level.
+    """
+    bands, sectors = grid.shape
+
+    def point(phi: float, z: float) -> Any:
+        rho = np.sqrt(max(1.0 - z * z, 0.0))
+        return radius * np.array([rho * np.cos(phi), rho * np.sin(phi), z])
+
+    # u runs over the sectors and v over the bands, so the faces of the
+    # surface are exactly the equal-area cells
+    sphere = manim.Surface(
+        point,
+        u_range=[-np.pi, np.pi],
+        v_range=[-1.0, 1.0],
+        resolution=(sectors, bands),
+        checkerboard_colors=False,
+        stroke_width=0,
+    )
+    palette = manim.color_gradient(DENSITY_COLORS, 256)
+    for face in sphere:
+        level = levels[face.v_index, face.u_index]
+        face.set_fill(palette[round(255 * float(level))], opacity=1.0)
+    return sphere.shift(center)
+
+
+class DensitySphere(manim.ThreeDScene):  # type: ignore[misc]
+    def __init__(
+        self,
+        filename: str | None = None,
+        animation_mode: str | None = None,
+        particles: Sequence[str] | None = None,
+        log_scale: bool | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Scene showing the momentum directions of all decays as one density
+        sphere per particle. Arguments left as None use the settings below,
+        which is what ``manim ... DensitySphere`` renders.
+
+        The spheres have one face per cell of the grid the directions were
+        counted on, so the cost of the scene does not depend on the number of
+        events.
+
+        Parameters
+        ----------
+        filename: .npz file written by the density command
+        animation_mode: One of picture, rotation
+        particles: Particles to show, left to right; all counted ones if empty
+        log_scale: Color by the logarithm of the counts
+        """
+        super().__init__(**kwargs)
+        ###### SPECIFY DENSITY FILE, ANIMATION MODE, AND PARTICLES HERE ######
+        self._filename = "/path/to/direction_density.npz"
+        self._animation_mode = "rotation"  # Choose from: picture, rotation
+        self._particles: Sequence[str] = []  # e.g. ["K", "pi_plus_4"]
+        self._log_scale = False
+        ######################################################################
+        if filename is not None:
+            self._filename = filename
+        if animation_mode is not None:
+            self._animation_mode = animation_mode
+        if particles is not None:
+            self._particles = particles
+        if log_scale is not None:
+            self._log_scale = log_scale
+
+        density = load_direction_density(self._filename)
+        particles = list(self._particles or density.particles)
+        missing = set(particles) - set(density.particles)
+        if missing:
+            msg = f"{self._filename} has no directions of {sorted(missing)}"
+            raise KeyError(msg)
+        rows = [density.particles.index(particle) for particle in particles]
+        self._grid = density.grid
+        self._levels = density.levels(self._log_scale)[rows]
+
+    def construct(self) -> None:
+        """
+        Build the density spheres, side by side along the x-axis.
+        """
+        with stage("construct", events=1):
+            offset = 0.5 * (len(self._levels) - 1)
+            spheres = [
+                make_density_sphere(
+                    self._grid, levels, (i - offset) * DENSITY_SPACING * manim.RIGHT
+                )
+                for i, levels in enumerate(self._levels)
+            ]
+
+        self.set_camera_orientation(phi=75 * manim.DEGREES, theta=-90 * manim.DEGREES)
+        self.add(*spheres)
+        if self._animation_mode == "rotation":
+            self.begin_ambient_camera_rotation(rate=0.5)
+            self.wait(12)
+            self.stop_ambient_camera_rotation()
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Sized
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, TypeVar
+
+log = logging.getLogger("graphics_4vecs")
+
+T = TypeVar("T", bound=Sized)
+
+# Stages in pipeline order; other names are reported after them
+STAGES = (
+    "open",
+    "read",
+    "rename",
+    "frame",
+    "transform",
+    "kinematics",
+    "index",
+    "geometry",
+    "fill",
+    "wait",
+    "write",
+    "flush",
+    "construct",
+    "render",
+)
+
+
+def peak_rss() -> int | None:
+    """
+    Find the peak resident set size of this process.
+
+    Returns:
+        int or None: Peak RSS in bytes, or None where the platform does not
+        report it.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return int(max_rss) if sys.platform == "darwin" else int(max_rss) * 1024
+
+
+@dataclass
+class StageStats:
+    """
+    Accumulated cost of one pipeline stage.
+
+    Attributes:
+        calls (int): Number of times the stage ran.
+        seconds (float): Total wall-clock time.
+        events (int): Number of events processed.
+        bytes_read (int): Bytes of event data read.
+        bytes_written (int): Bytes of output written.
+    """
+
+    calls: int = 0
+    seconds: float = 0.0
+    events: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+
+    @property
+    def events_per_second(self) -> float:
+        """
+        Throughput of the stage.
+        """
+        return self.events / self.seconds if self.seconds else 0.0
+
+
+class _Stage:
+    """
+    Running stage; counts can be added once they are known inside the block.
+    """
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+
+    def add(self, events: int = 0, bytes_read: int = 0, bytes_written: int = 0) -> None:
+        self._profiler.add(
+            self._name,
+            events=events,
+            bytes_read=bytes_read,
+            bytes_written=bytes_written,
+        )
+
+
+@dataclass
+class Profiler:
+    """
+    Time pipeline stages and count the events and bytes they handle.
+
+    Only stages that run in this process are recorded; work done in worker
+    processes shows up as the time the stages here wait for it. Stages may
+    run in several threads at once, such as the read-ahead and writer
+    threads of the pipeline.
+
+    Attributes:
+        stages (dict): Statistics of each stage by name.
+        start (float): ``time.perf_counter`` when profiling started.
+        wall_seconds (float): Duration of the profiled block once it ended.
+    """
+
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    start: float = field(default_factory=time.perf_counter)
+    wall_seconds: float = 0.0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def add(
+        self,
+        name: str,
+        calls: int = 0,
+        seconds: float = 0.0,
+        events: int = 0,
+        bytes_read: int = 0,
+        bytes_written: int = 0,
+    ) -> None:
+        """
+        Add to the statistics of a stage; safe to call from several threads.
+
+        Args:
+            name (str): Stage name, e.g. "read" or "transform".
+            calls (int): Number of runs of the stage.
+            seconds (float): Wall-clock time of the runs.
+            events (int): Number of events processed.
+            bytes_read (int): Bytes of event data read.
+            bytes_written (int): Bytes of output written.
+        """
+        with self._lock:
+            stats = self.stages.setdefault(name, StageStats())
+            stats.calls += calls
+            stats.seconds += seconds
+            stats.events += events
+            stats.bytes_read += bytes_read
+            stats.bytes_written += bytes_written
+
+    @contextmanager
+    def stage(
+        self, name: str, events: int = 0, bytes_read: int = 0, bytes_written: int = 0
+    ) -> Iterator[_Stage]:
+        """
+        Time a block as one run of a stage.
+
+        Args:
+            name (str): Stage name, e.g. "read" or "transform".
+            events (int): Number of events the block processes.
+            bytes_read (int): Bytes of event data the block reads.
+            bytes_written (int): Bytes of output the block writes.
+
+        Yields:
+            object: Handle whose ``add(events, bytes_read, bytes_written)``
+            records counts only known inside the block.
+        """
+        self.add(
+            name, events=events, bytes_read=bytes_read, bytes_written=bytes_written
+        )
+        start = time.perf_counter()
+        try:
+            yield _Stage(self, name)
+        finally:
+            self.add(name, calls=1, seconds=time.perf_counter() - start)
+
+    def report(self) -> dict[str, Any]:
+        """
+        Collect the statistics as JSON-serializable data.
+
+        Returns:
+            dict: "wall_seconds", "peak_rss_bytes" and per-stage "stages" with
+            their counts, seconds and events per second.
+        """
+        with self._lock:
+            stages = {name: replace(stats) for name, stats in self.stages.items()}
+        order = {name: i for i, name in enumerate(STAGES)}
+        names = sorted(stages, key=lambda name: order.get(name, len(order)))
+        return {
+            "wall_seconds": self.wall_seconds or time.perf_counter() - self.start,
+            "peak_rss_bytes": peak_rss(),
+            "stages": {
+                name: {
+                    **asdict(stages[name]),
+                    "events_per_second": stages[name].events_per_second,
+                }
+                for name in names
+            },
+        }
+
+    def summary(self) -> str:
+        """
+        Describe the statistics as a table with one line per stage.
+        """
+        report = self.report()
+        header = ("stage", "calls", "seconds", "events/s", "MB read", "MB written")
+        lines = ["{:<11}{:>7}{:>10}{:>12}{:>10}{:>12}".format(*header)]
+        for name, stats in report["stages"].items():
+            lines.append(
+                f"{name:<11}{stats['calls']:>7}{stats['seconds']:>10.3f}"
+                f"{stats['events_per_second']:>12.3g}{stats['bytes_read'] / 1e6:>10.1f}"
+                f"{stats['bytes_written'] / 1e6:>12.1f}"
+            )
+        lines.append(f"wall time {report['wall_seconds']:.3f} s")
+        if report["peak_rss_bytes"] is not None:
+            lines.append(f"peak RSS {report['peak_rss_bytes'] / 1e6:.1f} MB")
+        return "\n".join(lines)
+
+
+# Profiler of the running profiling() block; stage() is a no-op without one
+_active: Profiler | None = None
+
+
+def stage(
+    name: str, events: int = 0, bytes_read: int = 0, bytes_written: int = 0
+) -> Any:
+    """
+    Time a block as a stage of the active profiler, if there is one.
+
+    Without an active profiler this returns a shared stage that records
+    nothing, so instrumented code costs next to nothing when not profiled.
+
+    Args:
+        name (str): Stage name, e.g. "read" or "transform".
+        events (int): Number of events the block processes.
+        bytes_read (int): Bytes of event data the block reads.
+        bytes_written (int): Bytes of output the block writes.
+
+    Returns:
+        context manager: Yields a handle whose ``add(events, bytes_read,
+        bytes_written)`` records counts only known inside the block.
+    """
+    if _active is None:
+        return _NO_STAGE
+    return _active.stage(name, events, bytes_read, bytes_written)
+
+
+class _NoStage:
+    """
+    Stage of no profiler: enters, exits and adds nothing.
+    """
+
+    def __enter__(self) -> _NoStage:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+    def add(self, events: int = 0, bytes_read: int = 0, bytes_written: int = 0) -> None:
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+@contextmanager
+def profiling(report_path: str | Path | None = None) -> Iterator[Profiler]:
+    """
+    Profile the pipeline stages run inside the block.
+
+    The statistics are logged when the block ends, and written as JSON if a
+    path is given.
+
+    Args:
+        report_path (str, optional): Path of the JSON report to write.
+
+    Yields:
+        Profiler: The statistics collected so far.
+    """
+    global _active  # noqa: PLW0603
+    previous = _active
+    _active = profiler = Profiler()
+    try:
+        yield profiler
+    finally:
+        _active = previous
+        profiler.wall_seconds = time.perf_counter() - profiler.start
+        log.info("Stage profile:\n%s", profiler.summary())
+        if report_path is not None:
+            Path(report_path).write_text(json.dumps(profiler.report(), indent=2))
+
+
+def iterate_stage(
+    name: str,
+    items: Iterable[T],
+    events: Callable[[T], int] = len,
+    nbytes: Callable[[T], int] | None = None,
+) -> Iterator[T]:
+    """
+    Time producing each item of an iterable, e.g. each chunk of a reader, as
+    a stage of the active profiler.
+
+    Args:
+        name (str): Stage name, e.g. "read".
+        items (iterable): Items to pass through.
+        events (callable): Number of events of an item.
+        nbytes (callable, optional): Bytes read for an item.
+
+    Yields:
+        The items.
+    """
+    profiler = _active
+    if profiler is None:
+        yield from items
+        return
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            # Finding the end is timed, but is not a call
+            profiler.add(name, seconds=time.perf_counter() - start)
+            return
+        profiler.add(
+            name,
+            calls=1,
+            seconds=time.perf_counter() - start,
+            events=events(item),
+            bytes_read=nbytes(item) if nbytes else 0,
+        )
+        yield item
+
+
+@contextmanager
+def cprofile(path: str | Path, limit: int = 20) -> Iterator[None]:
+    """
+    Run the block under cProfile, write the statistics and log the top
+    functions by cumulative time.
+
+    Args:
+        path (str): Path of the statistics file, readable with ``pstats`` or
+            tools such as snakeviz.
+        limit (int): Number of functions to log.
+    """
+    import cProfile
+    import io
+    import pstats
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(limit)
+        log.info("cProfile statistics written to %s:\n%s", path, output.getvalue())
+
+
+@contextmanager
+def trace_allocations(limit: int = 10) -> Iterator[None]:
+    """
+    Trace memory allocations in the block with tracemalloc and log the peak
+    and the lines that allocated the most.
+
+    Args:
+        limit (int): Number of allocation sites to log.
+    """
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        top = snapshot.statistics("lineno")[:limit]
+        log.info(
+            "tracemalloc peak %.1f MB; largest allocations still held:\n%s",
+            peak / 1e6,
+            "\n".join(str(statistic) for statistic in top),
+        )
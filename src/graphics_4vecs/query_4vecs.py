@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import numpy.typing as npt
+
+from graphics_4vecs.histogram_4vecs import compute_quantities
+from graphics_4vecs.io_4vecs import (
+    EVENT_DTYPE,
+    FRAME_COLUMNS,
+    entries_per_chunk,
+    iterate_table,
+)
+from graphics_4vecs.profile_4vecs import stage
+from graphics_4vecs.transformations_4vecs import DEFAULT_STEP_SIZE, iterate_rest_frame
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = logging.getLogger("graphics_4vecs")
+
+INDEX_SUFFIX = ".index"
+INDEX_FILE = "index.json"
+
+# Rows of the sorted order scanned at a time by top-k queries with cuts
+TOP_K_BLOCK = 65536
+
+
+@dataclass(frozen=True)
+class Cut:
+    """
+    Range of one quantity that selected events must fall in.
+
+    Attributes:
+        quantity (str): Column of the frame table (e.g. "K_px"), kinematic
+            variable (e.g. "s_12") or momentum quantity (e.g. "K_pt").
+        low (float): Smallest value included.
+        high (float): Value the range stops before.
+    """
+
+    quantity: str
+    low: float = -math.inf
+    high: float = math.inf
+
+    def __post_init__(self) -> None:
+        if not self.low < self.high:
+            msg = f"Empty range for {self.quantity}: {self.low} to {self.high}"
+            raise ValueError(msg)
+
+    def mask(self, values: npt.ArrayLike) -> npt.NDArray[np.bool_]:
+        """
+        Find the values inside the range; NaN is never inside.
+        """
+        x = np.asarray(values)
+        inside: npt.NDArray[np.bool_] = (x >= self.low) & (x < self.high)
+        return inside
+
+
+def parse_cut(spec: str) -> Cut:
+    """
+    Parse a cut such as "s_12:0.5:1.2" or "K_p:1.5:" (no upper bound).
+
+    Args:
+        spec (str): Quantity and range written quantity:low:high, where an
+            empty bound is unbounded.
+
+    Returns:
+        Cut: The cut.
+    """
+    parts = spec.strip().split(":")
+    if len(parts) != 3 or not parts[0]:
+        msg = f"Cannot interpret {spec!r} as quantity:low:high"
+        raise ValueError(msg)
+    quantity, low, high = parts
+    return Cut(
+        quantity,
+        float(low) if low else -math.inf,
+        float(high) if high else math.inf,
+    )
+
+
+def _iterate_frames(
+    input_path: str, tree_name: str, step_size: int | str
+) -> Iterator[pd.DataFrame]:
+    if input_path.endswith(".root"):
+        yield from iterate_rest_frame(input_path, tree_name, step_size)
+    else:
+        step = entries_per_chunk(step_size, EVENT_DTYPE.itemsize)
+        yield from iterate_table(input_path, step, FRAME_COLUMNS)
+
+
+def top_k(
+    input_path: str,
+    quantity: str,
+    k: int,
+    largest: bool = True,
+    cuts: Sequence[Cut] = (),
+    tree_name: str = "DalitzEventList",
+    step_size: int | str = DEFAULT_STEP_SIZE,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    """
+    Find the events with the largest (or smallest) value of a quantity in one
+    pass over a file, without an index.
+
+    Only the k best events seen so far are kept between chunks, so memory
+    does not grow with the number of events.
+
+    Args:
+        input_path (str): ROOT file, rest-frame event store, or rest- or
+            lab-frame table written by the pipeline.
+        quantity (str): Quantity to rank by; see :func:`compute_quantities`.
+        k (int): Number of events to find.
+        largest (bool): Rank by the largest values, or else the smallest.
+        cuts (sequence of Cut): Only consider events passing all cuts.
+        tree_name (str): Name of the tree if the input is a ROOT file.
+        step_size (int or str): Number of events per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+
+    Returns:
+        tuple: Event numbers and their values, best first.
+    """
+    names = {quantity, *(cut.quantity for cut in cuts)}
+    best_events = np.zeros(0, dtype=np.int64)
+    best_values = np.zeros(0, dtype=np.float64)
+    start = 0
+    for frame_df in _iterate_frames(input_path, tree_name, step_size):
+        quantities = compute_quantities(frame_df, names)
+        values = np.asarray(quantities[quantity], dtype=np.float64)
+        selected = ~np.isnan(values)
+        for cut in cuts:
+            selected &= cut.mask(quantities[cut.quantity])
+        events = np.flatnonzero(selected) + start
+        start += len(frame_df)
+
+        best_events = np.concatenate([best_events, events])
+        best_values = np.concatenate([best_values, values[selected]])
+        if len(best_values) > k:
+            kept = _best_k(best_events, -best_values if largest else best_values, k)
+            best_events, best_values = best_events[kept], best_values[kept]
+
+    ranking = np.lexsort((best_events, -best_values if largest else best_values))
+    return best_events[ranking], best_values[ranking]
+
+
+def _best_k(
+    events: npt.NDArray[np.int64], keys: npt.NDArray[np.float64], k: int
+) -> npt.NDArray[np.intp]:
+    # Positions of the k smallest keys; of the keys equal to the k-th, the
+    # lowest events are kept, so ties rank as in the index
+    if k == 0:
+        return np.zeros(0, dtype=np.intp)
+    threshold = np.partition(keys, k - 1)[k - 1]
+    better = np.flatnonzero(keys < threshold)
+    tied = np.flatnonzero(keys == threshold)
+    tied = tied[np.argsort(events[tied], kind="stable")][: k - len(better)]
+    return np.concatenate([better, tied])
+
+
+def default_index_dir(input_path: str | Path) -> Path:
+    """
+    Find the index directory of a file: "<file>.index" next to it.
+    """
+    path = Path(input_path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def build_index(
+    input_path: str | Path,
+    quantities: Iterable[str],
+    index_dir: str | Path | None = None,
+    tree_name: str = "DalitzEventList",
+    step_size: int | str = DEFAULT_STEP_SIZE,
+) -> Path:
+    """
+    Precompute sorted indexes of quantities of every event of a file.
+
+    For each quantity the index holds its values in event order
+    ("<quantity>.values.npy"), the event numbers sorted by increasing and by
+    decreasing value ("<quantity>.order.npy" and
+    "<quantity>.descending.npy", both with equal values in event order) and
+    the sorted values ("<quantity>.sorted.npy"), without NaN. All files are
+    memory mapped when queried. "index.json" records the size and
+    modification time of the input and, for ROOT files, the tree, so an
+    index of a changed file or another tree is rebuilt.
+
+    Args:
+        input_path (str): ROOT file, rest-frame event store, or rest- or
+            lab-frame table written by the pipeline.
+        quantities (iterable of str): Quantities to index; see
+            :func:`compute_quantities`.
+        index_dir (str, optional): Directory to write; see
+            :func:`default_index_dir`.
+        tree_name (str): Name of the tree if the input is a ROOT file.
+        step_size (int or str): Number of events per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+
+    Returns:
+        Path: The index directory.
+    """
+    names = sorted(set(quantities))
+    if not names:
+        msg = "No quantities to index"
+        raise ValueError(msg)
+    index_dir = Path(index_dir) if index_dir else default_index_dir(input_path)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    # The metadata goes last, so a half-written index is never used
+    (index_dir / INDEX_FILE).unlink(missing_ok=True)
+
+    chunks: dict[str, list[npt.NDArray[np.float64]]] = {name: [] for name in names}
+    for frame_df in _iterate_frames(str(input_path), tree_name, step_size):
+        for name, values in compute_quantities(frame_df, names).items():
+            chunks[name].append(np.asarray(values, dtype=np.float64))
+
+    num_events = 0
+    for name in names:
+        values = np.concatenate([*chunks.pop(name), np.zeros(0)])
+        num_events = len(values)
+        with stage("index", events=num_events):
+            # NaN sorts last and never passes a cut, so it is left out
+            num_valid = len(values) - np.count_nonzero(np.isnan(values))
+            order = np.argsort(values, kind="stable")[:num_valid]
+            # Sorted on its own rather than reversed, so that ties keep the
+            # event order like the streaming top_k
+            descending = np.argsort(-values, kind="stable")[:num_valid]
+            dtype = _order_dtype(order)
+            np.save(index_dir / f"{name}.values.npy", values)
+            np.save(index_dir / f"{name}.order.npy", order.astype(dtype))
+            np.save(index_dir / f"{name}.descending.npy", descending.astype(dtype))
+            np.save(index_dir / f"{name}.sorted.npy", values[order])
+
+    stat = Path(input_path).stat()
+    metadata = {
+        "source": str(input_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "tree_name": _index_tree_name(input_path, tree_name),
+        "num_events": num_events,
+        "quantities": names,
+    }
+    (index_dir / INDEX_FILE).write_text(json.dumps(metadata, indent=2))
+    return index_dir
+
+
+def _index_tree_name(input_path: str | Path, tree_name: str) -> str | None:
+    # Only ROOT files have trees; tables are indexed whatever tree is given
+    return tree_name if str(input_path).endswith(".root") else None
+
+
+def _order_dtype(order: npt.NDArray[Any]) -> type[np.signedinteger[Any]]:
+    # Event numbers fit 32 bits up to two billion events, halving the index
+    return np.int32 if len(order) < np.iinfo(np.int32).max else np.int64
+
+
+class EventIndex:
+    """
+    Range and top-k queries over the events of a file through sorted
+    per-quantity indexes built by :func:`build_index`.
+
+    The index is built when it is missing, out of date or lacks a requested
+    quantity; after that a range query is two binary searches, so it takes
+    milliseconds also for tens of millions of events.
+
+    Args:
+        input_path (str): ROOT file, rest-frame event store, or rest- or
+            lab-frame table written by the pipeline.
+        quantities (iterable of str): Quantities that must be indexed.
+        index_dir (str, optional): Index directory; see
+            :func:`default_index_dir`.
+        tree_name (str): Name of the tree if the input is a ROOT file.
+        step_size (int or str): Number of events per chunk when building.
+    """
+
+    def __init__(
+        self,
+        input_path: str | Path,
+        quantities: Iterable[str] = (),
+        index_dir: str | Path | None = None,
+        tree_name: str = "DalitzEventList",
+        step_size: int | str = DEFAULT_STEP_SIZE,
+    ) -> None:
+        self._dir = Path(index_dir) if index_dir else default_index_dir(input_path)
+        metadata = self._read_metadata()
+        wanted = set(quantities)
+        known = set(metadata["quantities"]) if metadata else set()
+        stat = Path(input_path).stat()
+        if (
+            metadata is None
+            or (metadata["size"], metadata["mtime_ns"])
+            != (stat.st_size, stat.st_mtime_ns)
+            or metadata.get("tree_name") != _index_tree_name(input_path, tree_name)
+            or not wanted <= known
+        ):
+            log.info("Building event index for %s", input_path)
+            build_index(input_path, known | wanted, self._dir, tree_name, step_size)
+            metadata = self._read_metadata()
+        if metadata is None:
+            msg = f"Cannot read the event index in {self._dir}"
+            raise OSError(msg)
+        self.num_events: int = metadata["num_events"]
+        self.quantities: list[str] = metadata["quantities"]
+        self._arrays: dict[str, npt.NDArray[Any]] = {}
+
+    def _read_metadata(self) -> dict[str, Any] | None:
+        try:
+            metadata: dict[str, Any] = json.loads((self._dir / INDEX_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+        return metadata
+
+    def _array(self, quantity: str, kind: str) -> npt.NDArray[Any]:
+        if quantity not in self.quantities:
+            msg = f"{quantity!r} is not indexed; indexed are {self.quantities}"
+            raise KeyError(msg)
+        name = f"{quantity}.{kind}.npy"
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self._dir / name, mmap_mode="r")
+        return self._arrays[name]
+
+    def values(self, quantity: str) -> npt.NDArray[np.float64]:
+        """
+        Values of a quantity in event order, memory mapped.
+        """
+        return self._array(quantity, "values")
+
+    def count(self, cut: Cut) -> int:
+        """
+        Count the events passing a cut.
+        """
+        low, high = self._positions(cut)
+        return high - low
+
+    def _positions(self, cut: Cut) -> tuple[int, int]:
+        sorted_values = self._array(cut.quantity, "sorted")
+        low, high = np.searchsorted(sorted_values, [cut.low, cut.high])
+        return int(low), int(high)
+
+    def select(self, cuts: Sequence[Cut]) -> npt.NDArray[np.int64]:
+        """
+        Find the events passing all cuts.
+
+        The events of the most selective cut are looked up in the sorted
+        index and only they are checked against the other cuts.
+
+        Args:
+            cuts (sequence of Cut): Cuts on indexed quantities; no cuts select
+                all events.
+
+        Returns:
+            np.array: Event numbers in increasing order.
+        """
+        if not cuts:
+            return np.arange(self.num_events, dtype=np.int64)
+        positions = [self._positions(cut) for cut in cuts]
+        narrowest = min(
+            range(len(cuts)), key=lambda i: positions[i][1] - positions[i][0]
+        )
+        low, high = positions[narrowest]
+        events = np.sort(self._array(cuts[narrowest].quantity, "order")[low:high])
+        for i, cut in enumerate(cuts):
+            if i != narrowest:
+                events = events[cut.mask(self.values(cut.quantity)[events])]
+        return events.astype(np.int64)
+
+    def top_k(
+        self, quantity: str, k: int, largest: bool = True, cuts: Sequence[Cut] = ()
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+        """
+        Find the events with the largest (or smallest) value of a quantity.
+
+        Args:
+            quantity (str): Indexed quantity to rank by.
+            k (int): Number of events to find.
+            largest (bool): Rank by the largest values, or else the smallest.
+            cuts (sequence of Cut): Only consider events passing all cuts.
+
+        Returns:
+            tuple: Event numbers and their values, best first.
+        """
+        ranked = self._array(quantity, "descending" if largest else "order")
+        if not cuts:
+            return self._with_values(quantity, ranked[:k])
+
+        passing = np.zeros(self.num_events, dtype=np.bool_)
+        passing[self.select(cuts)] = True
+        # Walk the ranking from the best end until k events pass the cuts
+        parts = []
+        found = 0
+        for start in range(0, len(ranked), TOP_K_BLOCK):
+            block = ranked[start : start + TOP_K_BLOCK]
+            parts.append(block[passing[block]][: k - found])
+            found += len(parts[-1])
+            if found >= k:
+                break
+        return self._with_values(quantity, np.concatenate([*parts, np.zeros(0)]))
+
+    def _with_values(
+        self, quantity: str, events: npt.NDArray[Any]
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+        events = np.asarray(events, dtype=np.int64)
+        return events, np.asarray(self.values(quantity)[events], dtype=np.float64)
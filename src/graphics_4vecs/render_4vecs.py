@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from itertools import groupby
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from graphics_4vecs.profile_4vecs import stage
+
+if TYPE_CHECKING:
+    from graphics_4vecs.io_4vecs import EventSource
+
+log = logging.getLogger("graphics_4vecs")
+
+QUALITIES = {
+    "l": "low_quality",
+    "m": "medium_quality",
+    "h": "high_quality",
+    "p": "production_quality",
+    "k": "fourk_quality",
+}
+
+# Opened once per worker process by _init_worker
+_worker_source: EventSource | None = None
+_worker_filename = ""
+_worker_geometry_file: str | None = None
+
+
+@dataclass
+class RenderReport:
+    """
+    Outcome of a batch render.
+
+    Attributes:
+        rendered (list of int): Decay numbers that rendered successfully.
+        failures (dict): Error message for each decay number that failed.
+        seconds (float): Wall-clock duration of the batch.
+    """
+
+    rendered: list[int] = field(default_factory=list)
+    failures: dict[int, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Decays rendered per second.
+        """
+        return len(self.rendered) / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        """
+        Describe the outcome in one line.
+        """
+        return (
+            f"Rendered {len(self.rendered)} decays in {self.seconds:.1f} s "
+            f"({self.throughput:.2f} decays/s), {len(self.failures)} failed"
+        )
+
+
+def parse_decay_numbers(spec: str) -> list[int]:
+    """
+    Parse a list of decay numbers such as "0-9,15,20-24".
+
+    Args:
+        spec (str): Comma-separated decay numbers and inclusive ranges.
+
+    Returns:
+        list: Decay numbers in the given order, without duplicates.
+    """
+    decay_nums: dict[int, None] = {}
+    for raw_part in spec.split(","):
+        part = raw_part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        if not first.isdigit() or (last and not last.isdigit()):
+            msg = f"Cannot interpret {part!r} as a decay number or range"
+            raise ValueError(msg)
+        stop = int(last or first) + 1
+        decay_nums.update(dict.fromkeys(range(int(first), stop)))
+    return list(decay_nums)
+
+
+def format_decay_numbers(decay_nums: Iterable[int]) -> str:
+    """
+    Write decay numbers compactly, e.g. [0, 1, 2, 7] as "0-2,7"; the inverse
+    of :func:`parse_decay_numbers`.
+
+    Args:
+        decay_nums (iterable of int): Decay numbers.
+
+    Returns:
+        str: Comma-separated decay numbers, with runs of consecutive numbers
+        as inclusive ranges.
+    """
+    parts = []
+    # Consecutive numbers share their difference to their position
+    runs = groupby(enumerate(decay_nums), key=lambda item: item[1] - item[0])
+    for _, run in runs:
+        first, *rest = (decay_num for _, decay_num in run)
+        parts.append(f"{first}-{rest[-1]}" if rest else str(first))
+    return ",".join(parts)
+
+
+def _init_worker(filename: str, geometry_file: str | None = None) -> None:
+    """
+    Open the event table and import manim once per worker process.
+    """
+    global _worker_source, _worker_filename, _worker_geometry_file  # noqa: PLW0603
+
+    from graphics_4vecs.io_4vecs import EventSource
+    from graphics_4vecs.plot_4vecs import DECAY_COLUMNS
+
+    _worker_source = EventSource(filename, DECAY_COLUMNS)
+    _worker_filename = filename
+    _worker_geometry_file = geometry_file
+
+
+def _render_decay(
+    decay_num: int, animation_mode: str, quality: str, media_dir: str
+) -> tuple[int, str | None]:
+    """
+    Render one decay in a worker process.
+
+    Returns:
+        tuple: The decay number and the error message, or None on success.
+    """
+    import manim
+
+    from graphics_4vecs.plot_4vecs import Decay
+
+    settings = {
+        "quality": quality,
+        "media_dir": media_dir,
+        "output_file": f"Decay_{decay_num}",
+        "save_last_frame": animation_mode == "picture",
+        "write_to_movie": animation_mode != "picture",
+        "disable_caching": True,
+        "progress_bar": "none",
+        "verbosity": "WARNING",
+    }
+    try:
+        with manim.tempconfig(settings):
+            scene = Decay(
+                filename=_worker_filename,
+                animation_mode=animation_mode,
+                decay_num=decay_num,
+                event_source=_worker_source,
+                geometry_file=_worker_geometry_file,
+            )
+            scene.render()
+    except Exception as err:
+        return decay_num, f"{type(err).__name__}: {err}"
+    return decay_num, None
+
+
+def render_decays(
+    filename: str,
+    decay_nums: Iterable[int],
+    animation_mode: str = "picture",
+    quality: str = "low_quality",
+    workers: int | None = None,
+    media_dir: str | Path = "media",
+    geometry_file: str | Path | None = None,
+) -> RenderReport:
+    """
+    Render many decays of one table in parallel.
+
+    Each worker process imports manim and opens the table once, then renders
+    its share of the decays, so the per-decay cost is only the scene itself.
+
+    Args:
+        filename (str): Lab- or rest-frame table written by the pipeline.
+        decay_nums (iterable of int): Decays to render.
+        animation_mode (str): One of "picture", "rotation" or "dynamic".
+        quality (str): Manim quality name such as "low_quality", or its
+            command-line letter ("l", "m", "h", "p", "k").
+        workers (int, optional): Number of worker processes; defaults to the
+            number of CPUs.
+        media_dir (str): Manim media directory the files are written to.
+        geometry_file (str, optional): Geometry table precomputed for
+            ``filename`` by ``write_geometry_table``.
+
+    Returns:
+        RenderReport: Rendered and failed decays, and the throughput.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    if animation_mode not in ("picture", "rotation", "dynamic"):
+        msg = f"Unknown animation mode {animation_mode!r}"
+        raise ValueError(msg)
+    quality = QUALITIES.get(quality, quality)
+    decay_nums = list(decay_nums)
+    workers = min(workers or os.cpu_count() or 1, max(len(decay_nums), 1))
+
+    report = RenderReport()
+    start = time.perf_counter()
+    with stage("render", events=len(decay_nums)), ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(filename, None if geometry_file is None else str(geometry_file)),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _render_decay, decay_num, animation_mode, quality, str(media_dir)
+            )
+            for decay_num in decay_nums
+        ]
+        for future in as_completed(futures):
+            decay_num, error = future.result()
+            if error is None:
+                report.rendered.append(decay_num)
+            else:
+                log.warning("Decay %d failed: %s", decay_num, error)
+                report.failures[decay_num] = error
+    report.seconds = time.perf_counter() - start
+    report.rendered.sort()
+
+    log.info(report.summary())
+    return report
+
+
+def render_density(
+    filename: str | Path,
+    animation_mode: str = "picture",
+    quality: str = "low_quality",
+    media_dir: str | Path = "media",
+    particles: Sequence[str] | None = None,
+    log_scale: bool = False,
+) -> None:
+    """
+    Render the direction density spheres of all decays in one scene.
+
+    Args:
+        filename (str): .npz file written by ``save_direction_density``.
+        animation_mode (str): One of "picture" or "rotation".
+        quality (str): Manim quality name such as "low_quality", or its
+            command-line letter ("l", "m", "h", "p", "k").
+        media_dir (str): Manim media directory the file is written to.
+        particles (sequence of str, optional): Particles to show; defaults
+            to all particles in the file.
+        log_scale (bool): Color by the logarithm of the counts.
+    """
+    import manim
+
+    from graphics_4vecs.plot_4vecs import DensitySphere
+
+    if animation_mode not in ("picture", "rotation"):
+        msg = f"Unknown animation mode {animation_mode!r}"
+        raise ValueError(msg)
+    settings = {
+        "quality": QUALITIES.get(quality, quality),
+        "media_dir": str(media_dir),
+        "output_file": f"DensitySphere_{Path(filename).stem}",
+        "save_last_frame": animation_mode == "picture",
+        "write_to_movie": animation_mode != "picture",
+        "disable_caching": True,
+        "progress_bar": "none",
+        "verbosity": "WARNING",
+    }
+    with stage("render", events=1), manim.tempconfig(settings):
+        DensitySphere(str(filename), animation_mode, particles, log_scale).render()
@@ -1,77 +1,509 @@
 from __future__ import annotations
 
+import fnmatch
 import logging
-import sys
-from typing import Any
+import os
+import re
+import shutil
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from itertools import combinations
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import awkward
 import numpy as np
 import numpy.typing as npt
-import pandas as pd
-import uproot
+
+from graphics_4vecs.io_4vecs import (
+    EVENT_DTYPE,
+    FRAME_COLUMNS,
+    PARTICLES,
+    STORE_SUFFIX,
+    entries_per_chunk,
+    iterate_table,
+    open_sink,
+    open_store,
+)
+from graphics_4vecs.pipeline_4vecs import ThreadedSink, prefetch
+from graphics_4vecs.profile_4vecs import iterate_stage, stage
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    import pandas as pd
+
+    from graphics_4vecs.cache_4vecs import ResultCache
+    from graphics_4vecs.io_4vecs import TableSink
+
+# uproot, pandas and the process pool are imported inside the functions that
+# use them, so importing this module stays cheap.
 
 log = logging.getLogger("graphics_4vecs")
 
 
-def read_root_file(root_file_path: str, tree_name: str) -> awkward.highlevel.Array:
+DEFAULT_STEP_SIZE = "100 MB"
+
+# Number of events copied at a time when branches are interleaved into rows
+INTERLEAVE_BLOCK = 65536
+
+# Float types four-momenta can be processed and stored in. float32 halves
+# memory and output size; see compare_precision for what it costs.
+PRECISIONS: dict[str, type[np.floating[Any]]] = {
+    "float64": np.float64,
+    "float32": np.float32,
+}
+
+REST_FRAME_BRANCHES: dict[str, str] = {
+    "K_E": "_1_Kplus_E",
+    "K_px": "_1_Kplus_Px",
+    "K_py": "_1_Kplus_Py",
+    "K_pz": "_1_Kplus_Pz",
+    "pi_minus_2_E": "_2_piminus_E",
+    "pi_minus_2_px": "_2_piminus_Px",
+    "pi_minus_2_py": "_2_piminus_Py",
+    "pi_minus_2_pz": "_2_piminus_Pz",
+    "pi_minus_3_E": "_3_piminus_E",
+    "pi_minus_3_px": "_3_piminus_Px",
+    "pi_minus_3_py": "_3_piminus_Py",
+    "pi_minus_3_pz": "_3_piminus_Pz",
+    "pi_plus_4_E": "_4_piplus_E",
+    "pi_plus_4_px": "_4_piplus_Px",
+    "pi_plus_4_py": "_4_piplus_Py",
+    "pi_plus_4_pz": "_4_piplus_Pz",
+}
+
+
+def rename_branch(branch_name: str) -> str:
+    """
+    Replace the ROOT charge markers in a branch name.
+
+    Args:
+        branch_name (str): Branch name as stored in the ROOT file.
+
+    Returns:
+        str: Branch name with "#" replaced by "plus" and "~" by "minus".
+    """
+    return branch_name.replace("#", "plus").replace("~", "minus")
+
+
+def select_branches(
+    branch_names: Iterable[str],
+    branches: Iterable[str] | None = None,
+    filter_name: str | None = None,
+) -> dict[str, str]:
+    """
+    Map the branches to read onto their renamed names.
+
+    Branches are matched by their renamed names (e.g. "_1_Kplus_E"); names as
+    stored in the ROOT file (e.g. "_1_K#_E") are accepted as well.
+
+    Args:
+        branch_names (iterable of str): Branch names as stored in the ROOT file.
+        branches (iterable of str, optional): Explicit list of branches to read.
+        filter_name (str, optional): Glob pattern, or regular expression
+            written as "/pattern/", that renamed branch names must match.
+
+    Returns:
+        dict: Mapping from branch names in the ROOT file to renamed names, in
+        file order.
+    """
+    renamed = {branch_name: rename_branch(branch_name) for branch_name in branch_names}
+
+    if branches is not None:
+        wanted = {rename_branch(branch_name) for branch_name in branches}
+        missing = wanted - set(renamed.values())
+        if missing:
+            msg = f"Branches not found in tree: {sorted(missing)}"
+            raise KeyError(msg)
+        renamed = {key: name for key, name in renamed.items() if name in wanted}
+
+    if filter_name is not None:
+        if (
+            len(filter_name) > 1
+            and filter_name.startswith("/")
+            and filter_name.endswith("/")
+        ):
+            pattern = re.compile(filter_name[1:-1])
+            renamed = {
+                key: name for key, name in renamed.items() if pattern.search(name)
+            }
+        else:
+            renamed = {
+                key: name
+                for key, name in renamed.items()
+                if fnmatch.fnmatchcase(name, filter_name)
+            }
+
+    return renamed
+
+
+def _num_entries(arrays: dict[str, npt.NDArray[Any]]) -> int:
+    return len(next(iter(arrays.values()), ()))
+
+
+def _nbytes(arrays: dict[str, npt.NDArray[Any]]) -> int:
+    return sum(array.nbytes for array in arrays.values())
+
+
+def read_root_file(
+    root_file_path: str,
+    tree_name: str,
+    branches: Iterable[str] | None = None,
+    filter_name: str | None = None,
+) -> dict[str, npt.NDArray[Any]]:
     """
     Read a ROOT file and extract branch arrays.
 
     Args:
         root_file_path (str): Path to the ROOT file.
         tree_name (str): Name of the tree in the ROOT file.
+        branches (iterable of str, optional): Only read these branches.
+        filter_name (str, optional): Only read branches matching this glob
+            pattern or "/regex/". See :func:`select_branches`.
 
     Returns:
-        dict: Dictionary containing branch arrays.
-    """
-    root_file = uproot.open(root_file_path)
-    tree = root_file[tree_name]
-    branches = tree.keys()
-
-    branch_arrays = {}
-
-    for branch_name in branches:
-        renamed_branch_name = branch_name.replace("#", "plus").replace("~", "minus")
-        branch_array = tree[branch_name].array()
-        branch_arrays[renamed_branch_name] = branch_array
-
-    return branch_arrays
-
-
-if len(sys.argv) != 3:
-    root_file_path = "zenodo_version_D02Kpipipi_td_1000000events.root"
-    tree_name = "DalitzEventList"
-else:
-    root_file_path = sys.argv[1]
-    tree_name = sys.argv[2]
-
-branches = read_root_file(root_file_path, tree_name)
-
-if not branches:
-    log = logging.getLogger("Error: Empty branches.")
-    exit()
-
-rest_frame: dict[str, list[float]] = {
-    "K_E": branches.get("_1_Kplus_E", []),
-    "K_px": branches.get("_1_Kplus_Px", []),
-    "K_py": branches.get("_1_Kplus_Py", []),
-    "K_pz": branches.get("_1_Kplus_Pz", []),
-    "pi_minus_2_E": branches.get("_2_piminus_E", []),
-    "pi_minus_2_px": branches.get("_2_piminus_Px", []),
-    "pi_minus_2_py": branches.get("_2_piminus_Py", []),
-    "pi_minus_2_pz": branches.get("_2_piminus_Pz", []),
-    "pi_minus_3_E": branches.get("_3_piminus_E", []),
-    "pi_minus_3_px": branches.get("_3_piminus_Px", []),
-    "pi_minus_3_py": branches.get("_3_piminus_Py", []),
-    "pi_minus_3_pz": branches.get("_3_piminus_Pz", []),
-    "pi_plus_4_E": branches.get("_4_piplus_E", []),
-    "pi_plus_4_px": branches.get("_4_piplus_Px", []),
-    "pi_plus_4_py": branches.get("_4_piplus_Py", []),
-    "pi_plus_4_pz": branches.get("_4_piplus_Pz", []),
-}
+        dict: Dictionary containing branch arrays, as NumPy arrays.
+    """
+    import uproot
+
+    with uproot.open(root_file_path) as root_file:
+        with stage("open"):
+            tree = root_file[tree_name]
+            selected = select_branches(tree.keys(), branches, filter_name)
+        with stage("read") as reading:
+            # One call decodes all branches straight into NumPy arrays
+            arrays = tree.arrays(filter_name=selected.__contains__, library="np")
+            reading.add(_num_entries(arrays), _nbytes(arrays))
+
+    with stage("rename"):
+        return {
+            renamed_branch_name: arrays[branch_name]
+            for branch_name, renamed_branch_name in selected.items()
+        }
+
+
+def chunk_bytes_per_event(input_path: str, num_tables: int = 2) -> int:
+    """
+    Estimate the memory one event of a chunk takes while the chunk is
+    processed, to turn a memory ceiling such as "100 MB" into entries.
+
+    Besides the tables, an event holds one more table-sized block for the
+    temporaries of the Lorentz transformation and, when read from a ROOT
+    file, one for the decoded branches, which are copied into the rest-frame
+    table. ROOT baskets larger than a chunk are still read whole.
+
+    Args:
+        input_path (str): ROOT file or rest-frame event store the chunk is
+            read from.
+        num_tables (int): Number of four-momentum tables of the chunk alive at
+            the same time, e.g. 2 for the rest frame and one lab frame.
+
+    Returns:
+        int: Bytes per event.
+    """
+    # Event stores are memory mapped, so reading them allocates nothing
+    extra = 1 if input_path.endswith(STORE_SUFFIX) else 2
+    return EVENT_DTYPE.itemsize * (num_tables + extra)
+
+
+def iterate_root_file(
+    root_file_path: str,
+    tree_name: str,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    branches: Iterable[str] | None = None,
+    filter_name: str | None = None,
+    entry_start: int | None = None,
+    entry_stop: int | None = None,
+) -> Iterator[dict[str, npt.NDArray[Any]]]:
+    """
+    Read a ROOT file in chunks of entries and extract branch arrays.
+
+    Only one chunk is held in memory at a time, so files larger than memory
+    can be processed with a bounded footprint.
+
+    Args:
+        root_file_path (str): Path to the ROOT file.
+        tree_name (str): Name of the tree in the ROOT file.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        branches (iterable of str, optional): Only read these branches.
+        filter_name (str, optional): Only read branches matching this glob
+            pattern or "/regex/". See :func:`select_branches`.
+        entry_start (int, optional): First entry to read.
+        entry_stop (int, optional): Entry to stop before.
+
+    Yields:
+        dict: Dictionary containing the branch arrays of one chunk.
+    """
+    import uproot
+
+    with uproot.open(root_file_path) as root_file:
+        with stage("open"):
+            tree = root_file[tree_name]
+            selected = select_branches(tree.keys(), branches, filter_name)
+        chunks = tree.iterate(
+            filter_name=selected.__contains__,
+            step_size=step_size,
+            entry_start=entry_start,
+            entry_stop=entry_stop,
+            library="np",
+        )
+        for chunk in iterate_stage("read", chunks, _num_entries, _nbytes):
+            with stage("rename"):
+                renamed = {
+                    selected[branch_name]: branch_array
+                    for branch_name, branch_array in chunk.items()
+                }
+            yield renamed
+
+
+def _precision_dtype(precision: str) -> type[np.floating[Any]]:
+    """
+    Look up the float type of a precision name such as "float32".
+    """
+    if precision not in PRECISIONS:
+        msg = f"Unknown precision {precision!r}; choose from {list(PRECISIONS)}"
+        raise ValueError(msg)
+    return PRECISIONS[precision]
+
+
+def build_rest_frame(
+    branches: dict[str, Any], precision: str = "float64"
+) -> pd.DataFrame:
+    """
+    Select the daughter four-momenta from renamed branch arrays.
+
+    The branches are copied once into a single (events, 16) array that the
+    table is a view of, so :func:`build_lab_frame` can reshape it into
+    (events, particles, 4) four-momenta without copying.
+
+    Args:
+        branches (dict): Renamed branch arrays, as returned by
+            :func:`read_root_file` or :func:`iterate_root_file`.
+        precision (str): "float64", or "float32" to round the branches to
+            single precision.
+
+    Returns:
+        pd.DataFrame: Rest-frame four-momenta with one column per component.
+    """
+    import pandas as pd
+
+    dtype = _precision_dtype(precision)
+
+    present = [name for name in REST_FRAME_BRANCHES.values() if name in branches]
+    if not present:
+        return pd.DataFrame(columns=list(REST_FRAME_BRANCHES), dtype=dtype)
+    if len(present) < len(REST_FRAME_BRANCHES):
+        missing = sorted(set(REST_FRAME_BRANCHES.values()) - set(present))
+        msg = f"Branches not found: {missing}"
+        raise KeyError(msg)
+
+    columns = [branches[branch_name] for branch_name in REST_FRAME_BRANCHES.values()]
+    with stage("frame", events=len(columns[0])):
+        values = np.empty((len(columns[0]), len(columns)), dtype=dtype)
+        # Interleaving block by block keeps the writes within the CPU cache
+        for start in range(0, len(values), INTERLEAVE_BLOCK):
+            stop = start + INTERLEAVE_BLOCK
+            np.stack(
+                [column[start:stop] for column in columns],
+                axis=1,
+                out=values[start:stop],
+            )
+        return pd.DataFrame(values, columns=list(REST_FRAME_BRANCHES), copy=False)
+
+
+SPEED_OF_LIGHT = 299792458  # Speed of light in meters per second
+
+
+def boost_matrix(v: float) -> npt.NDArray[np.float64]:
+    """
+    Build the Lorentz boost matrix for a boost along the x-axis.
+
+    Args:
+        v (float): Velocity of the parent particle in meters per second.
+
+    Returns:
+        np.array: 4x4 boost matrix acting on (E, px, py, pz).
+    """
+    beta = v / SPEED_OF_LIGHT
+    gamma = 1 / np.sqrt(1 - beta**2)
+
+    return np.array(
+        [
+            [gamma, -gamma * beta, 0, 0],
+            [-gamma * beta, gamma, 0, 0],
+            [0, 0, 1, 0],
+            [0, 0, 0, 1],
+        ]
+    )
+
+
+def lorentz_transform_batch(
+    four_momenta: npt.ArrayLike, v: float
+) -> npt.NDArray[np.floating[Any]]:
+    """
+    Perform Lorentz transformation on an array of four-momenta.
+
+    The boost matrix is built once and applied to every four-momentum in a
+    single vectorized pass.
+
+    Args:
+        four_momenta (array_like): Four-momenta with (E, px, py, pz) along the
+            last axis, e.g. an (N, 4) array or an (N, particles, 4) array.
+        v (float): Velocity of the parent particle in meters per second.
+
+    Returns:
+        np.array: Transformed four-momenta with the same shape as the input;
+        float32 momenta stay in float32, anything else becomes float64.
+    """
+    p = np.asarray(four_momenta)
+    if p.dtype != np.float32:
+        p = p.astype(np.float64, copy=False)
+    if p.shape[-1:] != (4,):
+        msg = f"Expected four-momenta with a last axis of length 4, got shape {p.shape}"
+        raise ValueError(msg)
+
+    boosted: npt.NDArray[np.floating[Any]] = p @ boost_matrix(v).T.astype(p.dtype)
+    return boosted
+
+
+def boost_matrices(velocities: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Build the Lorentz boost matrices along the x-axis for several velocities.
+
+    Args:
+        velocities (array_like): Velocities of the parent particle in meters
+            per second.
+
+    Returns:
+        np.array: (velocities, 4, 4) boost matrices acting on (E, px, py, pz),
+        each equal to :func:`boost_matrix` of its velocity.
+    """
+    beta = np.atleast_1d(np.asarray(velocities, dtype=np.float64)) / SPEED_OF_LIGHT
+    if beta.ndim != 1 or np.any(np.abs(beta) >= 1):
+        msg = "Expected a 1D array of velocities below the speed of light"
+        raise ValueError(msg)
+    gamma = 1 / np.sqrt(1 - beta**2)
+
+    matrices = np.zeros((len(beta), 4, 4))
+    matrices[:, 0, 0] = matrices[:, 1, 1] = gamma
+    matrices[:, 0, 1] = matrices[:, 1, 0] = -gamma * beta
+    matrices[:, 2, 2] = matrices[:, 3, 3] = 1
+    return matrices
+
+
+def velocities_from_rapidities(rapidities: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert rapidities y of the parent particle into velocities c * tanh(y).
+
+    Args:
+        rapidities (array_like): Rapidities along the boost axis.
+
+    Returns:
+        np.array: Velocities in meters per second.
+    """
+    velocities: npt.NDArray[np.float64] = float(SPEED_OF_LIGHT) * np.tanh(
+        np.asarray(rapidities, dtype=np.float64)
+    )
+    return velocities
 
-rest_frame_df = pd.DataFrame(rest_frame)
-rest_frame_df.to_csv("rest_frame_data.csv", index=False)
+
+def lorentz_transform_scan(
+    four_momenta: npt.ArrayLike, velocities: npt.ArrayLike
+) -> npt.NDArray[np.floating[Any]]:
+    """
+    Perform Lorentz transformations of the same four-momenta for a grid of
+    velocities in one vectorized pass.
+
+    Args:
+        four_momenta (array_like): Four-momenta with (E, px, py, pz) along the
+            last axis, e.g. an (N, particles, 4) array.
+        velocities (array_like): 1D array of velocities of the parent
+            particle in meters per second.
+
+    Returns:
+        np.array: (velocities, ...) transformed four-momenta, where entry i
+        equals ``lorentz_transform_batch(four_momenta, velocities[i])``.
+    """
+    p = np.asarray(four_momenta)
+    if p.dtype != np.float32:
+        p = p.astype(np.float64, copy=False)
+    if p.shape[-1:] != (4,):
+        msg = f"Expected four-momenta with a last axis of length 4, got shape {p.shape}"
+        raise ValueError(msg)
+
+    # (events, 4) @ (velocities, 4, 4) broadcasts to (velocities, events, 4)
+    matrices = np.swapaxes(boost_matrices(velocities), 1, 2).astype(p.dtype)
+    boosted: npt.NDArray[np.floating[Any]] = (p.reshape(-1, 4) @ matrices).reshape(
+        len(matrices), *p.shape
+    )
+    return boosted
+
+
+def boost_vector(four_momenta: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Compute the velocity of the rest frame of a system of four-momenta.
+
+    Args:
+        four_momenta (array_like): Four-momenta with (E, px, py, pz) along the
+            last axis. Sum daughter four-momenta first to get the rest frame of
+            the parent or of a subsystem, e.g. ``p_K + p_pi``.
+
+    Returns:
+        np.array: Boost vectors beta = p / E with shape ``(..., 3)``.
+    """
+    p = np.asarray(four_momenta, dtype=np.float64)
+    return p[..., 1:] / p[..., :1]
+
+
+def lorentz_boost(
+    four_momenta: npt.ArrayLike, beta: npt.ArrayLike
+) -> npt.NDArray[np.float64]:
+    """
+    Perform a general Lorentz boost with a separate boost vector per event.
+
+    Uses the closed form of the boost instead of building a 4x4 matrix per
+    event, so (N, 4) momenta and (N, 3) boost vectors are handled in a single
+    vectorized pass. Boosting by :func:`boost_vector` of a system brings that
+    system to rest.
+
+    Args:
+        four_momenta (array_like): Four-momenta with (E, px, py, pz) along the
+            last axis, e.g. an (N, 4) array.
+        beta (array_like): Boost vectors in units of the speed of light,
+            broadcastable against the momenta, e.g. an (N, 3) array. Use
+            ``beta[:, np.newaxis, :]`` to boost (N, particles, 4) momenta.
+
+    Returns:
+        np.array: Transformed four-momenta.
+    """
+    p = np.asarray(four_momenta, dtype=np.float64)
+    b = np.asarray(beta, dtype=np.float64)
+    if p.shape[-1:] != (4,):
+        msg = f"Expected four-momenta with a last axis of length 4, got shape {p.shape}"
+        raise ValueError(msg)
+    if b.shape[-1:] != (3,):
+        msg = (
+            f"Expected boost vectors with a last axis of length 3, got shape {b.shape}"
+        )
+        raise ValueError(msg)
+
+    beta2 = np.sum(b * b, axis=-1, keepdims=True)
+    if np.any(beta2 >= 1):
+        msg = "Boost vectors must satisfy |beta| < 1"
+        raise ValueError(msg)
+
+    gamma = 1 / np.sqrt(1 - beta2)
+    energy = p[..., :1]
+    momentum = p[..., 1:]
+    beta_dot_p = np.sum(b * momentum, axis=-1, keepdims=True)
+
+    # (gamma - 1) / beta^2 written as gamma^2 / (gamma + 1) to stay finite at rest
+    coefficient = gamma**2 / (gamma + 1) * beta_dot_p - gamma * energy
+    return np.concatenate(
+        [gamma * (energy - beta_dot_p), momentum + coefficient * b], axis=-1
+    )
 
 
 def lorentz_transform(
@@ -80,6 +512,9 @@ def lorentz_transform(
     """
     Perform Lorentz transformation on four-momenta.
 
+    Thin wrapper around :func:`lorentz_transform_batch`; the components may
+    also be whole columns of equal length.
+
     Args:
         E (float): Energy.
         px (float): x-component of momentum.
@@ -90,93 +525,725 @@ def lorentz_transform(
     Returns:
         np.array: Transformed four-momenta.
     """
-    p = np.array([E, px, py, pz])
-    beta = v / 299792458  # Speed of light in meters per second
-    gamma = 1 / np.sqrt(1 - beta**2)
+    return lorentz_transform_batch(np.stack([E, px, py, pz], axis=-1), v)
 
-    lambda_matrix = np.array(
-        [
-            [gamma, -gamma * beta, 0, 0],
-            [-gamma * beta, gamma, 0, 0],
-            [0, 0, 1, 0],
-            [0, 0, 0, 1],
-        ]
-    )
-    return np.dot(lambda_matrix, p)  # type: ignore[no-any-return]
-
-
-log = logging.getLogger("Performing Lorentz transformation")
-
-lab_frame: dict[str, list[float]] = {
-    "K_E": [],
-    "K_px": [],
-    "K_py": [],
-    "K_pz": [],
-    "pi_minus_2_E": [],
-    "pi_minus_2_px": [],
-    "pi_minus_2_py": [],
-    "pi_minus_2_pz": [],
-    "pi_minus_3_E": [],
-    "pi_minus_3_px": [],
-    "pi_minus_3_py": [],
-    "pi_minus_3_pz": [],
-    "pi_plus_4_E": [],
-    "pi_plus_4_px": [],
-    "pi_plus_4_py": [],
-    "pi_plus_4_pz": [],
+
+def build_lab_frame(rest_frame_df: pd.DataFrame, v: float) -> pd.DataFrame:
+    """
+    Boost a rest-frame table of daughter four-momenta into the lab frame.
+
+    Args:
+        rest_frame_df (pd.DataFrame): Rest-frame four-momenta, with columns
+            ordered (E, px, py, pz) per particle.
+        v (float): Velocity of the parent particle in meters per second.
+
+    Returns:
+        pd.DataFrame: Lab-frame four-momenta with the same columns, in float32
+        if the rest-frame table is in float32.
+    """
+    import pandas as pd
+
+    # Columns are ordered (E, px, py, pz) per particle, so the table reshapes
+    # into an (events, particles, 4) array that is boosted in one pass.
+    with stage("transform", events=len(rest_frame_df)):
+        rest_frame_array = rest_frame_df.to_numpy().reshape(len(rest_frame_df), -1, 4)
+        lab_frame_array = lorentz_transform_batch(rest_frame_array, v)
+
+        return pd.DataFrame(
+            lab_frame_array.reshape(len(rest_frame_df), -1),
+            columns=rest_frame_df.columns,
+            copy=False,
+        )
+
+
+def _write_chunk(sink: TableSink, df: pd.DataFrame) -> None:
+    with stage("write", events=len(df)):
+        sink.write(df)
+
+
+# Invariant masses of all pairs and triples of particles, e.g. "m_K_pi_minus_2"
+MASS_COMBINATIONS: dict[str, tuple[int, ...]] = {
+    "m_" + "_".join(PARTICLES[i] for i in indices): indices
+    for size in (2, 3)
+    for indices in combinations(range(len(PARTICLES)), size)
 }
 
-v = 0.5 * 299792458  # Example velocity: half the speed of light
+# Squared invariant masses spanning the four-body phase space, numbered like
+# the particles in the ROOT branches: s_12 = m^2(K pi-), s_234 = m^2(pi- pi- pi+)
+DALITZ_COMBINATIONS: dict[str, tuple[int, ...]] = {
+    "s_12": (0, 1),
+    "s_23": (1, 2),
+    "s_34": (2, 3),
+    "s_123": (0, 1, 2),
+    "s_234": (1, 2, 3),
+}
+
+KINEMATICS_COLUMNS = [*MASS_COMBINATIONS, *DALITZ_COMBINATIONS]
+
+
+def invariant_mass_squared(four_momenta: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Compute the squared invariant mass E^2 - |p|^2 of four-momenta.
 
-for i in range(len(rest_frame["K_E"])):
-    P_d1_lab = lorentz_transform(
-        rest_frame["K_E"][i],
-        rest_frame["K_px"][i],
-        rest_frame["K_py"][i],
-        rest_frame["K_pz"][i],
-        v,
+    Args:
+        four_momenta (array_like): Four-momenta with (E, px, py, pz) along the
+            last axis; sum daughter four-momenta first for a system.
+
+    Returns:
+        np.array: Squared invariant masses with the last axis removed.
+    """
+    p = np.asarray(four_momenta, dtype=np.float64)
+    mass_squared: npt.NDArray[np.float64] = p[..., 0] ** 2 - np.sum(
+        p[..., 1:] ** 2, axis=-1
     )
-    P_d2_lab = lorentz_transform(
-        rest_frame["pi_minus_2_E"][i],
-        rest_frame["pi_minus_2_px"][i],
-        rest_frame["pi_minus_2_py"][i],
-        rest_frame["pi_minus_2_pz"][i],
-        v,
+    return mass_squared
+
+
+def build_kinematics(frame_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the invariant masses and Dalitz variables of every event.
+
+    Invariants do not depend on the frame, so rest-frame and lab-frame tables
+    give the same values up to rounding.
+
+    Args:
+        frame_df (pd.DataFrame): Rest- or lab-frame four-momenta, with columns
+            ordered (E, px, py, pz) per particle.
+
+    Returns:
+        pd.DataFrame: ``KINEMATICS_COLUMNS``: invariant masses (GeV) of all
+        pairs and triples of particles, and the squared masses (GeV^2)
+        s_12, s_23, s_34, s_123 and s_234, with the index of ``frame_df``.
+    """
+    import pandas as pd
+
+    with stage("kinematics", events=len(frame_df)):
+        four_momenta = frame_df.to_numpy(dtype=np.float64).reshape(len(frame_df), -1, 4)
+        squared_masses = {
+            indices: invariant_mass_squared(sum(four_momenta[:, i] for i in indices))
+            for indices in MASS_COMBINATIONS.values()
+        }
+        # Rounding can make masses at threshold slightly negative
+        columns = {
+            name: np.sqrt(np.maximum(squared_masses[indices], 0))
+            for name, indices in MASS_COMBINATIONS.items()
+        }
+        for name, indices in DALITZ_COMBINATIONS.items():
+            columns[name] = squared_masses[indices]
+        return pd.DataFrame(columns, index=frame_df.index)
+
+
+def iterate_rest_frame(
+    root_file_path: str,
+    tree_name: str,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    entry_start: int | None = None,
+    entry_stop: int | None = None,
+    precision: str = "float64",
+) -> Iterator[pd.DataFrame]:
+    """
+    Read rest-frame four-momenta in chunks from a ROOT file or an event store.
+
+    Event stores (".evstore" files, see :func:`convert_to_store`) are memory
+    mapped, so no ROOT decoding happens for them.
+
+    Args:
+        root_file_path (str): Path to the ROOT file or rest-frame event store.
+        tree_name (str): Name of the tree in the ROOT file.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        entry_start (int, optional): First entry to read.
+        entry_stop (int, optional): Entry to stop before.
+        precision (str): "float64" or "float32"; see ``PRECISIONS``.
+
+    Yields:
+        pd.DataFrame: Rest-frame four-momenta of one chunk.
+    """
+    dtype = _precision_dtype(precision)
+    if isinstance(step_size, str) and not root_file_path.endswith(STORE_SUFFIX):
+        # uproot would only count the decoded arrays against the ceiling
+        step_size = entries_per_chunk(
+            step_size, chunk_bytes_per_event(root_file_path, 1)
+        )
+    if root_file_path.endswith(STORE_SUFFIX):
+        store = open_store(root_file_path)
+        if store.header.get("frame") != "rest":
+            msg = f"{root_file_path} does not hold rest-frame four-momenta"
+            raise ValueError(msg)
+        for chunk in store.iterate(step_size, entry_start, entry_stop):
+            # Chunks already in this precision stay views of the store
+            yield chunk.astype(dtype) if (chunk.dtypes != dtype).any() else chunk
+        return
+
+    for branches in iterate_root_file(
+        root_file_path,
+        tree_name,
+        step_size,
+        branches=REST_FRAME_BRANCHES.values(),
+        entry_start=entry_start,
+        entry_stop=entry_stop,
+    ):
+        yield build_rest_frame(branches, precision)
+
+
+def count_entries(root_file_path: str, tree_name: str) -> int:
+    """
+    Count the entries of a ROOT tree or event store without reading them.
+
+    Args:
+        root_file_path (str): Path to the ROOT file or event store.
+        tree_name (str): Name of the tree in the ROOT file.
+
+    Returns:
+        int: Number of entries.
+    """
+    if root_file_path.endswith(STORE_SUFFIX):
+        return len(open_store(root_file_path))
+
+    import uproot
+
+    with uproot.open(root_file_path) as root_file:
+        return int(root_file[tree_name].num_entries)
+
+
+def convert_to_store(
+    root_file_path: str,
+    tree_name: str,
+    store_path: str,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+) -> int:
+    """
+    Convert the rest-frame four-momenta of a ROOT file into an event store.
+
+    Later runs can pass the store instead of the ROOT file to skip decoding.
+
+    Args:
+        root_file_path (str): Path to the ROOT file.
+        tree_name (str): Name of the tree in the ROOT file.
+        store_path (str): Path of the event store to write.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+
+    Returns:
+        int: Number of events stored.
+    """
+    num_events = 0
+    metadata = {"source": root_file_path, "tree_name": tree_name, "frame": "rest"}
+    with open_sink(store_path, "evstore", metadata=metadata) as store_sink:
+        for rest_frame_df in iterate_rest_frame(root_file_path, tree_name, step_size):
+            _write_chunk(store_sink, rest_frame_df)
+            num_events += len(rest_frame_df)
+
+    return num_events
+
+
+def write_kinematics(
+    input_path: str,
+    output_path: str,
+    tree_name: str = "DalitzEventList",
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    output_format: str | None = None,
+    compression: str | None = None,
+) -> int:
+    """
+    Compute the invariant masses and Dalitz variables of a file chunk by chunk.
+
+    Args:
+        input_path (str): ROOT file, rest-frame event store, or rest- or
+            lab-frame table written by :func:`run_pipeline`.
+        output_path (str): Path of the table to write.
+        tree_name (str): Name of the tree if the input is a ROOT file.
+        step_size (int or str): Number of events per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        output_format (str, optional): Table format; inferred from the suffix
+            of ``output_path`` by default.
+        compression (str, optional): Compression codec for the table format.
+
+    Returns:
+        int: Number of events.
+    """
+    frames: Iterable[pd.DataFrame]
+    if input_path.endswith(".root"):
+        frames = iterate_rest_frame(input_path, tree_name, step_size)
+    else:
+        step = entries_per_chunk(step_size, EVENT_DTYPE.itemsize)
+        frames = iterate_table(input_path, step, FRAME_COLUMNS)
+
+    num_events = 0
+    with open_sink(output_path, output_format, compression) as sink:
+        for frame_df in frames:
+            _write_chunk(sink, build_kinematics(frame_df))
+            num_events += len(frame_df)
+    return num_events
+
+
+def _process_entry_range(
+    root_file_path: str,
+    tree_name: str,
+    entry_start: int,
+    entry_stop: int,
+    v: float,
+    precision: str = "float64",
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Read and boost one range of entries; run in a worker process.
+
+    Returns:
+        tuple: Rest-frame and lab-frame tables of the range.
+    """
+    import pandas as pd
+
+    chunks = list(
+        iterate_rest_frame(
+            root_file_path,
+            tree_name,
+            entry_stop - entry_start,
+            entry_start,
+            entry_stop,
+            precision,
+        )
     )
-    P_d3_lab = lorentz_transform(
-        rest_frame["pi_minus_3_E"][i],
-        rest_frame["pi_minus_3_px"][i],
-        rest_frame["pi_minus_3_py"][i],
-        rest_frame["pi_minus_3_pz"][i],
-        v,
+    # The range is read as one chunk, which is used as is rather than copied
+    rest_frame_df = (
+        chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
     )
-    P_d4_lab = lorentz_transform(
-        rest_frame["pi_plus_4_E"][i],
-        rest_frame["pi_plus_4_px"][i],
-        rest_frame["pi_plus_4_py"][i],
-        rest_frame["pi_plus_4_pz"][i],
-        v,
+    return rest_frame_df, build_lab_frame(rest_frame_df, v)
+
+
+def iterate_frames_parallel(
+    root_file_path: str,
+    tree_name: str,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    v: float = 0.5 * SPEED_OF_LIGHT,
+    workers: int | None = None,
+    precision: str = "float64",
+) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Read and boost ranges of entries across a process pool.
+
+    The tree is split into ranges of one chunk each. Results are yielded in
+    the original entry order, and at most two ranges per worker are in flight
+    so memory stays bounded when the consumer is slower than the workers.
+
+    Args:
+        root_file_path (str): Path to the ROOT file or rest-frame event store.
+        tree_name (str): Name of the tree in the ROOT file.
+        step_size (int or str): Number of entries per range, or a memory
+            ceiling per range such as "100 MB".
+        v (float): Velocity of the parent particle in meters per second.
+        workers (int, optional): Number of worker processes; defaults to the
+            number of CPUs.
+        precision (str): "float64" or "float32"; see ``PRECISIONS``.
+
+    Yields:
+        tuple: Rest-frame and lab-frame tables of one range.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    step = entries_per_chunk(step_size, chunk_bytes_per_event(root_file_path))
+    num_entries = count_entries(root_file_path, tree_name)
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque[Future[tuple[pd.DataFrame, pd.DataFrame]]] = deque()
+        for entry_start in range(0, num_entries, step):
+            pending.append(
+                executor.submit(
+                    _process_entry_range,
+                    root_file_path,
+                    tree_name,
+                    entry_start,
+                    min(entry_start + step, num_entries),
+                    v,
+                    precision,
+                )
+            )
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_pipeline(
+    root_file_path: str,
+    tree_name: str,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    output_format: str = "csv",
+    compression: str | None = None,
+    v: float = 0.5 * SPEED_OF_LIGHT,
+    workers: int = 1,
+    precision: str = "float64",
+    cache: ResultCache | None = None,
+    pipeline_depth: int = 0,
+    output_dir: str = ".",
+) -> int:
+    """
+    Convert a ROOT file into rest-frame and lab-frame tables, chunk by chunk.
+
+    Writes "rest_frame_data.<format>" and "lab_frame_data.<format>" to the
+    output directory. Chunk boundaries only depend on ``step_size``, so the
+    output is byte-identical for any number of workers, and cached outputs
+    are reused whatever the number of workers.
+
+    Args:
+        root_file_path (str): Path to the ROOT file, or to a rest-frame event
+            store made by :func:`convert_to_store`.
+        tree_name (str): Name of the tree in the ROOT file.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB"; see
+            :func:`chunk_bytes_per_event`. The Parquet and Feather writers
+            need encoding buffers on top of it, and the .npy and .npz
+            writers keep all chunks until they close.
+        output_format (str): Table format, one of "csv", "parquet", "feather",
+            "npz", "npy" or "evstore".
+        compression (str, optional): Compression codec for the table format.
+        v (float): Velocity of the parent particle in meters per second.
+        workers (int): Number of worker processes; 1 runs in this process.
+        precision (str): "float64", or "float32" to read, boost and write the
+            four-momenta in single precision.
+        cache (ResultCache, optional): Copy the outputs from this cache if the
+            same input was processed with the same parameters and code, and
+            store them in it otherwise.
+        pipeline_depth (int): If positive, read ahead in one background
+            thread and write in two more, with this many chunks queued
+            between the threads, so decompression, boosting and writing
+            overlap. 0 runs them one after the other.
+        output_dir (str): Existing directory to write the tables to.
+
+    Returns:
+        int: Number of chunks processed.
+    """
+    from contextlib import ExitStack
+
+    if pipeline_depth < 0:
+        msg = f"Pipeline depth must not be negative, not {pipeline_depth}"
+        raise ValueError(msg)
+    # Memory sizes are converted here with the memory of an event in flight,
+    # so the serial and parallel paths split the tree at the same entries
+    step = entries_per_chunk(step_size, chunk_bytes_per_event(root_file_path))
+    output_paths = [
+        str(Path(output_dir) / f"{frame}_frame_data.{output_format}")
+        for frame in ("rest", "lab")
+    ]
+    metadata = {"source": root_file_path, "tree_name": tree_name}
+
+    if cache is not None:
+        key = cache.key(
+            root_file_path,
+            tree_name=tree_name,
+            branches=list(REST_FRAME_BRANCHES.values()),
+            step=step,
+            output_format=output_format,
+            compression=compression,
+            v=v,
+            precision=precision,
+            # Only event stores record the source path in the outputs
+            metadata=metadata if output_format == "evstore" else None,
+        )
+        entry = cache.get(key)
+        if entry is not None:
+            try:
+                for output_path in output_paths:
+                    shutil.copyfile(entry.path / Path(output_path).name, output_path)
+            except OSError:
+                # Evicted by another process while it was copied
+                log.debug("Cache entry %s disappeared; processing again", key)
+            else:
+                log.info("Copied the outputs of %s from the cache", root_file_path)
+                return int(entry.metadata["num_chunks"])
+    frames: Iterable[tuple[pd.DataFrame, pd.DataFrame]]
+    if workers > 1:
+        frames = iterate_frames_parallel(
+            root_file_path, tree_name, step, v, workers, precision
+        )
+        if pipeline_depth:
+            frames = prefetch(frames, pipeline_depth)
+    else:
+        rest_frames = iterate_rest_frame(
+            root_file_path, tree_name, step, precision=precision
+        )
+        if pipeline_depth:
+            rest_frames = prefetch(rest_frames, pipeline_depth)
+        frames = (
+            (rest_frame_df, build_lab_frame(rest_frame_df, v))
+            for rest_frame_df in rest_frames
+        )
+
+    num_chunks = 0
+    with ExitStack() as stack:
+        sinks = []
+        for output_path, sink_metadata in zip(
+            output_paths,
+            (
+                {**metadata, "frame": "rest"},
+                {**metadata, "frame": "lab", "velocity": str(v)},
+            ),
+            strict=True,
+        ):
+            sink = open_sink(output_path, output_format, compression, sink_metadata)
+            if pipeline_depth:
+                sink = ThreadedSink(sink, pipeline_depth)
+            sinks.append(stack.enter_context(sink))
+        rest_frame_sink, lab_frame_sink = sinks
+        for rest_frame_df, lab_frame_df in frames:
+            _write_chunk(rest_frame_sink, rest_frame_df)
+            _write_chunk(lab_frame_sink, lab_frame_df)
+            num_chunks += 1
+
+    if cache is not None and num_chunks:
+        cache.put(key, output_paths, {**metadata, "num_chunks": num_chunks})
+    return num_chunks
+
+
+def scan_output_path(v: float, output_format: str, stem: str = "lab_frame_data") -> str:
+    """
+    Name the output of one velocity of a scan, e.g. "lab_frame_data_beta0.5.csv".
+
+    Args:
+        v (float): Velocity of the parent particle in meters per second.
+        output_format (str): File suffix without the dot.
+        stem (str): Name of the output without the velocity.
+
+    Returns:
+        str: File name with the velocity as a fraction of the speed of light.
+    """
+    return f"{stem}_beta{v / SPEED_OF_LIGHT:.6g}.{output_format}"
+
+
+def iterate_scan(
+    root_file_path: str,
+    tree_name: str,
+    velocities: npt.ArrayLike,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    precision: str = "float64",
+) -> Iterator[tuple[pd.DataFrame, list[pd.DataFrame]]]:
+    """
+    Read rest-frame four-momenta once and boost every chunk for all velocities.
+
+    A memory size is divided over the rest frame and the lab frame of every
+    velocity, so a chunk with all its boosts stays below it.
+
+    Args:
+        root_file_path (str): Path to the ROOT file or rest-frame event store.
+        tree_name (str): Name of the tree in the ROOT file.
+        velocities (array_like): Velocities of the parent particle in meters
+            per second.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        precision (str): "float64" or "float32"; see ``PRECISIONS``.
+
+    Yields:
+        tuple: Rest-frame table of one chunk and its lab-frame table for each
+        velocity. The lab-frame tables are views of one boosted array.
+    """
+    import pandas as pd
+
+    num_velocities = len(np.atleast_1d(velocities))
+    step = entries_per_chunk(
+        step_size, chunk_bytes_per_event(root_file_path, num_velocities + 1)
     )
+    for rest_frame_df in iterate_rest_frame(
+        root_file_path, tree_name, step, precision=precision
+    ):
+        num_events = len(rest_frame_df)
+        with stage("transform", events=num_events * num_velocities):
+            lab_frame_arrays = lorentz_transform_scan(
+                rest_frame_df.to_numpy().reshape(num_events, -1, 4), velocities
+            )
+        yield rest_frame_df, [
+            pd.DataFrame(
+                lab_frame_array.reshape(num_events, -1),
+                columns=rest_frame_df.columns,
+                copy=False,
+            )
+            for lab_frame_array in lab_frame_arrays
+        ]
+
+
+def run_scan(
+    root_file_path: str,
+    tree_name: str,
+    velocities: npt.ArrayLike,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    output_format: str = "csv",
+    compression: str | None = None,
+    precision: str = "float64",
+    output_dir: str = ".",
+) -> list[str]:
+    """
+    Convert a ROOT file into lab-frame tables for a grid of velocities.
+
+    The input is read once. Writes "rest_frame_data.<format>" and one
+    lab-frame table per velocity, named by :func:`scan_output_path`, to the
+    output directory.
+
+    Args:
+        root_file_path (str): Path to the ROOT file, or to a rest-frame event
+            store made by :func:`convert_to_store`.
+        tree_name (str): Name of the tree in the ROOT file.
+        velocities (array_like): Velocities of the parent particle in meters
+            per second.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        output_format (str): Table format, one of "csv", "parquet", "feather",
+            "npz", "npy" or "evstore".
+        compression (str, optional): Compression codec for the table format.
+        precision (str): "float64" or "float32"; see ``PRECISIONS``.
+        output_dir (str): Existing directory to write the tables to.
+
+    Returns:
+        list of str: Paths of the lab-frame tables, in the order of the
+        velocities.
+    """
+    from contextlib import ExitStack
+
+    velocities = np.atleast_1d(np.asarray(velocities, dtype=np.float64))
+    lab_frame_paths = [
+        str(Path(output_dir) / scan_output_path(v, output_format)) for v in velocities
+    ]
+    if len(set(lab_frame_paths)) != len(lab_frame_paths):
+        msg = "Velocities of a scan must differ in the first 6 significant digits"
+        raise ValueError(msg)
+
+    metadata = {"source": root_file_path, "tree_name": tree_name}
+    with ExitStack() as stack:
+        rest_frame_sink = stack.enter_context(
+            open_sink(
+                Path(output_dir) / f"rest_frame_data.{output_format}",
+                output_format,
+                compression,
+                {**metadata, "frame": "rest"},
+            )
+        )
+        lab_frame_sinks = [
+            stack.enter_context(
+                open_sink(
+                    path,
+                    output_format,
+                    compression,
+                    {**metadata, "frame": "lab", "velocity": str(v)},
+                )
+            )
+            for path, v in zip(lab_frame_paths, velocities, strict=True)
+        ]
+        for rest_frame_df, lab_frame_dfs in iterate_scan(
+            root_file_path, tree_name, velocities, step_size, precision
+        ):
+            _write_chunk(rest_frame_sink, rest_frame_df)
+            for lab_frame_sink, lab_frame_df in zip(
+                lab_frame_sinks, lab_frame_dfs, strict=True
+            ):
+                _write_chunk(lab_frame_sink, lab_frame_df)
+
+    return lab_frame_paths
+
+
+@dataclass
+class PrecisionReport:
+    """
+    Deviation of the float32 pipeline from the float64 pipeline.
+
+    Quantities are "rest_frame" and "lab_frame" (all four-momentum
+    components), "m_parent" (invariant mass of all four daughters),
+    "invariant_masses" (``MASS_COMBINATIONS``) and "dalitz_variables"
+    (``DALITZ_COMBINATIONS``). Masses are computed from the float32 lab-frame
+    table, as a downstream analysis would.
+
+    Attributes:
+        num_events (int): Number of events compared.
+        max_abs (dict): Largest absolute deviation of each quantity, in GeV
+            or GeV^2.
+        max_rel (dict): Largest deviation of each quantity relative to its
+            float64 value; large for components that boost to nearly zero.
+    """
+
+    num_events: int = 0
+    max_abs: dict[str, float] = field(default_factory=dict)
+    max_rel: dict[str, float] = field(default_factory=dict)
+
+    def update(
+        self, quantity: str, reference: npt.ArrayLike, value: npt.ArrayLike
+    ) -> None:
+        """
+        Add the deviations of a chunk of values from their float64 reference.
+        """
+        reference = np.asarray(reference, dtype=np.float64)
+        deviation = np.abs(np.asarray(value, dtype=np.float64) - reference)
+        scale = np.abs(reference)
+        relative = np.divide(
+            deviation, scale, out=np.zeros_like(deviation), where=scale > 0
+        )
+        self.max_abs[quantity] = max(
+            self.max_abs.get(quantity, 0.0), float(deviation.max(initial=0))
+        )
+        self.max_rel[quantity] = max(
+            self.max_rel.get(quantity, 0.0), float(relative.max(initial=0))
+        )
 
-    lab_frame["K_E"].append(P_d1_lab[0])
-    lab_frame["K_px"].append(P_d1_lab[1])
-    lab_frame["K_py"].append(P_d1_lab[2])
-    lab_frame["K_pz"].append(P_d1_lab[3])
+    def summary(self) -> str:
+        """
+        Describe the deviations as a table with one line per quantity.
+        """
+        lines = [f"float32 vs float64 over {self.num_events} events:"]
+        for quantity, max_abs in self.max_abs.items():
+            lines.append(
+                f"  {quantity:<18} max abs {max_abs:.3g}"
+                f"  max rel {self.max_rel[quantity]:.3g}"
+            )
+        return "\n".join(lines)
 
-    lab_frame["pi_minus_2_E"].append(P_d2_lab[0])
-    lab_frame["pi_minus_2_px"].append(P_d2_lab[1])
-    lab_frame["pi_minus_2_py"].append(P_d2_lab[2])
-    lab_frame["pi_minus_2_pz"].append(P_d2_lab[3])
 
-    lab_frame["pi_minus_3_E"].append(P_d3_lab[0])
-    lab_frame["pi_minus_3_px"].append(P_d3_lab[1])
-    lab_frame["pi_minus_3_py"].append(P_d3_lab[2])
-    lab_frame["pi_minus_3_pz"].append(P_d3_lab[3])
+def _parent_mass(frame_df: pd.DataFrame) -> npt.NDArray[np.float64]:
+    four_momenta = frame_df.to_numpy(dtype=np.float64).reshape(len(frame_df), -1, 4)
+    mass_squared = invariant_mass_squared(four_momenta.sum(axis=1))
+    mass: npt.NDArray[np.float64] = np.sqrt(np.maximum(mass_squared, 0))
+    return mass
 
-    lab_frame["pi_plus_4_E"].append(P_d4_lab[0])
-    lab_frame["pi_plus_4_px"].append(P_d4_lab[1])
-    lab_frame["pi_plus_4_py"].append(P_d4_lab[2])
-    lab_frame["pi_plus_4_pz"].append(P_d4_lab[3])
 
-lab_frame_df = pd.DataFrame(lab_frame)
-lab_frame_df.to_csv("lab_frame_data.csv", index=False)
+def compare_precision(
+    root_file_path: str,
+    tree_name: str,
+    step_size: int | str = DEFAULT_STEP_SIZE,
+    v: float = 0.5 * SPEED_OF_LIGHT,
+    max_events: int | None = None,
+) -> PrecisionReport:
+    """
+    Run the float64 and float32 pipelines side by side and compare them.
+
+    Use the report to decide whether ``precision="float32"`` is accurate
+    enough, e.g. for visualization or histograms with coarse bins.
+
+    Args:
+        root_file_path (str): Path to the ROOT file or rest-frame event store.
+        tree_name (str): Name of the tree in the ROOT file.
+        step_size (int or str): Number of entries per chunk, or a memory
+            ceiling per chunk such as "100 MB".
+        v (float): Velocity of the parent particle in meters per second.
+        max_events (int, optional): Only compare the first events.
+
+    Returns:
+        PrecisionReport: Largest deviations of every quantity.
+    """
+    report = PrecisionReport()
+    for rest_frame_df in iterate_rest_frame(
+        root_file_path, tree_name, step_size, entry_stop=max_events
+    ):
+        # Rounding the float64 chunk is what reading in float32 does
+        compact_rest_frame_df = rest_frame_df.astype(np.float32)
+        lab_frame_df = build_lab_frame(rest_frame_df, v)
+        compact_lab_frame_df = build_lab_frame(compact_rest_frame_df, v)
+        report.update("rest_frame", rest_frame_df, compact_rest_frame_df)
+        report.update("lab_frame", lab_frame_df, compact_lab_frame_df)
+        report.update(
+            "m_parent", _parent_mass(lab_frame_df), _parent_mass(compact_lab_frame_df)
+        )
+
+        kinematics = build_kinematics(lab_frame_df)
+        compact_kinematics = build_kinematics(compact_lab_frame_df)
+        for quantity, columns in (
+            ("invariant_masses", list(MASS_COMBINATIONS)),
+            ("dalitz_variables", list(DALITZ_COMBINATIONS)),
+        ):
+            report.update(quantity, kinematics[columns], compact_kinematics[columns])
+        report.num_events += len(rest_frame_df)
+    return report
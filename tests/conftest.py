@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import pytest
+
+from graphics_4vecs.generate_4vecs import TREE_NAME, write_root_file
+
+
+@pytest.fixture(scope="session")
+def root_file_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data") / "D02Kpipipi_20000events.root"
+    return write_root_file(path, 20000, seed=0)
+
+
+@pytest.fixture()
+def tree_name():
+    return TREE_NAME
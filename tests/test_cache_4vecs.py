@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from graphics_4vecs import transformations_4vecs
+from graphics_4vecs.cache_4vecs import ResultCache
+from graphics_4vecs.cli_4vecs import main
+from graphics_4vecs.transformations_4vecs import run_pipeline
+
+
+def test_key(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    input_path = tmp_path / "events.root"
+    input_path.write_bytes(b"events")
+
+    key = cache.key(input_path, tree_name="DalitzEventList", v=1.0)
+    assert cache.key(input_path, v=1.0, tree_name="DalitzEventList") == key
+    assert cache.key(input_path, tree_name="DalitzEventList", v=2.0) != key
+
+    # Touching the file keeps its content, and so its key
+    os.utime(input_path, ns=(0, 0))
+    assert cache.key(input_path, tree_name="DalitzEventList", v=1.0) == key
+    input_path.write_bytes(b"other events")
+    assert cache.key(input_path, tree_name="DalitzEventList", v=1.0) != key
+
+
+def test_concurrent_digests(tmp_path):
+    input_paths = []
+    for i in range(16):
+        input_paths.append(tmp_path / f"events_{i}.root")
+        input_paths[-1].write_bytes(b"events %d" % i)
+
+    # Workers sharing the cache keep the digests of each other's inputs
+    caches = [ResultCache(tmp_path / "cache") for _ in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        digests = list(
+            executor.map(lambda i: caches[i % 4].file_digest(input_paths[i]), range(16))
+        )
+    assert digests == [hashlib.sha256(p.read_bytes()).hexdigest() for p in input_paths]
+    assert len(list((tmp_path / "cache" / "digests").iterdir())) == 16
+
+
+def test_put_existing_entry(tmp_path):
+    output_path = tmp_path / "a.csv"
+    output_path.write_bytes(b"x" * 100)
+    first = ResultCache(tmp_path / "cache").put("a", [output_path], {"worker": 1})
+
+    # A second worker storing the same key keeps the first entry
+    second = ResultCache(tmp_path / "cache").put("a", [output_path], {"worker": 2})
+    assert second is not None
+    assert (second.path, second.metadata) == (first.path, {"worker": 1})
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == ["a"]
+
+
+def test_get_evicted_entry(tmp_path, monkeypatch):
+    output_path = tmp_path / "a.csv"
+    output_path.write_bytes(b"x" * 100)
+    cache = ResultCache(tmp_path / "cache", max_size="1 kB")
+    assert cache.max_size == 1000
+    cache.put("a", [output_path])
+
+    # Another process removes the entry between reading and touching it
+    def evicted(entry):
+        raise FileNotFoundError(entry.path / "entry.json")
+
+    monkeypatch.setattr(cache, "_write_entry", evicted)
+    assert cache.get("a") is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_size=250)
+    for name in ("a", "b", "c"):
+        output_path = tmp_path / f"{name}.csv"
+        output_path.write_bytes(b"x" * 100)
+        cache.put(name, [output_path], {"source": name})
+        if name == "b":
+            # Using "a" makes "b" the least recently used entry
+            assert cache.get("a") is not None
+
+    assert [entry.key for entry in cache.entries()] == ["c", "a"]
+    assert cache.get("b") is None
+    assert cache.size == 200
+    assert [p.name for p in cache.get("a").files] == ["a.csv"]
+
+    big_path = tmp_path / "big.csv"
+    big_path.write_bytes(b"x" * 300)
+    assert cache.put("big", [big_path]) is None
+    assert cache.clear() == 2
+    assert cache.entries() == []
+
+
+def test_run_pipeline_cached(root_file_path, tree_name, tmp_path, monkeypatch):
+    root_file_path = str(Path(root_file_path).resolve())
+    cache = ResultCache(tmp_path / "cache")
+    monkeypatch.chdir(tmp_path)
+    num_chunks = run_pipeline(
+        root_file_path, tree_name, step_size=5000, output_format="npy", cache=cache
+    )
+    outputs = [
+        Path(name).read_bytes()
+        for name in ("rest_frame_data.npy", "lab_frame_data.npy")
+    ]
+    for name in ("rest_frame_data.npy", "lab_frame_data.npy"):
+        Path(name).unlink()
+
+    def fail(*args, **kwargs):
+        pytest.fail("the input was read again")
+
+    monkeypatch.setattr(transformations_4vecs, "iterate_rest_frame", fail)
+    assert (
+        run_pipeline(
+            root_file_path,
+            tree_name,
+            step_size=5000,
+            output_format="npy",
+            workers=2,
+            cache=cache,
+        )
+        == num_chunks
+    )
+    assert [
+        Path(name).read_bytes()
+        for name in ("rest_frame_data.npy", "lab_frame_data.npy")
+    ] == outputs
+
+    # Different parameters are a different entry
+    with pytest.raises(pytest.fail.Exception):
+        run_pipeline(root_file_path, tree_name, output_format="npy", cache=cache)
+
+
+def test_cache_command(root_file_path, tree_name, tmp_path, monkeypatch, caplog):
+    root_file_path = str(Path(root_file_path).resolve())
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GRAPHICS_4VECS_CACHE", str(tmp_path / "cache"))
+    assert main(["transform", root_file_path, tree_name, "--cache"]) == 0
+    assert main(["transform", root_file_path, tree_name, "--cache"]) == 0
+    assert "from the cache" in caplog.text
+
+    assert main(["cache"]) == 0
+    assert "1 entries" in caplog.text
+    assert main(["cache", "clear"]) == 0
+    assert ResultCache(tmp_path / "cache").entries() == []
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from graphics_4vecs.cli_4vecs import main
+from graphics_4vecs.io_4vecs import open_store
+from graphics_4vecs.transformations_4vecs import read_root_file
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys, graphics_4vecs.transformations_4vecs, graphics_4vecs.cli_4vecs;"
+        "print(sorted(m for m in ('uproot', 'awkward', 'pandas') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_transform(root_file_path, tree_name, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert main(["transform", root_file_path, tree_name, "--step-size", "5000"]) == 0
+
+    rest_frame_df = pd.read_csv(tmp_path / "rest_frame_data.csv")
+    lab_frame_df = pd.read_csv(tmp_path / "lab_frame_data.csv")
+    assert len(rest_frame_df) == len(lab_frame_df) > 0
+    assert list(lab_frame_df.columns) == list(rest_frame_df.columns)
+
+
+def test_transform_output_dir(root_file_path, tree_name, tmp_path):
+    argv = ["transform", root_file_path, tree_name, "--format", "npz"]
+    assert main([*argv, "--output-dir", str(tmp_path)]) == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "lab_frame_data.npz",
+        "rest_frame_data.npz",
+    ]
+
+
+def test_scan(root_file_path, tree_name, tmp_path):
+    argv = ["scan", root_file_path, tree_name, "--beta", "0.1", "0.9"]
+    argv += ["--output-dir", str(tmp_path)]
+    assert main([*argv, "--format", "npz"]) == 0
+    assert main([*argv, "--hist", "K_pt:10:0:1"]) == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "histograms_beta0.1.npz",
+        "histograms_beta0.9.npz",
+        "lab_frame_data_beta0.1.npz",
+        "lab_frame_data_beta0.9.npz",
+        "rest_frame_data.npz",
+    ]
+
+
+def test_precision(root_file_path, tree_name, tmp_path):
+    report_path = tmp_path / "precision.json"
+    argv = ["precision", root_file_path, tree_name, "--max-events", "100"]
+    assert main([*argv, "--output", str(report_path)]) == 0
+
+    report = json.loads(report_path.read_text())
+    assert report["num_events"] == 100
+    assert report["max_rel"]["rest_frame"] < 1e-7
+
+
+def test_convert(root_file_path, tree_name, tmp_path):
+    store_path = str(tmp_path / "rest_frame_data.evstore")
+    assert main(["convert", root_file_path, tree_name, store_path]) == 0
+
+    store = open_store(store_path)
+    assert store.header["source"] == root_file_path
+    assert store.header["tree_name"] == tree_name
+    assert len(store) > 0
+
+
+def test_generate(tmp_path, tree_name):
+    root_file_path = str(tmp_path / "events.root")
+    assert main(["generate", root_file_path, "100", "--seed", "1"]) == 0
+
+    branches = read_root_file(root_file_path, tree_name)
+    assert len(branches["_1_Kplus_E"]) == 100
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from graphics_4vecs.cli_4vecs import main
+from graphics_4vecs.dataset_4vecs import expand_inputs, part_name, run_dataset
+from graphics_4vecs.generate_4vecs import write_root_file
+from graphics_4vecs.io_4vecs import (
+    FRAME_COLUMNS,
+    EventSource,
+    infer_format,
+    iterate_table,
+    read_table,
+)
+from graphics_4vecs.transformations_4vecs import (
+    build_lab_frame,
+    build_rest_frame,
+    read_root_file,
+)
+
+
+@pytest.fixture()
+def root_files(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return [
+        str(write_root_file(data_dir / f"run{i}.root", num_events, seed=i))
+        for i, num_events in enumerate([1000, 1500, 700])
+    ]
+
+
+def test_expand_inputs(root_files, tmp_path):
+    data_dir = tmp_path / "data"
+    assert expand_inputs([str(data_dir / "*.root")]) == root_files
+    list_path = tmp_path / "files.txt"
+    list_path.write_text(f"{root_files[2]}\n{data_dir}/run[01].root\n")
+    assert expand_inputs([f"@{list_path}", root_files[0]]) == [
+        root_files[2],
+        *root_files[:2],
+    ]
+    with pytest.raises(FileNotFoundError, match="No files match"):
+        expand_inputs([str(data_dir / "*.csv")])
+    with pytest.raises(FileNotFoundError, match="No such file"):
+        expand_inputs([str(data_dir / "run9.root")])
+
+
+def test_run_dataset(root_files, tree_name, tmp_path):
+    output_dir = tmp_path / "dataset"
+    report = run_dataset(
+        [str(tmp_path / "data" / "*.root")],
+        tree_name,
+        output_dir,
+        step_size=400,
+        output_format="npy",
+        workers=2,
+    )
+    assert report.num_events == 3200
+    assert report.processed == root_files
+    rest_manifest, lab_manifest = report.manifests
+    assert infer_format(lab_manifest) == "manifest"
+    manifest = json.loads(Path(lab_manifest).read_text())
+    assert [part["event_start"] for part in manifest["parts"]] == [0, 1000, 2500]
+
+    rest_frame_df = pd.concat(
+        [build_rest_frame(read_root_file(path, tree_name)) for path in root_files],
+        ignore_index=True,
+    )
+    lab_frame_df = build_lab_frame(rest_frame_df, manifest["velocity"])
+    pd.testing.assert_frame_equal(read_table(rest_manifest), rest_frame_df)
+    pd.testing.assert_frame_equal(read_table(lab_manifest), lab_frame_df)
+
+    chunks = list(iterate_table(lab_manifest, 600, ["K_E", "K_px"]))
+    assert chunks[2].index[0] == 1000
+    pd.testing.assert_frame_equal(pd.concat(chunks), lab_frame_df[["K_E", "K_px"]])
+
+    # Events are numbered across the parts, in any order
+    rows = [2999, 0, 1000, 999, 2500]
+    source = EventSource(lab_manifest, FRAME_COLUMNS)
+    assert len(source) == 3200
+    pd.testing.assert_frame_equal(source.read(rows), lab_frame_df.loc[rows])
+    with pytest.raises(IndexError, match="out of range"):
+        source.read(3200)
+
+    # Only changed files are processed again
+    report = run_dataset(root_files, tree_name, output_dir, 400, "npy", workers=2)
+    assert (report.processed, report.reused) == ([], root_files)
+    write_root_file(root_files[1], 300, seed=9)
+    report = run_dataset(root_files, tree_name, output_dir, 400, "npy", workers=1)
+    assert report.processed == [root_files[1]]
+    assert report.num_events == 2000
+    assert len(EventSource(lab_manifest)) == 2000
+
+
+def test_run_dataset_insert(root_files, tree_name, tmp_path):
+    output_dir = tmp_path / "dataset"
+    inputs = [root_files[0], root_files[2]]
+    run_dataset(inputs, tree_name, output_dir, 400, "npy", workers=1)
+
+    # A file inserted in the middle is the only one processed
+    report = run_dataset(root_files, tree_name, output_dir, 400, "npy", workers=1)
+    assert (report.processed, report.reused) == ([root_files[1]], inputs)
+    manifest = json.loads((output_dir / "lab_frame_data.manifest.json").read_text())
+    assert [part["path"] for part in manifest["parts"]] == [
+        f"{part_name(path)}/lab_frame_data.npy" for path in root_files
+    ]
+    assert [part["event_start"] for part in manifest["parts"]] == [0, 1000, 2500]
+    assert len({part_name(path) for path in root_files}) == 3
+
+
+def test_run_dataset_empty_input(root_files, tree_name, tmp_path):
+    empty_path = str(write_root_file(tmp_path / "data" / "empty.root", 0))
+    inputs = [root_files[0], empty_path, root_files[2]]
+    output_dir = tmp_path / "dataset"
+    report = run_dataset(inputs, tree_name, output_dir, 400, "npy", workers=1)
+    assert report.processed == inputs
+    assert report.num_events == 1700
+
+    # The empty input has no part in the manifest
+    lab_manifest = str(output_dir / "lab_frame_data.manifest.json")
+    manifest = json.loads(Path(lab_manifest).read_text())
+    assert [part["source"] for part in manifest["parts"]] == [
+        root_files[0],
+        root_files[2],
+    ]
+    assert [part["event_start"] for part in manifest["parts"]] == [0, 1000]
+    assert len(read_table(lab_manifest)) == 1700
+    assert sum(len(chunk) for chunk in iterate_table(lab_manifest, 600)) == 1700
+    source = EventSource(lab_manifest, FRAME_COLUMNS)
+    assert len(source) == 1700
+    pd.testing.assert_frame_equal(
+        source.read([999, 1000]), read_table(lab_manifest).loc[[999, 1000]]
+    )
+
+    report = run_dataset(inputs, tree_name, output_dir, 400, "npy", workers=1)
+    assert (report.processed, report.num_events) == ([], 1700)
+
+
+@pytest.mark.usefixtures("root_files")
+def test_dataset_command(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.chdir(tmp_path)
+    argv = ["dataset", "data/run*.root", "--format", "parquet", "--workers", "1"]
+    assert main(argv) == 0
+    lab_frame_df = read_table("dataset/lab_frame_data.manifest.json")
+    assert len(lab_frame_df) == 3200
+    np.testing.assert_array_equal(lab_frame_df.index, np.arange(3200))
+
+    assert main(["select", "dataset/lab_frame_data.manifest.json", "--top", "K_p"]) == 0
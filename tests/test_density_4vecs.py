@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from graphics_4vecs.cli_4vecs import main
+from graphics_4vecs.density_4vecs import (
+    DirectionDensity,
+    SphereGrid,
+    load_direction_density,
+    run_direction_density,
+    save_direction_density,
+)
+from graphics_4vecs.transformations_4vecs import (
+    SPEED_OF_LIGHT,
+    build_lab_frame,
+    build_rest_frame,
+    read_root_file,
+)
+
+
+@pytest.fixture()
+def lab_frame_df(root_file_path, tree_name):
+    rest_frame_df = build_rest_frame(read_root_file(root_file_path, tree_name))
+    return build_lab_frame(rest_frame_df, 0.5 * SPEED_OF_LIGHT)
+
+
+def test_sphere_grid():
+    grid = SphereGrid(6, 12)
+    assert grid.shape == (6, 12)
+    assert grid.cell_area * 72 == pytest.approx(4 * math.pi)
+    centers = grid.centers().reshape(-1, 3)
+    np.testing.assert_allclose(np.linalg.norm(centers, axis=-1), 1.0)
+    np.testing.assert_array_equal(grid.index(centers), np.arange(72))
+
+    # The poles and phi = pi are in the last band and sector, NaN in none
+    directions = [[0, 0, 1], [0, 0, -1], [-1, 0, 0], [np.nan, np.nan, np.nan]]
+    np.testing.assert_array_equal(grid.index(directions), [66, 6, 3 * 12 + 11, -1])
+    with pytest.raises(ValueError, match="Invalid sphere grid"):
+        SphereGrid(0, 12)
+
+
+def test_sphere_grid_equal_area():
+    # Isotropic directions fill every cell equally within Poisson noise
+    rng = np.random.default_rng(0)
+    directions = rng.normal(size=(720_000, 3))
+    directions /= np.linalg.norm(directions, axis=-1, keepdims=True)
+    counts = np.bincount(SphereGrid(12, 24).index(directions), minlength=288)
+    assert np.abs(counts - 2500).max() < 5 * math.sqrt(2500)
+
+
+def test_direction_density(lab_frame_df):
+    density = DirectionDensity(SphereGrid(10, 20), ("K", "pi_plus_4"))
+    for start in range(0, len(lab_frame_df), 3000):
+        density.fill(lab_frame_df.iloc[start : start + 3000])
+    assert density.num_events == len(lab_frame_df)
+    np.testing.assert_array_equal(density.counts.sum(axis=(1, 2)), len(lab_frame_df))
+
+    # Events are counted by the direction of each particle's momentum
+    px, py, pz = (lab_frame_df[f"K_{c}"].to_numpy() for c in ("px", "py", "pz"))
+    expected, _, _ = np.histogram2d(
+        pz / np.sqrt(px**2 + py**2 + pz**2),
+        np.arctan2(py, px),
+        bins=[density.grid.z_edges, density.grid.phi_edges],
+    )
+    np.testing.assert_array_equal(density.counts[0], expected)
+
+    np.testing.assert_allclose(
+        density.density().sum(axis=(1, 2)) * density.grid.cell_area, 1.0
+    )
+    levels = density.levels(log_scale=True)
+    assert levels.min() >= 0
+    np.testing.assert_allclose(levels.max(axis=(1, 2)), 1.0)
+
+    other = DirectionDensity(SphereGrid(10, 20), ("K", "pi_plus_4"))
+    other.fill(
+        {f"K_{c}": [0.0] for c in ("px", "py", "pz")}
+        | {f"pi_plus_4_{c}": [1.0] for c in ("px", "py", "pz")}
+    )
+    density.add(other)
+    assert density.num_events == len(lab_frame_df) + 1
+    assert density.counts[0].sum() == len(lab_frame_df)
+    with pytest.raises(ValueError, match="different grids"):
+        density.add(DirectionDensity(SphereGrid(10, 20)))
+    with pytest.raises(ValueError, match="Unknown particles"):
+        DirectionDensity(particles=("D0",))
+
+
+def test_run_direction_density(root_file_path, tree_name, lab_frame_df, tmp_path):
+    grid = SphereGrid(8, 16)
+    density = run_direction_density(
+        str(root_file_path), grid, tree_name=tree_name, step_size=3000
+    )
+    expected = DirectionDensity(grid)
+    expected.fill(lab_frame_df)
+    np.testing.assert_array_equal(density.counts, expected.counts)
+
+    path = tmp_path / "direction_density.npz"
+    save_direction_density(path, density)
+    loaded = load_direction_density(path)
+    assert (loaded.grid, loaded.particles) == (grid, density.particles)
+    assert loaded.num_events == len(lab_frame_df)
+    np.testing.assert_array_equal(loaded.counts, density.counts)
+
+
+def test_density_command(root_file_path, tree_name, tmp_path, monkeypatch):
+    root_file_path = str(Path(root_file_path).resolve())
+    monkeypatch.chdir(tmp_path)
+    assert main(["transform", root_file_path, tree_name, "--format", "npy"]) == 0
+    argv = ["--bands", "8", "--sectors", "16", "--particles", "K"]
+    assert main(["density", root_file_path, *argv, "--output", "root.npz"]) == 0
+    assert main(["density", "lab_frame_data.npy", *argv]) == 0
+    table_density = load_direction_density("direction_density.npz")
+    assert table_density.particles == ("K",)
+    np.testing.assert_array_equal(
+        table_density.counts, load_direction_density("root.npz").counts
+    )
+
+
+def test_density_sphere(root_file_path, tree_name, tmp_path):
+    manim = pytest.importorskip("manim")
+    from graphics_4vecs.plot_4vecs import DensitySphere
+
+    path = tmp_path / "direction_density.npz"
+    save_direction_density(
+        path,
+        run_direction_density(
+            str(root_file_path), SphereGrid(6, 12), ["K", "pi_plus_4"], tree_name
+        ),
+    )
+    with manim.tempconfig({"media_dir": str(tmp_path / "media"), "dry_run": True}):
+        scene = DensitySphere(str(path), "picture", ["pi_plus_4"])
+        scene.construct()
+    # One face per cell, however many events were counted
+    (sphere,) = scene.mobjects
+    assert len(sphere) == 72
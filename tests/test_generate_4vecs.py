@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from graphics_4vecs.generate_4vecs import (
+    D0_MASS,
+    DAUGHTER_MASSES,
+    breakup_momentum,
+    generate_phase_space,
+)
+from graphics_4vecs.transformations_4vecs import (
+    REST_FRAME_BRANCHES,
+    build_rest_frame,
+    read_root_file,
+)
+
+
+def invariant_mass(four_momenta):
+    return np.sqrt(
+        four_momenta[..., 0] ** 2 - np.sum(four_momenta[..., 1:] ** 2, axis=-1)
+    )
+
+
+def test_breakup_momentum():
+    # At threshold the products are at rest
+    assert breakup_momentum(2.0, 1.0, 1.0) == 0.0
+    # Massless products share the mass equally
+    assert breakup_momentum(2.0, 0.0, 0.0) == pytest.approx(1.0)
+
+
+def test_generate_phase_space():
+    events = generate_phase_space(10000, seed=1)
+    assert events.shape == (10000, 4, 4)
+
+    np.testing.assert_allclose(
+        invariant_mass(events), np.broadcast_to(DAUGHTER_MASSES, (10000, 4))
+    )
+    np.testing.assert_allclose(
+        events.sum(axis=1), np.broadcast_to([D0_MASS, 0, 0, 0], (10000, 4)), atol=1e-12
+    )
+
+    # The K pi- and pi- pi+ masses fill their kinematic ranges
+    k_pi = invariant_mass(events[:, 0] + events[:, 1])
+    assert k_pi.min() >= DAUGHTER_MASSES[0] + DAUGHTER_MASSES[1]
+    assert k_pi.max() <= D0_MASS - DAUGHTER_MASSES[2] - DAUGHTER_MASSES[3]
+
+    # Decays are isotropic
+    np.testing.assert_allclose(events[:, :, 1:].mean(axis=0), 0.0, atol=0.02)
+
+    np.testing.assert_array_equal(
+        generate_phase_space(10, seed=3), generate_phase_space(10, seed=3)
+    )
+    with pytest.raises(ValueError, match="cannot decay"):
+        generate_phase_space(10, parent_mass=0.5)
+
+
+def test_write_root_file(root_file_path, tree_name):
+    branches = read_root_file(root_file_path, tree_name)
+    assert set(REST_FRAME_BRANCHES.values()) <= set(branches)
+    np.testing.assert_array_equal(branches["eventNumber"], np.arange(20000))
+    np.testing.assert_array_equal(branches["weight"], 1.0)
+
+    rest_frame = build_rest_frame(branches).to_numpy().reshape(-1, 4, 4)
+    np.testing.assert_allclose(rest_frame.sum(axis=1)[:, 0], D0_MASS)
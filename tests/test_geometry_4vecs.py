@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from graphics_4vecs.geometry_4vecs import (
+    GEOMETRY_DTYPE,
+    check_decay_geometry,
+    compute_decay_geometry,
+    mesh_resolution,
+    rotation_from_z,
+    write_geometry_table,
+)
+from graphics_4vecs.io_4vecs import FRAME_COLUMNS
+
+
+def scalar_geometry(row):
+    """
+    Geometry of one decay as computed by the original Decay.construct.
+    """
+    scaling_factor = 1.4
+    vecs = []
+    for particle in ("K", "pi_minus_2", "pi_minus_3", "pi_plus_4"):
+        vec = scaling_factor * np.array(
+            [row[f"{particle}_px"], row[f"{particle}_py"], row[f"{particle}_pz"]]
+        )
+        vec /= np.linalg.norm(vec)
+        vecs.append(vec * scaling_factor)
+    K_vec, pi_m2_vec, pi_m3_vec, pi_p4_vec = vecs
+
+    dec1 = K_vec + pi_m2_vec
+    dec2 = pi_m3_vec + pi_p4_vec
+    dec1_unit_vec = dec1 / np.linalg.norm(dec1)
+    dec2_unit_vec = dec2 / np.linalg.norm(dec2)
+    daughter1_end = dec1_unit_vec * 0.5 + dec1_unit_vec
+    daughter2_end = dec2_unit_vec * 0.5 + dec2_unit_vec
+    daughter1_center = daughter1_end + 0.25 * dec1_unit_vec
+    daughter2_center = daughter2_end + 0.25 * dec2_unit_vec
+
+    orth_vec = np.array([2.0, -1.0, 0.5])
+    orth_vec -= orth_vec.dot(dec1) * dec1 / np.linalg.norm(dec1) ** 2
+    orth_vec /= np.linalg.norm(orth_vec)
+    phi = np.arccos(orth_vec[2])
+    theta = np.arccos(orth_vec[0] / np.sin(phi))
+
+    return {
+        "daughter1_end": daughter1_end,
+        "daughter2_end": daughter2_end,
+        "daughter1_center": daughter1_center,
+        "daughter2_center": daughter2_center,
+        "K_end": daughter1_center + K_vec,
+        "pi_minus_2_end": daughter1_center + pi_m2_vec,
+        "pi_minus_3_end": daughter2_center + pi_m3_vec,
+        "pi_plus_4_end": daughter2_center + pi_p4_vec,
+        "phi": phi,
+        "theta": theta,
+    }
+
+
+@pytest.fixture()
+def frame():
+    rng = np.random.default_rng(1)
+    return pd.DataFrame(rng.normal(size=(50, 16)), columns=FRAME_COLUMNS)
+
+
+def test_compute_decay_geometry_matches_scalar(frame):
+    geometry = compute_decay_geometry(frame)
+    assert geometry.dtype == GEOMETRY_DTYPE
+    assert geometry["valid"].all()
+    for i, row in frame.iterrows():
+        for name, expected in scalar_geometry(row).items():
+            np.testing.assert_allclose(geometry[name][i], expected, atol=1e-6)
+
+
+def test_compute_decay_geometry_degenerate(frame):
+    frame.loc[0, ["K_px", "K_py", "K_pz"]] = 0
+    # dec1 along the reference, so the camera direction is undefined
+    frame.loc[1, ["K_px", "K_py", "K_pz"]] = [2.0, -1.0, 0.5]
+    frame.loc[1, ["pi_minus_2_px", "pi_minus_2_py", "pi_minus_2_pz"]] = [2.0, -1.0, 0.5]
+    # Camera direction along the z-axis
+    frame.loc[2, ["K_px", "K_py", "K_pz"]] = [2.0, -1.0, 0.0]
+    frame.loc[2, ["pi_minus_2_px", "pi_minus_2_py", "pi_minus_2_pz"]] = [2.0, -1.0, 0.0]
+
+    geometry = compute_decay_geometry(frame)
+    assert geometry["valid"].tolist() == [False, False, False] + [True] * 47
+    assert check_decay_geometry(geometry[3], 3) == geometry[3]
+    with pytest.raises(ValueError, match="Decay 1 has a degenerate geometry"):
+        check_decay_geometry(geometry[1], 1)
+
+
+def test_write_geometry_table(tmp_path, frame):
+    table = tmp_path / "lab_frame_data.csv"
+    frame.to_csv(table, index=False)
+    geometry_path = tmp_path / "geometry.npy"
+
+    assert write_geometry_table(table, geometry_path, step_size=7) == 0
+    geometry = np.load(geometry_path, mmap_mode="r")
+    np.testing.assert_array_equal(geometry, compute_decay_geometry(frame))
+
+
+def test_mesh_resolution():
+    assert mesh_resolution("low_quality") == ((12, 6), 4)
+    assert mesh_resolution("high_quality") == (None, 8)
+    assert mesh_resolution(None) == mesh_resolution("high_quality")
+
+
+@pytest.mark.parametrize(
+    "direction", [[1.0, 2.0, -0.5], [0.0, 0.0, 3.0], [0.0, 0.0, -1.0], [0.3, 0, 0]]
+)
+def test_rotation_from_z(direction):
+    angle, axis = rotation_from_z(direction)
+    # Rodrigues' rotation of the z-axis
+    z = np.array([0.0, 0.0, 1.0])
+    rotated = (
+        z * np.cos(angle)
+        + np.cross(axis, z) * np.sin(angle)
+        + axis * axis.dot(z) * (1 - np.cos(angle))
+    )
+    np.testing.assert_allclose(
+        rotated, np.array(direction) / np.linalg.norm(direction), atol=1e-12
+    )
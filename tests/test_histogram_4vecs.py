@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from graphics_4vecs.histogram_4vecs import (
+    Axis,
+    Histogram,
+    compute_quantities,
+    load_histograms,
+    parse_histogram,
+    run_histogram_scan,
+    run_histograms,
+    save_histograms,
+)
+from graphics_4vecs.profile_4vecs import profiling
+from graphics_4vecs.transformations_4vecs import (
+    build_kinematics,
+    build_lab_frame,
+    build_rest_frame,
+    read_root_file,
+)
+
+
+def test_axis_index():
+    axis = Axis("K_px", 4, 0.0, 2.0)
+    np.testing.assert_array_equal(axis.edges, [0.0, 0.5, 1.0, 1.5, 2.0])
+    values = [-1.0, 0.0, 0.49, 0.5, 1.99, 2.0, 10.0, np.nan, np.inf, -np.inf]
+    np.testing.assert_array_equal(axis.index(values), [0, 1, 1, 2, 4, 5, 5, 5, 5, 0])
+    with pytest.raises(ValueError, match="Invalid binning"):
+        Axis("K_px", 4, 1.0, 1.0)
+
+
+def test_histogram_fill():
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=(2, 1000))
+    histogram = parse_histogram("x:10:-2:2, y:5:-1:1")
+    histogram.fill({"x": x[:300], "y": y[:300]})
+    histogram.fill({"x": x[300:], "y": y[300:]})
+
+    assert histogram.name == "x_vs_y"
+    assert histogram.counts.shape == (12, 7)
+    assert histogram.counts.sum() == 1000
+    expected, _, _ = np.histogram2d(x, y, bins=[10, 5], range=[[-2, 2], [-1, 1]])
+    np.testing.assert_array_equal(histogram.counts[1:-1, 1:-1], expected)
+
+    other = Histogram(histogram.axes)
+    other.fill({"x": x, "y": y})
+    histogram.add(other)
+    assert histogram.counts.sum() == 2000
+    with pytest.raises(ValueError, match="different axes"):
+        histogram.add(parse_histogram("x:10:-2:2"))
+    with pytest.raises(ValueError, match="quantity:bins:low:high"):
+        parse_histogram("x:10:-2")
+
+
+def test_compute_quantities(root_file_path, tree_name):
+    frame_df = build_rest_frame(read_root_file(root_file_path, tree_name))
+    quantities = compute_quantities(
+        frame_df, ["K_px", "K_p", "pi_plus_4_pt", "pi_minus_2_theta", "s_12"]
+    )
+    momenta = frame_df[["K_px", "K_py", "K_pz"]].to_numpy()
+    np.testing.assert_allclose(quantities["K_p"], np.linalg.norm(momenta, axis=1))
+    np.testing.assert_array_equal(quantities["K_px"], frame_df["K_px"])
+    np.testing.assert_allclose(
+        quantities["pi_plus_4_pt"],
+        np.hypot(frame_df["pi_plus_4_px"], frame_df["pi_plus_4_py"]),
+    )
+    np.testing.assert_allclose(
+        np.cos(quantities["pi_minus_2_theta"]),
+        frame_df["pi_minus_2_pz"]
+        / np.linalg.norm(
+            frame_df[["pi_minus_2_px", "pi_minus_2_py", "pi_minus_2_pz"]], axis=1
+        ),
+    )
+    np.testing.assert_allclose(quantities["s_12"], build_kinematics(frame_df)["s_12"])
+    with pytest.raises(KeyError, match="K_energy"):
+        compute_quantities(frame_df, ["K_energy"])
+
+
+def test_run_histograms(root_file_path, tree_name, tmp_path):
+    specs = ["K_p:50:0:1.5", "s_12:30:0:2,s_34:30:0:2"]
+    v = 0.5 * 299792458
+
+    serial = [parse_histogram(spec) for spec in specs]
+    num_events = run_histograms(root_file_path, tree_name, serial, step_size=3000)
+    parallel = [parse_histogram(spec) for spec in specs]
+    run_histograms(root_file_path, tree_name, parallel, step_size=1000, workers=2)
+
+    lab_frame_df = build_lab_frame(
+        build_rest_frame(read_root_file(root_file_path, tree_name)), v
+    )
+    assert num_events == len(lab_frame_df)
+    expected = parse_histogram("K_p:50:0:1.5")
+    expected.fill(compute_quantities(lab_frame_df, ["K_p"]))
+    np.testing.assert_array_equal(serial[0].counts, expected.counts)
+    for histogram, other in zip(serial, parallel, strict=True):
+        np.testing.assert_array_equal(histogram.counts, other.counts)
+
+    path = tmp_path / "histograms.npz"
+    save_histograms(path, serial)
+    loaded = load_histograms(path)
+    assert list(loaded) == ["K_p", "s_12_vs_s_34"]
+    assert loaded["s_12_vs_s_34"].axes == serial[1].axes
+    np.testing.assert_array_equal(loaded["s_12_vs_s_34"].counts, serial[1].counts)
+
+
+def test_run_histogram_scan(root_file_path, tree_name):
+    specs = ["K_p:50:0:1.5", "s_12:30:0:2,s_34:30:0:2"]
+    velocities = [0.2 * 299792458, 0.7 * 299792458]
+    with profiling() as profiler:
+        scan = run_histogram_scan(
+            root_file_path,
+            tree_name,
+            [parse_histogram(spec) for spec in specs],
+            velocities,
+            step_size=3000,
+        )
+    assert len(scan) == 2
+    # Filling is profiled once per chunk and velocity
+    num_events = int(scan[0][0].counts.sum())
+    assert profiler.stages["fill"].events == 2 * num_events
+    for v, histograms in zip(velocities, scan, strict=True):
+        expected = [parse_histogram(spec) for spec in specs]
+        run_histograms(root_file_path, tree_name, expected, step_size=5000, v=v)
+        for histogram, other in zip(histograms, expected, strict=True):
+            np.testing.assert_array_equal(histogram.counts, other.counts)
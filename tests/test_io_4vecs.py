@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from graphics_4vecs.io_4vecs import (
+    COMPACT_EVENT_DTYPE,
+    STORE_HEADER_SIZE,
+    EventSource,
+    FRAME_COLUMNS,
+    entries_per_chunk,
+    infer_format,
+    iterate_table,
+    open_sink,
+    open_store,
+    parse_size,
+    read_table,
+)
+
+FORMATS = ["csv", "parquet", "feather", "npz", "npy"]
+
+
+@pytest.fixture()
+def table():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        rng.normal(size=(100, 4)), columns=["K_E", "K_px", "K_py", "K_pz"]
+    )
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_round_trip(tmp_path, table, fmt):
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"frame.{fmt}"
+    with open_sink(path) as sink:
+        sink.write(table.iloc[:40])
+        sink.write(table.iloc[40:])
+
+    result = read_table(path)
+    pd.testing.assert_frame_equal(result, table, check_exact=fmt != "csv")
+
+    projected = read_table(path, columns=["K_pz", "K_E"])
+    assert list(projected.columns) == ["K_pz", "K_E"]
+    np.testing.assert_allclose(projected.to_numpy(), table[["K_pz", "K_E"]].to_numpy())
+
+
+@pytest.mark.parametrize(
+    ("fmt", "compression"),
+    [("csv", "gzip"), ("parquet", "zstd"), ("feather", "lz4"), ("npz", "zip")],
+)
+def test_compression(tmp_path, table, fmt, compression):
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"frame.{fmt}"
+    with open_sink(path, compression=compression) as sink:
+        sink.write(table.iloc[:40])
+        sink.write(table.iloc[40:])
+
+    result = read_table(path, compression=compression if fmt == "csv" else None)
+    np.testing.assert_allclose(result.to_numpy(), table.to_numpy())
+
+
+def test_infer_format():
+    assert infer_format("lab_frame_data.csv") == "csv"
+    assert infer_format("lab_frame_data.csv.gz") == "csv"
+    assert infer_format("data/lab_frame_data.parquet") == "parquet"
+    assert infer_format("lab_frame_data.arrow") == "feather"
+    with pytest.raises(ValueError, match="Cannot infer"):
+        infer_format("lab_frame_data.txt")
+    with pytest.raises(ValueError, match="does not support compression"):
+        open_sink("lab_frame_data.npy", compression="gzip")
+
+
+@pytest.fixture()
+def frame():
+    rng = np.random.default_rng(1)
+    return pd.DataFrame(rng.normal(size=(50, 16)), columns=FRAME_COLUMNS)
+
+
+def test_event_store(tmp_path, frame):
+    path = tmp_path / "rest_frame_data.evstore"
+    metadata = {"source": "events.root", "tree_name": "DalitzEventList"}
+    with open_sink(path, metadata=metadata) as sink:
+        sink.write(frame.iloc[:20])
+        sink.write(frame.iloc[20:])
+
+    store = open_store(path)
+    assert len(store) == len(frame)
+    assert store.header["source"] == "events.root"
+    assert store.header["tree_name"] == "DalitzEventList"
+    assert store.header["schema_version"] == 1
+    assert isinstance(store.events, np.memmap)
+
+    # Random access to one event returns the four-vector of each particle
+    np.testing.assert_array_equal(store[7]["K"], frame.loc[7, FRAME_COLUMNS[:4]])
+    pd.testing.assert_frame_equal(store.to_frame(), frame)
+    pd.testing.assert_frame_equal(
+        store.to_frame([3, 30], columns=["pi_plus_4_pz"]),
+        frame.loc[[3, 30], ["pi_plus_4_pz"]].reset_index(drop=True),
+    )
+    pd.testing.assert_frame_equal(
+        read_table(path, columns=["K_E"]), frame[["K_E"]], check_exact=True
+    )
+
+    chunks = list(store.iterate(step_size=16))
+    assert [len(chunk) for chunk in chunks] == [16, 16, 16, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), frame)
+
+
+def test_event_store_float32(tmp_path, frame):
+    path = tmp_path / "lab_frame_data.evstore"
+    compact = frame.astype(np.float32)
+    with open_sink(path) as sink:
+        sink.write(compact)
+
+    store = open_store(path)
+    assert store.events.dtype == COMPACT_EVENT_DTYPE
+    assert path.stat().st_size == STORE_HEADER_SIZE + len(frame) * 16 * 4
+    pd.testing.assert_frame_equal(store.to_frame(), compact)
+
+    # A memory ceiling holds twice as many float32 events
+    chunks = list(store.iterate(step_size="1280 B"))
+    assert [len(chunk) for chunk in chunks] == [20, 20, 10]
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_round_trip_float32(tmp_path, table, fmt):
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"frame.{fmt}"
+    compact = table.astype(np.float32)
+    with open_sink(path, fmt) as sink:
+        sink.write(compact)
+    result = read_table(path)
+    if fmt != "csv":
+        assert (result.dtypes == np.float32).all()
+    pd.testing.assert_frame_equal(result.astype(np.float32), compact)
+
+
+def test_event_store_rejects_other_tables(tmp_path, table):
+    with open_sink(tmp_path / "frame.evstore") as sink, pytest.raises(ValueError):
+        sink.write(table)
+
+
+def test_entries_per_chunk():
+    assert entries_per_chunk(1000, 128) == 1000
+    assert entries_per_chunk("1 MB", 128) == 7812
+    assert entries_per_chunk("1 MiB", 128) == 8192
+    assert entries_per_chunk("10 B", 128) == 1
+    with pytest.raises(ValueError, match="chunk size"):
+        entries_per_chunk("lots", 128)
+
+
+def test_parse_size():
+    assert parse_size(1000) == 1000
+    assert parse_size("1.5 kB") == 1500
+    assert parse_size(" 2GiB ") == 2 * 1024**3
+    assert parse_size("10") == 10
+    with pytest.raises(ValueError, match="memory size"):
+        parse_size("1 parsec")
+
+
+@pytest.mark.parametrize("fmt", [*FORMATS, "evstore"])
+def test_event_source(tmp_path, frame, fmt):
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"lab_frame_data.{fmt}"
+    with open_sink(path) as sink:
+        for start in range(0, len(frame), 16):
+            sink.write(frame.iloc[start : start + 16])
+
+    source = EventSource(path, columns=["pi_minus_3_px", "K_E"])
+    assert len(source) == len(frame)
+
+    events = source.read([33, 0, 49, 17])
+    expected = frame.loc[[33, 0, 49, 17], ["pi_minus_3_px", "K_E"]]
+    pd.testing.assert_frame_equal(events, expected, check_exact=fmt != "csv")
+
+    event = EventSource(path).read(2)
+    assert list(event.index) == [2]
+    np.testing.assert_allclose(event.loc[2, "K_px"], frame.loc[2, "K_px"])
+
+    with pytest.raises(IndexError):
+        source.read(len(frame))
+
+
+def test_event_source_feather(tmp_path, frame, caplog):
+    pytest.importorskip("pyarrow")
+    rows = [33, 0, 49, 17, 0]
+    for compression in (None, "zstd"):
+        path = tmp_path / f"lab_frame_data_{compression}.feather"
+        with open_sink(path, compression=compression) as sink:
+            for start in range(0, len(frame), 16):
+                sink.write(frame.iloc[start : start + 16])
+        source = EventSource(path, columns=["K_E", "K_px"])
+        pd.testing.assert_frame_equal(
+            source.read(rows), frame.loc[rows, ["K_E", "K_px"]]
+        )
+
+    # Only the compressed file is read whole, with a warning
+    assert "lab_frame_data_zstd.feather is compressed" in caplog.text
+    assert "lab_frame_data_None.feather" not in caplog.text
+
+
+@pytest.mark.parametrize("fmt", [*FORMATS, "evstore"])
+def test_iterate_table(tmp_path, frame, fmt):
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"lab_frame_data.{fmt}"
+    with open_sink(path) as sink:
+        sink.write(frame)
+
+    chunks = list(iterate_table(path, step_size=16))
+    assert [len(chunk) for chunk in chunks] == [16, 16, 16, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks), frame, check_exact=fmt != "csv")
+
+    chunks = list(iterate_table(path, step_size="256 B", columns=["K_py", "K_E"]))
+    assert len(chunks[0]) == 256 // 16
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks), frame[["K_py", "K_E"]], check_exact=fmt != "csv"
+    )
+
+
+def test_iterate_table_feather_batches(tmp_path, frame):
+    pa = pytest.importorskip("pyarrow")
+    path = tmp_path / "lab_frame_data.feather"
+    large_frame = pd.concat([frame] * 400, ignore_index=True)
+    with open_sink(path, compression="zstd") as sink:
+        for start in range(0, len(large_frame), 1000):
+            sink.write(large_frame.iloc[start : start + 1000])
+
+    # A compressed file is decompressed one record batch at a time
+    table_nbytes = large_frame.memory_usage(index=False).sum()
+    lengths = []
+    baseline = peak = pa.total_allocated_bytes()
+    for chunk in iterate_table(path, step_size=1500):
+        peak = max(peak, pa.total_allocated_bytes())
+        lengths.append(len(chunk))
+    assert peak - baseline < table_nbytes / 4
+    assert lengths == [1500] * 13 + [500]
+    pd.testing.assert_frame_equal(
+        pd.concat(iterate_table(path, step_size=1500)), large_frame
+    )
+
+
+def test_csv_index_sidecar(tmp_path, frame):
+    path = tmp_path / "lab_frame_data.csv"
+    frame.to_csv(path, index=False)
+
+    source = EventSource(path)
+    index_path = tmp_path / "lab_frame_data.csv.idx.npy"
+    assert index_path.exists()
+    assert len(np.load(index_path)) == len(frame) + 1
+    pd.testing.assert_frame_equal(source.read([5]), frame.iloc[[5]])
+
+    # A rewritten CSV invalidates the sidecar
+    frame.iloc[:10].to_csv(path, index=False)
+    assert len(EventSource(path)) == 10
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from graphics_4vecs.io_4vecs import TableSink
+from graphics_4vecs.pipeline_4vecs import ThreadedSink, prefetch
+from graphics_4vecs.transformations_4vecs import run_pipeline
+
+
+def test_prefetch():
+    assert list(prefetch(range(10), depth=3)) == list(range(10))
+
+    def failing():
+        yield 1
+        msg = "broken chunk"
+        raise ValueError(msg)
+
+    items = prefetch(failing())
+    assert next(items) == 1
+    with pytest.raises(ValueError, match="broken chunk"):
+        next(items)
+    with pytest.raises(ValueError, match="at least 1"):
+        next(prefetch(range(3), depth=0))
+
+
+def test_prefetch_backpressure():
+    produced = []
+
+    def produce():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    items = prefetch(produce(), depth=2)
+    assert next(items) == 0
+    time.sleep(0.2)
+    # One item taken, two queued and one waiting to be queued
+    assert len(produced) <= 4
+    items.close()
+    assert not any(t.name == "prefetch" for t in threading.enumerate())
+
+
+class ListSink(TableSink):
+    def __init__(self, path, fail_at=None):
+        super().__init__(path)
+        self.chunks = []
+        self.closed = False
+        self._fail_at = fail_at
+
+    def write(self, df):
+        if len(self.chunks) == self._fail_at:
+            msg = "disk full"
+            raise OSError(msg)
+        self.chunks.append(df)
+
+    def close(self):
+        self.closed = True
+
+
+def write_chunks(sink, chunks):
+    with sink:
+        for chunk in chunks:
+            sink.write(chunk)
+
+
+def test_threaded_sink(tmp_path):
+    chunks = [pd.DataFrame({"x": [i, i + 1]}) for i in range(5)]
+    sink = ListSink(tmp_path / "table.csv")
+    write_chunks(ThreadedSink(sink, depth=1), chunks)
+    assert sink.chunks == chunks
+    assert sink.closed
+
+    sink = ListSink(tmp_path / "table.csv", fail_at=2)
+    with pytest.raises(OSError, match="disk full"):
+        write_chunks(ThreadedSink(sink), chunks)
+    assert len(sink.chunks) == 2
+    assert sink.closed
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_pipeline_pipelined(
+    root_file_path, tree_name, tmp_path, monkeypatch, workers
+):
+    pytest.importorskip("pyarrow")
+    root_file_path = str(Path(root_file_path).resolve())
+    names = ("rest_frame_data.parquet", "lab_frame_data.parquet")
+    monkeypatch.chdir(tmp_path)
+    serial_chunks = run_pipeline(
+        root_file_path, tree_name, step_size=3000, output_format="parquet"
+    )
+    serial = [Path(name).read_bytes() for name in names]
+
+    num_chunks = run_pipeline(
+        root_file_path,
+        tree_name,
+        step_size=3000,
+        output_format="parquet",
+        workers=workers,
+        pipeline_depth=2,
+    )
+    assert num_chunks == serial_chunks
+    assert [Path(name).read_bytes() for name in names] == serial
+    with pytest.raises(ValueError, match="must not be negative"):
+        run_pipeline(root_file_path, tree_name, pipeline_depth=-1)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import pstats
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from graphics_4vecs import profile_4vecs
+from graphics_4vecs.cli_4vecs import main
+from graphics_4vecs.profile_4vecs import iterate_stage, profiling, stage
+from graphics_4vecs.transformations_4vecs import run_pipeline
+
+
+def test_stage_without_profiler():
+    with stage("read", events=10) as running:
+        running.add(bytes_read=100)
+    assert profile_4vecs._active is None
+    assert list(iterate_stage("read", [[1, 2], [3]])) == [[1, 2], [3]]
+
+
+def test_iterate_stage():
+    with profiling() as profiler:
+        chunks = list(iterate_stage("read", [[1, 2], [3]], nbytes=lambda c: 8 * len(c)))
+    assert chunks == [[1, 2], [3]]
+    stats = profiler.stages["read"]
+    assert (stats.calls, stats.events, stats.bytes_read) == (2, 3, 24)
+    assert profile_4vecs._active is None
+
+
+def test_profile_threads():
+    # Switch threads as often as possible to interleave the updates
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def work(_: int) -> None:
+        for chunk in iterate_stage("read", [[1, 2]] * 500, nbytes=len):
+            with stage("write", events=len(chunk)) as running:
+                running.add(bytes_written=1)
+
+    try:
+        with profiling() as profiler, ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(work, range(8)))
+    finally:
+        sys.setswitchinterval(switch_interval)
+    read, write = profiler.stages["read"], profiler.stages["write"]
+    assert (read.calls, read.events, read.bytes_read) == (4000, 8000, 8000)
+    assert (write.calls, write.events, write.bytes_written) == (4000, 8000, 4000)
+
+
+def test_profile_run_pipeline(root_file_path, tree_name, tmp_path, monkeypatch):
+    root_file_path = str(Path(root_file_path).resolve())
+    monkeypatch.chdir(tmp_path)
+    report_path = tmp_path / "profile.json"
+    with profiling(report_path):
+        run_pipeline(root_file_path, tree_name, step_size=5000, output_format="npy")
+
+    report = json.loads(report_path.read_text())
+    stages = report["stages"]
+    assert list(stages)[:4] == ["open", "read", "rename", "frame"]
+    num_events = stages["read"]["events"]
+    assert num_events > 0
+    assert stages["read"]["bytes_read"] == num_events * 16 * 8
+    assert stages["frame"]["events"] == stages["transform"]["events"] == num_events
+    # Rest and lab frame, written chunk by chunk and finalized once each
+    assert stages["write"]["events"] == 2 * num_events
+    assert stages["write"]["bytes_written"] == sum(
+        Path(name).stat().st_size
+        for name in ("rest_frame_data.npy", "lab_frame_data.npy")
+    )
+    assert report["wall_seconds"] >= stages["transform"]["seconds"]
+
+
+def test_profile_command(root_file_path, tree_name, tmp_path, monkeypatch, caplog):
+    root_file_path = str(Path(root_file_path).resolve())
+    monkeypatch.chdir(tmp_path)
+    argv = ["--profile-report", "profile.json", "--cprofile", "transform.prof"]
+    assert main([*argv, "transform", root_file_path, tree_name]) == 0
+    assert "Stage profile" in caplog.text
+    assert "transform" in json.loads(Path("profile.json").read_text())["stages"]
+    assert pstats.Stats("transform.prof").total_calls > 0
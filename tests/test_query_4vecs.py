@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+import uproot
+
+from graphics_4vecs.cli_4vecs import main
+from graphics_4vecs.generate_4vecs import write_root_file
+from graphics_4vecs.histogram_4vecs import compute_quantities
+from graphics_4vecs.query_4vecs import (
+    Cut,
+    EventIndex,
+    build_index,
+    default_index_dir,
+    parse_cut,
+    top_k,
+)
+from graphics_4vecs.render_4vecs import format_decay_numbers, parse_decay_numbers
+from graphics_4vecs.transformations_4vecs import (
+    build_rest_frame,
+    convert_to_store,
+    read_root_file,
+)
+
+
+@pytest.fixture()
+def rest_frame_quantities(root_file_path, tree_name):
+    rest_frame_df = build_rest_frame(read_root_file(root_file_path, tree_name))
+    return compute_quantities(rest_frame_df, ["K_p", "s_12", "pi_plus_4_pt"])
+
+
+def test_parse_cut():
+    assert parse_cut("s_12:0.5:1.2") == Cut("s_12", 0.5, 1.2)
+    assert parse_cut("K_p:1.5:") == Cut("K_p", 1.5, math.inf)
+    assert parse_cut("K_p::1") == Cut("K_p", -math.inf, 1.0)
+    np.testing.assert_array_equal(
+        Cut("x", 0, 1).mask([-1, 0, 0.5, 1, np.nan]), [False, True, True, False, False]
+    )
+    with pytest.raises(ValueError, match="quantity:low:high"):
+        parse_cut("K_p>1.5")
+    with pytest.raises(ValueError, match="Empty range"):
+        parse_cut("K_p:2:1")
+
+
+def test_format_decay_numbers():
+    assert format_decay_numbers([0, 1, 2, 7, 9, 10]) == "0-2,7,9-10"
+    assert format_decay_numbers([]) == ""
+    decay_nums = [5, 3, 4, 20]
+    assert parse_decay_numbers(format_decay_numbers(decay_nums)) == decay_nums
+
+
+def test_top_k(root_file_path, rest_frame_quantities):
+    k_p = rest_frame_quantities["K_p"]
+    events, values = top_k(root_file_path, "K_p", 5, step_size=3000)
+    np.testing.assert_array_equal(events, np.argsort(k_p)[::-1][:5])
+    np.testing.assert_array_equal(values, k_p[events])
+
+    cut = Cut("s_12", 0.5, 1.0)
+    events, _ = top_k(
+        root_file_path, "K_p", 5, largest=False, cuts=[cut], step_size=3000
+    )
+    passing = np.flatnonzero(cut.mask(rest_frame_quantities["s_12"]))
+    np.testing.assert_array_equal(events, passing[np.argsort(k_p[passing])][:5])
+
+
+def test_event_index(root_file_path, tree_name, rest_frame_quantities, tmp_path):
+    store_path = tmp_path / "rest_frame.evstore"
+    convert_to_store(root_file_path, tree_name, str(store_path))
+    index_dir = build_index(store_path, ["K_p", "s_12"], step_size=3000)
+    assert index_dir == default_index_dir(store_path)
+
+    index = EventIndex(store_path, ["K_p"])
+    cuts = [Cut("K_p", 0.8), Cut("s_12", 0.5, 1.0)]
+    expected = np.flatnonzero(
+        cuts[0].mask(rest_frame_quantities["K_p"])
+        & cuts[1].mask(rest_frame_quantities["s_12"])
+    )
+    np.testing.assert_array_equal(index.select(cuts), expected)
+    assert index.count(cuts[0]) == np.count_nonzero(
+        cuts[0].mask(rest_frame_quantities["K_p"])
+    )
+
+    events, values = index.top_k("K_p", 5, cuts=cuts[1:])
+    streamed_events, streamed_values = top_k(str(store_path), "K_p", 5, cuts=cuts[1:])
+    np.testing.assert_array_equal(events, streamed_events)
+    np.testing.assert_array_equal(values, streamed_values)
+    with pytest.raises(KeyError, match="not indexed"):
+        index.top_k("pi_plus_4_pt", 5)
+
+    # A missing quantity extends the index, a changed input rebuilds it
+    index = EventIndex(store_path, ["pi_plus_4_pt"])
+    assert index.quantities == ["K_p", "pi_plus_4_pt", "s_12"]
+    np.testing.assert_array_equal(
+        index.values("pi_plus_4_pt"), rest_frame_quantities["pi_plus_4_pt"]
+    )
+    os.utime(store_path, ns=(0, 0))
+    assert EventIndex(store_path).quantities == index.quantities
+
+
+def test_top_k_ties(root_file_path, tree_name, tmp_path):
+    # Equal values rank in event order, with or without an index
+    rest_frame_df = build_rest_frame(read_root_file(root_file_path, tree_name))
+    table_path = tmp_path / "rest_frame_data.csv"
+    rest_frame_df.iloc[[0, 0, 0, 1, 0, 0, 1]].to_csv(table_path, index=False)
+    index = EventIndex(table_path, ["K_p"])
+    cuts = [Cut("K_p", 0.0)]
+    for largest in (True, False):
+        for k in (3, 7):
+            streamed_events, _ = top_k(str(table_path), "K_p", k, largest, cuts)
+            events, _ = index.top_k("K_p", k, largest, cuts)
+            np.testing.assert_array_equal(events, streamed_events)
+            np.testing.assert_array_equal(
+                index.top_k("K_p", k, largest)[0], streamed_events
+            )
+    first, second = [0, 1, 2, 4, 5], [3, 6]
+    if index.values("K_p")[0] < index.values("K_p")[3]:
+        first, second = second, first
+    np.testing.assert_array_equal(index.top_k("K_p", 7)[0], first + second)
+
+
+def test_event_index_tree(tmp_path):
+    # An index of one tree of a ROOT file is not used for another
+    path = write_root_file(tmp_path / "events.root", 300, seed=1)
+    other_path = write_root_file(tmp_path / "other.root", 200, seed=2)
+    with uproot.update(path) as root_file:
+        root_file["Other"] = uproot.open(other_path)["DalitzEventList"].arrays(
+            library="np"
+        )
+    assert EventIndex(path, ["K_p"]).num_events == 300
+    assert EventIndex(path, ["K_p"], tree_name="Other").num_events == 200
+    assert EventIndex(path, ["K_p"]).num_events == 300
+
+
+def test_select_command(root_file_path, tree_name, tmp_path, monkeypatch, caplog):
+    root_file_path = str(Path(root_file_path).resolve())
+    monkeypatch.chdir(tmp_path)
+    assert main(["transform", root_file_path, tree_name, "--format", "npy"]) == 0
+    assert main(["index", "lab_frame_data.npy", "K_p"]) == 0
+    argv = ["select", "lab_frame_data.npy", "--top", "K_p", "-k", "3"]
+    assert main([*argv, "--output", "decays.txt"]) == 0
+    decays = parse_decay_numbers(Path("decays.txt").read_text())
+    assert main([*argv, "--scan", "--output", "scanned.txt"]) == 0
+    assert parse_decay_numbers(Path("scanned.txt").read_text()) == decays
+    assert len(decays) == 3
+
+    assert main(["select", "lab_frame_data.npy", "--cut", "s_12:0.5:1"]) == 0
+    assert "Building event index" in caplog.text
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from graphics_4vecs.io_4vecs import FRAME_COLUMNS
+from graphics_4vecs.render_4vecs import RenderReport, parse_decay_numbers, render_decays
+
+
+def test_parse_decay_numbers():
+    assert parse_decay_numbers("3") == [3]
+    assert parse_decay_numbers("0-4") == [0, 1, 2, 3, 4]
+    assert parse_decay_numbers("7, 2-3,7,10-11") == [7, 2, 3, 10, 11]
+    with pytest.raises(ValueError, match="decay number"):
+        parse_decay_numbers("a-b")
+
+
+def test_render_report():
+    report = RenderReport(rendered=[0, 1, 2, 3], failures={4: "boom"}, seconds=2.0)
+    assert report.throughput == 2.0
+    assert report.summary() == "Rendered 4 decays in 2.0 s (2.00 decays/s), 1 failed"
+
+
+def test_render_decays(tmp_path):
+    pytest.importorskip("manim")
+    rng = np.random.default_rng(0)
+    path = tmp_path / "lab_frame_data.csv"
+    pd.DataFrame(rng.normal(size=(5, 16)), columns=FRAME_COLUMNS).to_csv(
+        path, index=False
+    )
+
+    report = render_decays(
+        str(path), [0, 3], "picture", "l", workers=2, media_dir=tmp_path / "media"
+    )
+    assert report.rendered == [0, 3]
+    assert report.failures == {}
+
+
+def test_render_decays_degenerate_geometry(tmp_path):
+    pytest.importorskip("manim")
+    from graphics_4vecs.geometry_4vecs import write_geometry_table
+
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(3, 16)), columns=FRAME_COLUMNS)
+    frame.loc[1, ["K_px", "K_py", "K_pz"]] = 0
+    path = tmp_path / "lab_frame_data.csv"
+    frame.to_csv(path, index=False)
+    geometry_path = tmp_path / "geometry.npy"
+    assert write_geometry_table(path, geometry_path) == 1
+
+    report = render_decays(
+        str(path),
+        [0, 1],
+        "picture",
+        "l",
+        workers=1,
+        media_dir=tmp_path / "media",
+        geometry_file=geometry_path,
+    )
+    assert report.rendered == [0]
+    assert "ValueError: Decay 1 has a degenerate geometry" in report.failures[1]
@@ -5,8 +5,34 @@ import logging
 import numpy as np
 import pandas as pd
 import pytest
-from transformations_4vecs import lorentz_transform, read_root_file
+from graphics_4vecs.io_4vecs import open_store
+from graphics_4vecs.transformations_4vecs import (
+    KINEMATICS_COLUMNS,
+    boost_matrices,
+    boost_matrix,
+    boost_vector,
+    build_kinematics,
+    build_lab_frame,
+    build_rest_frame,
+    chunk_bytes_per_event,
+    compare_precision,
+    convert_to_store,
+    count_entries,
+    iterate_rest_frame,
+    iterate_root_file,
+    lorentz_boost,
+    lorentz_transform,
+    lorentz_transform_batch,
+    lorentz_transform_scan,
+    read_root_file,
+    run_pipeline,
+    run_scan,
+    select_branches,
+    velocities_from_rapidities,
+    write_kinematics,
+)
 import os
+from pathlib import Path
 
 log = logging.getLogger("graphics_4vecs")
 
@@ -15,20 +41,234 @@ def test_transformations_4vecs_hello():
     log.info("Hello from test transformations")
 
 
-@pytest.fixture()
-def root_file_path():
-    return "zenodo_version_D02Kpipipi_td_1000000events.root"
+def test_read_root_file(root_file_path, tree_name):
+    branches = read_root_file(root_file_path, tree_name)
+    assert isinstance(branches, dict)
+    assert branches != {}
 
 
-@pytest.fixture()
-def tree_name():
-    return "DalitzEventList"
+def test_build_rest_frame_columnar(root_file_path, tree_name):
+    branches = read_root_file(root_file_path, tree_name)
+    assert all(isinstance(array, np.ndarray) for array in branches.values())
 
+    rest_frame_df = build_rest_frame(branches)
+    np.testing.assert_array_equal(
+        rest_frame_df["pi_minus_3_py"], branches["_3_piminus_Py"]
+    )
+    # The table is a view of one row-major block, so the boost reshapes it
+    # without copying
+    values = rest_frame_df.to_numpy()
+    assert values.flags["C_CONTIGUOUS"]
+    assert np.shares_memory(values, rest_frame_df.to_numpy())
 
-def test_read_root_file(root_file_path, tree_name):
+    del branches["_2_piminus_E"]
+    with pytest.raises(KeyError, match="_2_piminus_E"):
+        build_rest_frame(branches)
+    assert build_rest_frame({}).empty
+
+
+def test_select_branches():
+    branch_names = ["_1_K#_E", "_1_K#_Px", "_2_pi~_E", "weight"]
+    assert select_branches(branch_names) == {
+        "_1_K#_E": "_1_Kplus_E",
+        "_1_K#_Px": "_1_Kplus_Px",
+        "_2_pi~_E": "_2_piminus_E",
+        "weight": "weight",
+    }
+    assert select_branches(branch_names, branches=["_2_piminus_E", "_1_K#_E"]) == {
+        "_1_K#_E": "_1_Kplus_E",
+        "_2_pi~_E": "_2_piminus_E",
+    }
+    assert list(select_branches(branch_names, filter_name="*_E")) == [
+        "_1_K#_E",
+        "_2_pi~_E",
+    ]
+    assert list(select_branches(branch_names, filter_name="/^_1_Kplus/")) == [
+        "_1_K#_E",
+        "_1_K#_Px",
+    ]
+    with pytest.raises(KeyError, match="_5_piplus_E"):
+        select_branches(branch_names, branches=["_5_piplus_E"])
+
+
+def test_read_root_file_projection(root_file_path, tree_name):
+    branches = read_root_file(
+        root_file_path, tree_name, branches=["_1_Kplus_E", "_2_piminus_Pz"]
+    )
+    assert set(branches) == {"_1_Kplus_E", "_2_piminus_Pz"}
+
+    branches = read_root_file(root_file_path, tree_name, filter_name="_4_piplus_*")
+    assert set(branches) == {
+        "_4_piplus_E",
+        "_4_piplus_Px",
+        "_4_piplus_Py",
+        "_4_piplus_Pz",
+    }
+
+    chunk = next(
+        iterate_root_file(root_file_path, tree_name, branches=["_3_piminus_Py"])
+    )
+    assert set(chunk) == {"_3_piminus_Py"}
+
+
+def test_iterate_root_file(root_file_path, tree_name):
     branches = read_root_file(root_file_path, tree_name)
-    assert isinstance(branches, dict)
-    assert branches != {}
+    chunks = list(iterate_root_file(root_file_path, tree_name, step_size=1000))
+    assert len(chunks) > 1
+    for branch_name, branch_array in branches.items():
+        np.testing.assert_array_equal(
+            np.concatenate([chunk[branch_name] for chunk in chunks]), branch_array
+        )
+
+
+def test_build_frames_chunked(root_file_path, tree_name):
+    v = 0.5 * 299792458
+    full_lab_frame = build_lab_frame(
+        build_rest_frame(read_root_file(root_file_path, tree_name)), v
+    )
+    chunked_lab_frame = pd.concat(
+        [
+            build_lab_frame(build_rest_frame(chunk), v)
+            for chunk in iterate_root_file(root_file_path, tree_name, step_size=1000)
+        ],
+        ignore_index=True,
+    )
+    pd.testing.assert_frame_equal(chunked_lab_frame, full_lab_frame)
+
+
+def test_chunk_bytes_per_event(root_file_path, tree_name):
+    # Tables plus the transformation temporaries, and the decoded branches of
+    # ROOT files
+    assert chunk_bytes_per_event("events.root") == 4 * 128
+    assert chunk_bytes_per_event("events.evstore") == 3 * 128
+    assert chunk_bytes_per_event("events.root", num_tables=4) == 6 * 128
+
+    # Memory sizes count the whole chunk in flight, not one table
+    chunks = iterate_rest_frame(root_file_path, tree_name, step_size="384 kB")
+    assert len(next(chunks)) == 1000
+
+
+def test_convert_to_store(root_file_path, tree_name, tmp_path):
+    store_path = str(tmp_path / "rest_frame_data.evstore")
+    num_events = convert_to_store(root_file_path, tree_name, store_path)
+
+    from_root = pd.concat(
+        iterate_rest_frame(root_file_path, tree_name, step_size=1000),
+        ignore_index=True,
+    )
+    from_store = pd.concat(
+        iterate_rest_frame(store_path, tree_name, step_size=1000), ignore_index=True
+    )
+    assert num_events == len(from_root)
+    pd.testing.assert_frame_equal(from_store, from_root)
+
+
+def test_run_pipeline_parallel(root_file_path, tree_name, tmp_path, monkeypatch):
+    root_file_path = str(Path(root_file_path).resolve())
+    outputs = {}
+    for workers in (1, 3):
+        run_dir = tmp_path / f"workers_{workers}"
+        run_dir.mkdir()
+        monkeypatch.chdir(run_dir)
+        run_pipeline(root_file_path, tree_name, step_size=1500, workers=workers)
+        outputs[workers] = [
+            (run_dir / name).read_bytes()
+            for name in ("rest_frame_data.csv", "lab_frame_data.csv")
+        ]
+
+    assert outputs[3] == outputs[1]
+
+
+def test_run_pipeline_float32(root_file_path, tree_name, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run_pipeline(root_file_path, tree_name, output_format="npy")
+    run_pipeline(
+        root_file_path,
+        tree_name,
+        step_size=1500,
+        output_format="evstore",
+        precision="float32",
+    )
+
+    for frame in ("rest", "lab"):
+        full = np.load(f"{frame}_frame_data.npy")
+        compact = open_store(f"{frame}_frame_data.evstore").to_frame()
+        assert (compact.dtypes == np.float32).all()
+        for column in compact:
+            np.testing.assert_allclose(compact[column], full[column], atol=1e-6)
+
+    with pytest.raises(ValueError, match="float16"):
+        run_pipeline(root_file_path, tree_name, precision="float16")
+
+
+def test_compare_precision(root_file_path, tree_name):
+    report = compare_precision(root_file_path, tree_name, step_size=3000)
+    assert report.num_events == count_entries(root_file_path, tree_name)
+    assert set(report.max_abs) == {
+        "rest_frame",
+        "lab_frame",
+        "m_parent",
+        "invariant_masses",
+        "dalitz_variables",
+    }
+    # Rounding to float32 keeps about 7 significant digits
+    assert 0 < report.max_rel["rest_frame"] < 1e-7
+    assert 0 < report.max_abs["m_parent"] < 1e-5
+    assert report.max_abs["dalitz_variables"] < 1e-5
+    assert "m_parent" in report.summary()
+    assert compare_precision(root_file_path, tree_name, max_events=10).num_events == 10
+
+
+def test_build_kinematics(root_file_path, tree_name):
+    rest_frame_df = build_rest_frame(read_root_file(root_file_path, tree_name))[:100]
+    kinematics = build_kinematics(rest_frame_df)
+    assert list(kinematics.columns) == KINEMATICS_COLUMNS
+
+    for i, row in rest_frame_df.iterrows():
+        k, pi2, pi3, pi4 = row.to_numpy().reshape(4, 4)
+
+        def mass2(p):
+            return p[0] ** 2 - p[1] ** 2 - p[2] ** 2 - p[3] ** 2
+
+        expected = {
+            "m_K_pi_minus_2": np.sqrt(mass2(k + pi2)),
+            "m_pi_minus_3_pi_plus_4": np.sqrt(mass2(pi3 + pi4)),
+            "m_K_pi_minus_2_pi_minus_3": np.sqrt(mass2(k + pi2 + pi3)),
+            "s_12": mass2(k + pi2),
+            "s_23": mass2(pi2 + pi3),
+            "s_34": mass2(pi3 + pi4),
+            "s_123": mass2(k + pi2 + pi3),
+            "s_234": mass2(pi2 + pi3 + pi4),
+        }
+        for name, value in expected.items():
+            assert kinematics.loc[i, name] == pytest.approx(value)
+
+    # Invariants are the same in every frame
+    lab_kinematics = build_kinematics(build_lab_frame(rest_frame_df, 0.5 * 299792458))
+    pd.testing.assert_frame_equal(lab_kinematics, kinematics, rtol=1e-9)
+
+
+def test_write_kinematics(root_file_path, tree_name, tmp_path):
+    from_root = tmp_path / "kinematics.csv"
+    num_events = write_kinematics(
+        root_file_path, str(from_root), tree_name, step_size=3000
+    )
+    expected = build_kinematics(
+        build_rest_frame(read_root_file(root_file_path, tree_name))
+    )
+    assert num_events == len(expected)
+    pd.testing.assert_frame_equal(pd.read_csv(from_root), expected, rtol=1e-12)
+
+    # Frame tables are read in chunks as well
+    convert_to_store(root_file_path, tree_name, str(tmp_path / "events.evstore"))
+    from_table = tmp_path / "kinematics.npz"
+    assert (
+        write_kinematics(
+            str(tmp_path / "events.evstore"), str(from_table), step_size=3000
+        )
+        == num_events
+    )
+    np.testing.assert_allclose(np.load(from_table)["s_123"], expected["s_123"])
 
 
 def test_lorentz_transform():
@@ -42,6 +282,105 @@ def test_lorentz_transform():
     np.testing.assert_allclose(transformed, expected_transformed)
 
 
+def test_lorentz_transform_batch():
+    v = 0.5 * 299792458
+    four_momenta = np.array(
+        [[10.0, 2.0, 3.0, 4.0], [5.0, -1.0, 0.5, 2.0], [1.0, 0.0, 0.0, 0.0]]
+    )
+    transformed = lorentz_transform_batch(four_momenta, v)
+    assert transformed.shape == four_momenta.shape
+    for row, boosted in zip(four_momenta, transformed):
+        np.testing.assert_allclose(lorentz_transform(*row, v), boosted)
+
+    # Extra leading axes, e.g. (events, particles, 4), are boosted the same way
+    stacked = lorentz_transform_batch(four_momenta.reshape(1, 3, 4), v)
+    np.testing.assert_allclose(stacked.reshape(3, 4), transformed)
+
+    # Whole columns can be passed to the scalar interface
+    columns = lorentz_transform(*four_momenta.T, v)
+    np.testing.assert_allclose(columns, transformed)
+
+    with pytest.raises(ValueError, match="last axis of length 4"):
+        lorentz_transform_batch(np.zeros((2, 3)), v)
+
+
+def test_lorentz_transform_scan():
+    velocities = np.array([0.0, 0.3, -0.6, 0.99]) * 299792458
+    four_momenta = np.random.default_rng(2).normal(size=(5, 4, 4))
+    scan = lorentz_transform_scan(four_momenta, velocities)
+    assert scan.shape == (4, 5, 4, 4)
+    for v, boosted in zip(velocities, scan, strict=True):
+        np.testing.assert_array_equal(boosted, lorentz_transform_batch(four_momenta, v))
+        np.testing.assert_allclose(boost_matrices([v])[0], boost_matrix(v))
+
+    np.testing.assert_allclose(
+        velocities_from_rapidities(np.arctanh([0.3, -0.6])), velocities[1:3]
+    )
+    with pytest.raises(ValueError, match="below the speed of light"):
+        boost_matrices([299792458])
+
+
+def test_run_scan(root_file_path, tree_name, tmp_path):
+    velocities = np.array([0.25, 0.5]) * 299792458
+    paths = run_scan(
+        root_file_path,
+        tree_name,
+        velocities,
+        step_size=4000,
+        output_format="npy",
+        output_dir=str(tmp_path),
+    )
+    assert paths == [
+        str(tmp_path / "lab_frame_data_beta0.25.npy"),
+        str(tmp_path / "lab_frame_data_beta0.5.npy"),
+    ]
+
+    rest_frame_df = build_rest_frame(read_root_file(root_file_path, tree_name))
+    np.testing.assert_array_equal(
+        pd.DataFrame(np.load(tmp_path / "rest_frame_data.npy")), rest_frame_df
+    )
+    for path, v in zip(paths, velocities, strict=True):
+        np.testing.assert_array_equal(
+            pd.DataFrame(np.load(path)), build_lab_frame(rest_frame_df, v)
+        )
+
+    with pytest.raises(ValueError, match="must differ"):
+        run_scan(root_file_path, tree_name, [1e8, 1e8], output_dir=str(tmp_path))
+
+
+def test_lorentz_boost():
+    four_momenta = np.array(
+        [[10.0, 2.0, 3.0, 4.0], [5.0, -1.0, 0.5, 2.0], [1.0, 0.0, 0.0, 0.0]]
+    )
+
+    # A boost along x reproduces the fixed-velocity transformation
+    beta_x = np.tile([0.5, 0.0, 0.0], (3, 1))
+    np.testing.assert_allclose(
+        lorentz_boost(four_momenta, beta_x),
+        lorentz_transform_batch(four_momenta, 0.5 * 299792458),
+    )
+
+    # A zero boost is the identity
+    np.testing.assert_allclose(
+        lorentz_boost(four_momenta, np.zeros((3, 3))), four_momenta
+    )
+
+    # Boosting each event into its own rest frame leaves only the invariant mass
+    boosted = lorentz_boost(four_momenta, boost_vector(four_momenta))
+    masses = np.sqrt(four_momenta[:, 0] ** 2 - np.sum(four_momenta[:, 1:] ** 2, axis=1))
+    np.testing.assert_allclose(boosted[:, 0], masses)
+    np.testing.assert_allclose(boosted[:, 1:], 0.0, atol=1e-12)
+
+    # (events, particles, 4) momenta take one boost vector per event
+    daughters = np.stack([four_momenta, four_momenta[::-1]], axis=1)
+    beta = boost_vector(daughters.sum(axis=1))
+    boosted = lorentz_boost(daughters, beta[:, np.newaxis, :])
+    np.testing.assert_allclose(boosted.sum(axis=1)[:, 1:], 0.0, atol=1e-12)
+
+    with pytest.raises(ValueError, match="beta"):
+        lorentz_boost(four_momenta, np.tile([1.0, 0.0, 0.0], (3, 1)))
+
+
 # To test CSV generation, we can check if the CSV files are created
 def test_csv_generation(root_file_path, tree_name):
     rest_frame = read_root_file(root_file_path, tree_name)